@@ -0,0 +1,132 @@
+# benchmarks/generate.py
+import argparse
+import json
+import os
+import random
+from datetime import date, timedelta
+
+from utils.helpers import save_json_atomic
+from utils.sales_journal import partition_key
+from utils.security import hash_password
+
+# Password of every generated user
+USER_PASSWORD = "bench"
+
+_WORDS = ["milk", "bread", "rice", "sugar", "tea", "coffee", "oil", "salt", "soap", "juice",
+          "water", "cheese", "butter", "eggs", "pasta", "beans", "flour", "honey", "dates", "tuna"]
+_BRANDS = ["juhayna", "domty", "beyti", "almarai", "isis", "royal", "crystal", "faragello"]
+
+
+def _barcode(index):
+    return str(6220000000000 + index)
+
+
+def make_products(count, rng):
+    products = []
+    for i in range(count):
+        name = f"{rng.choice(_BRANDS)} {rng.choice(_WORDS)} {rng.randint(1, 999)}"
+        products.append({
+            "barcode": _barcode(i),
+            "name": name,
+            "price": round(rng.uniform(1, 500), 2),
+            "quantity": rng.randint(0, 500)
+        })
+    return products
+
+
+def make_promos(count, rng):
+    return [{
+        "code": f"PROMO{i:06d}",
+        "discount_percentage": float(rng.choice([5, 10, 15, 20, 25])),
+        "max_uses": 1,
+        "uses_left": 1
+    } for i in range(count)]
+
+
+def make_users(count):
+    # bcrypt is slow on purpose: hash once and share it
+    password_hash = hash_password(USER_PASSWORD)
+    users = [{"username": "admin", "password_hash": password_hash, "role": "admin"}]
+    users.extend({"username": f"user{i}", "password_hash": password_hash, "role": "User"}
+                 for i in range(1, count))
+    return users
+
+
+def _write_partition(path, sales):
+    # Streams one month at a time so millions of sales never sit in memory together
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for n, sale in enumerate(sales):
+            if n:
+                f.write(",")
+            f.write(json.dumps(sale, separators=(",", ":")))
+        f.write("]")
+    os.replace(tmp_path, path)
+
+
+def write_sales(data_dir, count, products, rng, days=365, items_per_sale=4, end=None):
+    """Spread count sales over the last days days into monthly partitions. Returns the last id."""
+    sales_dir = os.path.join(data_dir, "sales")
+    os.makedirs(sales_dir, exist_ok=True)
+    end = end or date.today()
+    start = end - timedelta(days=days - 1)
+    per_day = count / days if days else count
+
+    def day_sales():
+        sale_id = 0
+        for d in range(days):
+            day = (start + timedelta(days=d)).isoformat()
+            target = int(per_day * (d + 1)) - int(per_day * d)
+            for _ in range(target):
+                sale_id += 1
+                items = []
+                for product in rng.sample(products, min(len(products), rng.randint(1, items_per_sale))):
+                    items.append({"barcode": product["barcode"], "name": product["name"],
+                                  "price": product["price"], "quantity": rng.randint(1, 3)})
+                yield {"id": sale_id, "user": "admin", "date": day,
+                       "total": round(sum(i["price"] * i["quantity"] for i in items), 2),
+                       "items": items}
+
+    last_id = 0
+    month, batch = None, []
+    for sale in day_sales():
+        key = partition_key(sale["date"])
+        if key != month and batch:
+            _write_partition(os.path.join(sales_dir, f"{month}.json"), batch)
+            batch = []
+        month = key
+        batch.append(sale)
+        last_id = sale["id"]
+    if batch:
+        _write_partition(os.path.join(sales_dir, f"{month}.json"), batch)
+    save_json_atomic(os.path.join(sales_dir, "meta.json"), {"last_id": last_id})
+    return last_id
+
+
+def generate_store(data_dir, products=1000, sales=10000, promos=100, users=5, days=365, seed=1):
+    """Create a synthetic JSON data dir at the given scale. Returns the counts written."""
+    rng = random.Random(seed)
+    os.makedirs(data_dir, exist_ok=True)
+    product_list = make_products(products, rng)
+    save_json_atomic(os.path.join(data_dir, "products.json"), product_list)
+    save_json_atomic(os.path.join(data_dir, "promo_codes.json"), make_promos(promos, rng))
+    save_json_atomic(os.path.join(data_dir, "users.json"), make_users(max(1, users)))
+    if sales and product_list:
+        write_sales(data_dir, sales, product_list, rng, days=days)
+    return {"products": products, "sales": sales if product_list else 0, "promos": promos,
+            "users": max(1, users), "days": days}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic JustB data folder")
+    parser.add_argument("data_dir")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--sales", type=int, default=10000)
+    parser.add_argument("--promos", type=int, default=100)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--days", type=int, default=365, help="Days of sales history, ending today")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    counts = generate_store(args.data_dir, args.products, args.sales, args.promos, args.users, args.days, args.seed)
+    print("Generated " + ", ".join(f"{n} {what}" for what, n in counts.items()) + f" in {args.data_dir}")
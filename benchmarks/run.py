@@ -0,0 +1,287 @@
+# benchmarks/run.py
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.generate import generate_store
+from utils.checkout import CheckoutEngine
+from utils.helpers import load_json, save_json, flush, get_today_date
+from utils.product_index import ProductSearchIndex
+from utils.storage import get_backend
+
+# Timed samples per benchmark (after one warm-up call)
+DEFAULT_REPEAT = 5
+# Operations per sample for the per-call benchmarks (lookups, searches)
+OPS_PER_SAMPLE = 1000
+
+
+def _git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def measure(name, fn, repeat=DEFAULT_REPEAT, ops=1, warmup=True):
+    """Time fn() repeat times; ops is how many operations one call performs."""
+    if warmup:
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000 / ops)
+    samples.sort()
+    return {
+        "name": name,
+        "ops_per_sample": ops,
+        "samples": repeat,
+        "mean_ms": statistics.fmean(samples),
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))],
+        "min_ms": samples[0],
+        "max_ms": samples[-1],
+        "ops_per_sec": (1000 / statistics.fmean(samples)) if statistics.fmean(samples) else None,
+    }
+
+
+class BenchContext:
+    """State shared by the benchmarks: the data dir, its backend and sample inputs."""
+
+    def __init__(self, data_dir, backend_name, repeat, seed=2):
+        self.data_dir = data_dir
+        self.backend = get_backend(data_dir, backend_name)
+        self.repeat = repeat
+        self.rng = random.Random(seed)
+        self.products = self.backend.list_products()
+        self.barcodes = [str(p["barcode"]) for p in self.products]
+
+
+# ---- benchmarks ----
+def bench_load_json(ctx):
+    path = os.path.join(ctx.data_dir, "products.json")
+    flush()
+    return measure("load_json products.json", lambda: load_json(path), ctx.repeat)
+
+
+def bench_save_json(ctx):
+    path = os.path.join(ctx.data_dir, "products.json")
+    products = load_json(path)
+
+    def save():
+        save_json(path, products)
+        flush()
+    return measure("save_json products.json (committed)", save, ctx.repeat)
+
+
+def bench_barcode_lookup(ctx):
+    # What add_to_cart does for every scan
+    if not ctx.barcodes:
+        return None
+    picks = [ctx.rng.choice(ctx.barcodes) for _ in range(OPS_PER_SAMPLE)]
+
+    def lookups():
+        for barcode in picks:
+            ctx.backend.get_product(barcode)
+    return measure("add_to_cart barcode lookup", lookups, ctx.repeat, ops=OPS_PER_SAMPLE)
+
+
+def bench_finalize_sale(ctx):
+    # The engine behind POSScreen.add_to_cart/finalize_sale
+    if not ctx.barcodes:
+        return None
+    engine = CheckoutEngine(ctx.data_dir, "bench", ctx.backend)
+
+    def sale():
+        for barcode in ctx.rng.sample(ctx.barcodes, min(4, len(ctx.barcodes))):
+            engine.cart.add(ctx.backend.get_product(barcode), 1)
+        engine.commit()
+    return measure("finalize_sale (4 items)", sale, ctx.repeat * 4)
+
+
+def bench_commit_batch(ctx):
+    if not ctx.barcodes:
+        return None
+    engine = CheckoutEngine(ctx.data_dir, "bench", ctx.backend)
+    baskets = [{"items": [(b, 1) for b in ctx.rng.sample(ctx.barcodes, min(4, len(ctx.barcodes)))]}
+               for _ in range(OPS_PER_SAMPLE)]
+    return measure("commit_batch per basket (4 items)", lambda: engine.commit_batch(baskets),
+                   ctx.repeat, ops=OPS_PER_SAMPLE)
+
+
+def bench_promo_redeem(ctx):
+    # One-time coupons: apply and commit, each sale using up a fresh code
+    if not ctx.barcodes:
+        return None
+    codes = [p["code"] for p in ctx.backend.list_promos() if int(p.get("uses_left", 0)) > 0]
+    ops = min(100, len(codes) // (ctx.repeat + 1))
+    if not ops:
+        return None
+    engine = CheckoutEngine(ctx.data_dir, "bench", ctx.backend)
+    unused = iter(codes)
+
+    def redeem():
+        for _ in range(ops):
+            engine.cart.add(ctx.backend.get_product(ctx.rng.choice(ctx.barcodes)), 1)
+            engine.apply_promo(next(unused))
+            engine.commit()
+    return measure(f"promo apply + redeem ({len(codes)} codes)", redeem, ctx.repeat, ops=ops)
+
+
+def bench_search_index_build(ctx):
+    def build():
+        ProductSearchIndex(ctx.products).search("abc", "All")
+    return measure("search_products index build", build, ctx.repeat)
+
+
+def bench_search(ctx):
+    if not ctx.products:
+        return None
+    index = ProductSearchIndex(ctx.products)
+    queries = []
+    for _ in range(OPS_PER_SAMPLE):
+        product = ctx.rng.choice(ctx.products)
+        field = ctx.rng.choice(["name", "barcode"])
+        text = str(product[field])
+        start = ctx.rng.randrange(max(1, len(text) - 4))
+        queries.append((text[start:start + 4].lower(), "Name" if field == "name" else "Barcode"))
+
+    def searches():
+        for query, filter_by in queries:
+            index.search(query, filter_by)
+    return measure("search_products filter", searches, ctx.repeat, ops=OPS_PER_SAMPLE)
+
+
+def bench_daily_summary(ctx):
+    # What DailyFeedbackScreen.load_data asks for
+    today = get_today_date()
+    return measure("daily feedback load_data", lambda: ctx.backend.daily_summary(today), ctx.repeat)
+
+
+def bench_period_report(ctx):
+    # Reports tab over the whole generated history (a year by default)
+    from utils.reports import period_report
+    return measure("period report (full history)",
+                   lambda: period_report(ctx.data_dir, "0000-01-01", "9999-12-31"), max(1, ctx.repeat // 2))
+
+
+def bench_label_sheets(ctx):
+    # Reprinting an aisle's shelf labels: every label comes from the render cache (the warmup draws them)
+    try:
+        import qrcode  # noqa: F401
+    except ImportError:
+        print("    skipped: qrcode is not installed", file=sys.stderr)
+        return None
+    from utils.labels import make_label_sheets, product_label
+    specs = [product_label(p) for p in ctx.products[:240]]
+    out_path = os.path.join(ctx.data_dir, "labels", "bench.pdf")
+    return measure("label sheets (240 cached labels)", lambda: make_label_sheets(ctx.data_dir, specs, out_path),
+                   max(1, ctx.repeat // 4), ops=len(specs))
+
+
+def bench_rollup_rebuild(ctx):
+    if ctx.backend.name != "json":
+        return None
+    from utils.rollups import rebuild
+    return measure("daily rollups rebuild (first start)", lambda: rebuild(ctx.data_dir),
+                   max(1, ctx.repeat // 2), warmup=False)
+
+
+BENCHMARKS = {
+    "load_json": bench_load_json,
+    "save_json": bench_save_json,
+    "lookup": bench_barcode_lookup,
+    "finalize_sale": bench_finalize_sale,
+    "commit_batch": bench_commit_batch,
+    "promo_redeem": bench_promo_redeem,
+    "search_build": bench_search_index_build,
+    "search": bench_search,
+    "rollup_rebuild": bench_rollup_rebuild,
+    "daily_summary": bench_daily_summary,
+    "period_report": bench_period_report,
+    "label_sheets": bench_label_sheets,
+}
+
+
+def run(data_dir, backend_name="json", repeat=DEFAULT_REPEAT, only=None):
+    """Run the selected benchmarks against data_dir and return a list of result dicts."""
+    if backend_name == "sqlite":
+        from utils.storage import SQLiteBackend, DB_FILE
+        if not os.path.exists(os.path.join(data_dir, DB_FILE)):
+            SQLiteBackend(os.path.join(data_dir, DB_FILE)).import_json(data_dir)
+    ctx = BenchContext(data_dir, backend_name, repeat)
+    results = []
+    for name, bench in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        print(f"  {name}...", file=sys.stderr)
+        result = bench(ctx)
+        if result is not None:
+            result["key"] = name
+            results.append(result)
+    flush()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time JustB's data layer and POS hot paths without a display")
+    parser.add_argument("--data-dir", help="Existing data folder to benchmark (default: generate a temporary one)")
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--sales", type=int, default=100000)
+    parser.add_argument("--promos", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--only", help="Comma-separated benchmark keys: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--out", help="Write the JSON results here (default: stdout)")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated data folder")
+    args = parser.parse_args()
+
+    data_dir = args.data_dir
+    scale = None
+    generated = data_dir is None
+    if generated:
+        data_dir = tempfile.mkdtemp(prefix="justb-bench-")
+        print(f"Generating data in {data_dir}...", file=sys.stderr)
+        start = time.perf_counter()
+        scale = generate_store(data_dir, args.products, args.sales, args.promos, args.users, args.days)
+        scale["generate_seconds"] = time.perf_counter() - start
+
+    try:
+        results = run(data_dir, args.backend, args.repeat,
+                      only=set(args.only.split(",")) if args.only else None)
+    finally:
+        if generated and not args.keep:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": args.backend,
+            "data_dir": None if generated and not args.keep else data_dir,
+        },
+        "scale": scale,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Results written to {args.out}", file=sys.stderr)
+    else:
+        print(text)
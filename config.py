@@ -1,4 +1,32 @@
+import os
+
 DATA_DIR = "data"
 
 # Default admin credentials
 DEFAULT_ADMIN = {"username": "admin", "password": "admin123", "role": "Admin"}
+
+# Storage backend for the data folder: "json" (the .json files) or "sqlite" (store.db,
+# fill it once with: python -m utils.storage import <data_dir>)
+STORAGE_BACKEND = "json"
+
+# "host:port" of a store server (python -m utils.store_server serve <data_dir>) that
+# several tills share; empty means this till works on data_dir directly
+STORE_SERVER = os.environ.get("JUSTB_STORE_SERVER", "")
+
+# Record hot-path timings to <data_dir>/logs/perf.jsonl (also: JUSTB_TRACE=1 or main.py --trace)
+TRACING_ENABLED = os.environ.get("JUSTB_TRACE", "") == "1"
+
+# MySQL settings used by database.py, create_admin.py and utils/backup.py
+DB_HOST = os.environ.get("JUSTB_DB_HOST", "localhost")
+DB_USER = os.environ.get("JUSTB_DB_USER", "root")
+DB_PASSWORD = os.environ.get("JUSTB_DB_PASSWORD", "")
+DB_NAME = os.environ.get("JUSTB_DB_NAME", "retail_store")
+DB_POOL_SIZE = int(os.environ.get("JUSTB_DB_POOL_SIZE", "5"))
+
+
+class Config:
+    DB_HOST = DB_HOST
+    DB_USER = DB_USER
+    DB_PASSWORD = DB_PASSWORD
+    DB_NAME = DB_NAME
+    DB_POOL_SIZE = DB_POOL_SIZE
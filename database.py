@@ -1,9 +1,179 @@
 # retail_store_management/database.py
 
-import mysql.connector
-from mysql.connector import Error
-from config import Config
+import threading
 import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from config import Config
+
+try:
+    import mysql.connector as mysql_driver
+except ImportError:
+    mysql_driver = None
+
+# Seconds a pooled connection may sit idle before it is pinged on checkout
+PING_AFTER = 60
+# Prepared statements kept per connection
+STATEMENT_CACHE_SIZE = 64
+
+
+class PooledConnection:
+    """A driver connection plus its server-side prepared statement cache."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.statements = OrderedDict()  # sql -> prepared cursor
+        self.last_used = time.monotonic()
+
+    def prepared(self, sql):
+        cursor = self.statements.get(sql)
+        if cursor is None:
+            cursor = self.raw.cursor(prepared=True)
+            self.statements[sql] = cursor
+            if len(self.statements) > STATEMENT_CACHE_SIZE:
+                _, oldest = self.statements.popitem(last=False)
+                oldest.close()
+        else:
+            self.statements.move_to_end(sql)
+        return cursor
+
+    def close(self):
+        for cursor in self.statements.values():
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self.statements.clear()
+        try:
+            self.raw.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of driver connections.
+    A thread keeps the connection it checked out for nested calls (e.g. queries
+    inside a transaction) and hands it back when the outermost call returns.
+    Idle connections are pinged only after PING_AFTER seconds instead of on
+    every query. Connections run in autocommit outside Database.transaction(),
+    so an idle one never holds a stale snapshot open.
+    """
+
+    def __init__(self, driver, size, **connect_args):
+        self.driver = driver
+        self.size = size
+        self.connect_args = dict(connect_args, autocommit=True)
+        self._idle = []               # LIFO: the most recently used connection is the likeliest alive
+        self._created = 0
+        self._available = threading.Condition()
+        self._local = threading.local()
+
+    def _new_connection(self):
+        return PooledConnection(self.driver.connect(**self.connect_args))
+
+    def _checkout(self):
+        # Wait for an idle connection or a free slot; a release or a dropped connection wakes us
+        with self._available:
+            while not self._idle and self._created >= self.size:
+                self._available.wait()
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                conn = None
+                self._created += 1
+        try:
+            return self._revive(conn) if conn is not None else self._new_connection()
+        except Exception:
+            self._drop_slot()
+            raise
+
+    def _drop_slot(self):
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def _revive(self, conn):
+        if time.monotonic() - conn.last_used > PING_AFTER:
+            try:
+                conn.raw.ping(reconnect=True, attempts=1, delay=0)
+                conn.statements.clear()  # a reconnect drops server-side statements
+            except Exception:
+                conn.close()
+                conn = self._new_connection()
+        return conn
+
+    def _release(self, conn, broken=False):
+        if not broken and getattr(conn.raw, "in_transaction", False):
+            # A transaction left open would pin its snapshot for the next borrower
+            try:
+                conn.raw.rollback()
+            except Exception:
+                broken = True
+        if broken:
+            conn.close()
+            self._drop_slot()
+            return
+        conn.last_used = time.monotonic()
+        with self._available:
+            self._idle.append(conn)
+            self._available.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check out this thread's connection, reusing it for nested calls."""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+        conn = self._checkout()
+        self._local.conn = conn
+        broken = False
+        try:
+            yield conn
+        except (self.driver.OperationalError, self.driver.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self._local.conn = None
+            self._release(conn, broken)
+
+    def close_all(self):
+        with self._available:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            self._available.notify_all()
+        for conn in idle:
+            conn.close()
+
+
+class Transaction:
+    """Statements executed on one connection and committed together."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lastrowid = None
+
+    def execute(self, query, params=None):
+        cursor = self.conn.prepared(query) if params is not None else self.conn.raw.cursor()
+        cursor.execute(query, params)
+        self.lastrowid = cursor.lastrowid
+        if cursor.with_rows:
+            rows = [dict(zip(cursor.column_names, row)) for row in cursor.fetchall()]
+        else:
+            rows = None
+        if params is None:
+            cursor.close()
+        return rows
+
+    def executemany(self, query, seq_params):
+        # Plain cursor: the driver folds INSERT ... VALUES batches into one multi-row statement
+        cursor = self.conn.raw.cursor()
+        try:
+            cursor.executemany(query, seq_params)
+            return cursor.rowcount
+        finally:
+            cursor.close()
 
 
 class Database:
@@ -12,28 +182,44 @@ class Database:
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(Database, cls).__new__(cls)
-            cls._instance.connection = None
-            cls._instance.connect()
+            cls._instance.driver = mysql_driver
+            cls._instance.pool = None
         return cls._instance
 
+    def use_pool(self, pool):
+        """
+        Swap in another pool, e.g. one built on a fake driver in tests. This is
+        the only way to use another driver: the shared instance already exists
+        once this module is imported.
+        """
+        if self.pool is not None:
+            self.pool.close_all()
+        self.pool = pool
+        self.driver = pool.driver
+
     def connect(self):
-        """Establishes a connection to the MySQL database."""
-        if self.connection and self.connection.is_connected():
-            return self.connection
+        """Creates the connection pool and checks that the MySQL database is reachable."""
+        if self.pool is not None:
+            return self.pool
+        if self.driver is None:
+            raise ConnectionError("mysql-connector-python is not installed.")
 
         retries = 5
         for i in range(retries):
             try:
-                self.connection = mysql.connector.connect(
+                pool = ConnectionPool(
+                    self.driver, Config.DB_POOL_SIZE,
                     host=Config.DB_HOST,
                     database=Config.DB_NAME,
                     user=Config.DB_USER,
                     password=Config.DB_PASSWORD
                 )
-                if self.connection.is_connected():
-                    print(f"Successfully connected to MySQL database: {Config.DB_NAME}")
-                    return self.connection
-            except Error as e:
+                with pool.connection():
+                    pass
+                self.pool = pool
+                print(f"Successfully connected to MySQL database: {Config.DB_NAME}")
+                return self.pool
+            except self.driver.Error as e:
                 print(f"Error connecting to MySQL database: {e}")
                 if i < retries - 1:
                     print(f"Retrying connection in 5 seconds... ({i + 1}/{retries})")
@@ -44,10 +230,29 @@ class Database:
         return None
 
     def close(self):
-        """Closes the database connection."""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
-            print("MySQL connection closed.")
+        """Closes every pooled connection."""
+        if self.pool is not None:
+            self.pool.close_all()
+            self.pool = None
+            print("MySQL connections closed.")
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run several statements on one pooled connection as a single transaction:
+            with db.transaction() as tx:
+                tx.execute(...); tx.executemany(...)
+        Commits on success, rolls back and re-raises on error.
+        """
+        pool = self.connect()
+        with pool.connection() as conn:
+            conn.raw.start_transaction()
+            try:
+                yield Transaction(conn)
+                conn.raw.commit()
+            except Exception:
+                conn.raw.rollback()
+                raise
 
     def execute_query(self, query, params=None, fetch=False, commit=False):
         """
@@ -58,30 +263,73 @@ class Database:
         :param commit: Boolean, if True, commits the transaction (for INSERT, UPDATE, DELETE).
         :return: Fetched data if fetch is True, otherwise None.
         """
-        if not self.connection or not self.connection.is_connected():
-            self.connect()  # Attempt to reconnect if disconnected
-
-        if not self.connection or not self.connection.is_connected():
+        try:
+            pool = self.connect()
+        except ConnectionError:
             print("Cannot execute query: No active database connection.")
             return None
 
-        cursor = None
+        for attempt in range(2):
+            try:
+                with pool.connection() as conn:
+                    # Parameterized statements go through the connection's prepared statement cache
+                    cursor = conn.prepared(query) if params is not None else conn.raw.cursor()
+                    try:
+                        cursor.execute(query, params)
+                        rows = cursor.fetchall() if cursor.with_rows else None
+                        if commit:
+                            conn.raw.commit()
+                        if fetch:
+                            return [dict(zip(cursor.column_names, row)) for row in rows or []]
+                        return cursor.rowcount if commit else None  # For INSERT/UPDATE/DELETE, return rows affected
+                    except self.driver.Error:
+                        if commit:
+                            conn.raw.rollback()  # Rollback in case of error
+                        raise
+                    finally:
+                        if params is None:
+                            cursor.close()
+            except (self.driver.OperationalError, self.driver.InterfaceError) as e:
+                # Stale connection: it was dropped from the pool, retry once on a fresh one
+                if attempt == 0:
+                    continue
+                print(f"Error executing query: {e}")
+                return None
+            except self.driver.Error as e:
+                print(f"Error executing query: {e}")
+                return None
+
+    def execute_many(self, query, seq_params):
+        """Executes one statement for every parameter tuple, committed together. Returns rows affected."""
         try:
-            cursor = self.connection.cursor(dictionary=True)  # dictionary=True for column names
-            cursor.execute(query, params)
-            if commit:
-                self.connection.commit()
-            if fetch:
-                return cursor.fetchall()
-            return cursor.rowcount if commit else None  # For INSERT/UPDATE/DELETE, return rows affected
-        except Error as e:
-            print(f"Error executing query: {e}")
-            if commit and self.connection:
-                self.connection.rollback()  # Rollback in case of error
+            with self.transaction() as tx:
+                return tx.executemany(query, seq_params)
+        except self.driver.Error as e:
+            print(f"Error executing batch: {e}")
             return None
-        finally:
-            if cursor:
-                cursor.close()
+
+    def record_sale(self, user_id, items, total_amount, discount_amount=0, promotion_id=None):
+        """
+        Insert a sale row and all of its sale_items in one transaction.
+        items are dicts with product_id, quantity and price_at_sale. Returns the new sale id.
+        """
+        with self.transaction() as tx:
+            tx.execute(
+                "INSERT INTO sales (user_id, total_amount, discount_amount, final_amount, promotion_id) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                (user_id, total_amount, discount_amount, total_amount - discount_amount, promotion_id)
+            )
+            sale_id = tx.lastrowid
+            tx.executemany(
+                "INSERT INTO sale_items (sale_id, product_id, quantity, price_at_sale) VALUES (%s, %s, %s, %s)",
+                [(sale_id, i["product_id"], i["quantity"], i["price_at_sale"]) for i in items]
+            )
+            tx.executemany(
+                "UPDATE products SET stock_quantity = GREATEST(stock_quantity - %s, 0) WHERE id = %s",
+                [(i["quantity"], i["product_id"]) for i in items]
+            )
+        return sale_id
+
 
     def create_tables(self):
         """Creates necessary tables in the database if they don't exist."""
@@ -151,7 +399,7 @@ class Database:
             try:
                 self.execute_query(table_sql, commit=True)
                 # print(f"Executed: {table_sql.splitlines()[0].strip()}...")
-            except Error as e:
+            except self.driver.Error as e:
                 print(f"Error creating table: {e}")
 
         # Optional: Add a default admin user if no users exist
@@ -0,0 +1,193 @@
+# gui/common_widgets.py
+import threading
+import tkinter as tk
+from tkinter import ttk
+
+# Extra rows materialized below the visible window
+OVERSCAN_ROWS = 10
+# Milliseconds between checks on a background task
+TASK_POLL_MS = 100
+
+# Event.state bits for Shift and Control
+_EXTEND_SELECTION_MASK = 0x0001 | 0x0004
+
+
+class VirtualTreeview(tk.Frame):
+    """
+    Treeview that only materializes the visible window of rows (plus a small
+    overscan) and re-fills those same items while scrolling, so showing 100k
+    rows costs the same as showing 30.
+
+    Rows are value tuples passed to set_rows(). selection(), item(),
+    get_children(), heading(), column() and bind() behave like ttk.Treeview,
+    with row ids of the form "v<index>" into the current rows.
+    """
+
+    def __init__(self, parent, columns, selectmode="browse", **tree_options):
+        super().__init__(parent)
+        self._rows = []
+        self._first = 0
+        self._visible = 20
+        self._selected = set()
+        self._extend = False
+        self._rendering = False
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", selectmode=selectmode, **tree_options)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+
+        # Our handlers run before any <<TreeviewSelect>> binding made through bind()
+        tag = f"VirtualTreeview{id(self)}"
+        self.tree.bindtags((tag,) + self.tree.bindtags())
+        self.tree.bind_class(tag, "<<TreeviewSelect>>", self._on_select)
+        self.tree.bind_class(tag, "<ButtonPress-1>", self._on_press)
+        self.tree.bind("<Configure>", self._on_configure, add="+")
+        self.tree.bind("<MouseWheel>", self._on_wheel, add="+")
+        self.tree.bind("<Button-4>", lambda e: self.scroll_rows(-3), add="+")
+        self.tree.bind("<Button-5>", lambda e: self.scroll_rows(3), add="+")
+
+    # ---- data ----
+    def set_rows(self, rows):
+        """Replace every row. Selection and scroll position are reset."""
+        self._rows = list(rows)
+        self._selected = set()
+        self._first = 0
+        self._render()
+
+    def __len__(self):
+        return len(self._rows)
+
+    # ---- ttk.Treeview compatible API ----
+    def heading(self, column, **kw):
+        return self.tree.heading(column, **kw)
+
+    def column(self, column, **kw):
+        return self.tree.column(column, **kw)
+
+    def bind(self, sequence=None, func=None, add=None):
+        return self.tree.bind(sequence, func, add)
+
+    def selection(self):
+        return tuple(f"v{i}" for i in sorted(self._selected))
+
+    def get_children(self, item=""):
+        return tuple(f"v{i}" for i in range(len(self._rows)))
+
+    def item(self, row_id, option=None):
+        values = self._rows[int(str(row_id)[1:])]
+        info = {"text": "", "values": list(values)}
+        return info[option] if option else info
+
+    # ---- scrolling ----
+    def yview(self, *args):
+        total = len(self._rows)
+        if not args or total == 0:
+            return
+        if args[0] == "moveto":
+            self._first = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self._visible if args[2] == "pages" else 1)
+            self._first += step
+        self._render()
+
+    def scroll_rows(self, delta):
+        self._first += delta
+        self._render()
+
+    def _on_wheel(self, event):
+        self.scroll_rows(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def _on_configure(self, event):
+        rowheight = ttk.Style().lookup("Treeview", "rowheight") or 20
+        visible = max(1, event.height // int(rowheight))
+        if visible != self._visible:
+            self._visible = visible
+            self._render()
+
+    # ---- selection ----
+    def _on_press(self, event):
+        self._extend = bool(event.state & _EXTEND_SELECTION_MASK)
+
+    def _on_select(self, event):
+        if self._rendering:
+            return "break"
+        window = set(range(self._first, self._first + len(self.tree.get_children())))
+        picked = {self._first + int(iid[1:]) for iid in self.tree.selection()}
+        # Rows scrolled out of view stay selected only while extending with Shift/Ctrl
+        kept = (self._selected - window) if self._extend else set()
+        self._selected = kept | picked
+        self._extend = False
+
+    # ---- rendering ----
+    def _render(self):
+        total = len(self._rows)
+        self._first = max(0, min(self._first, total - self._visible))
+        wanted = min(self._visible + OVERSCAN_ROWS, total - self._first)
+
+        self._rendering = True
+        try:
+            slots = self.tree.get_children()
+            # Reuse existing items: changing values is far cheaper than delete/insert
+            for slot in range(wanted):
+                values = self._rows[self._first + slot]
+                if slot < len(slots):
+                    self.tree.item(slots[slot], values=values)
+                else:
+                    self.tree.insert("", "end", iid=f"s{slot}", values=values)
+            if len(slots) > wanted:
+                self.tree.delete(*slots[wanted:])
+
+            selected = [f"s{i - self._first}" for i in self._selected if self._first <= i < self._first + wanted]
+            self.tree.selection_set(selected)
+            self.tree.yview_moveto(0)
+        finally:
+            # <<TreeviewSelect>> from selection_set is delivered later from the event queue
+            self.after_idle(self._end_render)
+
+        if total:
+            self.scrollbar.set(self._first / total, min(1.0, (self._first + self._visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _end_render(self):
+        self._rendering = False
+
+
+def subscribe_while_alive(widget, backend, topic, callback):
+    """Subscribe callback to backend changes on topic until widget is destroyed."""
+    backend.subscribe(topic, callback)
+
+    def on_destroy(event):
+        if event.widget is widget:
+            backend.unsubscribe(topic, callback)
+
+    widget.bind("<Destroy>", on_destroy, add="+")
+
+
+def run_in_background(widget, task, on_done):
+    """
+    Run task() on a worker thread and call on_done(result, error) on the Tk
+    thread when it finishes, unless widget has been destroyed by then.
+    """
+    outcome = {}
+
+    def work():
+        try:
+            outcome["result"] = task()
+        except Exception as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=work, daemon=True)
+    worker.start()
+
+    def poll():
+        if not widget.winfo_exists():
+            return
+        if worker.is_alive():
+            widget.after(TASK_POLL_MS, poll)
+            return
+        on_done(outcome.get("result"), outcome.get("error"))
+
+    widget.after(TASK_POLL_MS, poll)
@@ -1,7 +1,9 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-from utils.helpers import load_json, get_today_date
-import os
+from tkinter import messagebox, filedialog
+from utils.helpers import get_today_date
+from utils.storage import get_backend
+from gui.common_widgets import VirtualTreeview, subscribe_while_alive
+from utils.tracing import span
 
 class DailyFeedbackScreen:
     def __init__(self, root, data_dir=None, frame_parent=None, admin=False):
@@ -21,7 +23,7 @@ class DailyFeedbackScreen:
 
         # Treeview for product-wise sales
         columns = ("Product", "Qty Sold", "Revenue")
-        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings")
+        self.tree = VirtualTreeview(self.frame, columns=columns)
         for col in columns:
             self.tree.heading(col, text=col)
             self.tree.column(col, anchor="center", width=120)
@@ -36,6 +38,8 @@ class DailyFeedbackScreen:
         # Default date
         self.feedback_date = get_today_date()
         self.load_data()
+        # New sales update the figures without pressing Refresh
+        subscribe_while_alive(self.frame, get_backend(self.data_dir), "sales", lambda topic: self.load_data())
 
     def set_feedback_date(self):
         from tkinter.simpledialog import askstring
@@ -45,37 +49,16 @@ class DailyFeedbackScreen:
             self.load_data()
 
     def load_data(self):
-        # Clear tree
-        for i in self.tree.get_children():
-            self.tree.delete(i)
+        with span("feedback_aggregation", date=self.feedback_date) as sp:
+            # Per-day totals come pre-aggregated from the backend, no need to scan all sales
+            rollup = get_backend(self.data_dir).daily_summary(self.feedback_date)
 
-        # Load sales and products
-        sales_path = os.path.join(self.data_dir, "sales.json")
-        products_path = os.path.join(self.data_dir, "products.json")
-        sales = load_json(sales_path)
-        products = load_json(products_path)
+            self.total_revenue_label.config(text=f"EGP {rollup['revenue']:.2f}")
+            self.total_sales_label.config(text=str(rollup["sales_count"]))
 
-        total_revenue = 0
-        total_sales_count = 0
-        product_summary = {}
-
-        for sale in sales:
-            sale_date = sale.get("date", get_today_date())
-            if sale_date == self.feedback_date:
-                total_sales_count += 1
-                total_revenue += sale["total"]
-                for item in sale["items"]:
-                    code = item["barcode"]
-                    if code not in product_summary:
-                        product_summary[code] = {"name": item["name"], "qty": 0, "revenue": 0}
-                    product_summary[code]["qty"] += item["quantity"]
-                    product_summary[code]["revenue"] += item["price"] * item["quantity"]
-
-        self.total_revenue_label.config(text=f"EGP {total_revenue:.2f}")
-        self.total_sales_label.config(text=str(total_sales_count))
-
-        for code, summary in product_summary.items():
-            self.tree.insert("", "end", values=(summary["name"], summary["qty"], f"EGP {summary['revenue']:.2f}"))
+            self.tree.set_rows((summary["name"], summary["qty"], f"EGP {summary['revenue']:.2f}")
+                               for summary in rollup["products"].values())
+            sp.set(rows=len(rollup["products"]), sales=rollup["sales_count"])
 
     def print_report(self):
         file_path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text files","*.txt")])
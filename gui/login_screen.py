@@ -1,11 +1,11 @@
 import tkinter as tk
 from tkinter import messagebox
-from gui.pos_screen import POSScreen
-from gui.product_management import ProductManagementScreen
-from gui.promo_management import PromoManagementScreen
-from gui.daily_feedback import DailyFeedbackScreen
-from utils.helpers import load_json
-import os
+from utils.storage import get_backend
+from utils.startup_profile import span
+import threading
+
+# Milliseconds between checks on the background password verification
+LOGIN_POLL_MS = 50
 
 class LoginScreen:
     def __init__(self, root, data_dir):
@@ -22,18 +22,39 @@ class LoginScreen:
         self.username_entry.grid(row=0, column=1, pady=5)
         self.password_entry.grid(row=1, column=1, pady=5)
 
-        tk.Button(self.frame, text="Login", font=("Helvetica", 14, "bold"), bg="green", fg="white",
-                  command=self.login).grid(row=2, column=0, columnspan=2, pady=15, ipadx=20)
+        self.login_button = tk.Button(self.frame, text="Login", font=("Helvetica", 14, "bold"), bg="green", fg="white",
+                                      command=self.login)
+        self.login_button.grid(row=2, column=0, columnspan=2, pady=15, ipadx=20)
 
     def login(self):
         username = self.username_entry.get().strip()
         password = self.password_entry.get().strip()
 
-        users_path = os.path.join(self.data_dir, "users.json")
-        users = load_json(users_path)
+        # bcrypt is deliberately slow: verify on a worker thread so the window stays responsive
+        self.login_button.config(state="disabled")
+        backend = get_backend(self.data_dir)
+        result = {}
+
+        def verify():
+            try:
+                result["user"] = backend.authenticate(username, password)
+            except Exception as e:
+                result["error"] = e
+
+        worker = threading.Thread(target=verify, daemon=True)
+        worker.start()
+        self.frame.after(LOGIN_POLL_MS, self._finish_login, worker, result)
 
-        user = next((u for u in users if u.get("username","").strip() == username and u.get("password","").strip() == password), None)
+    def _finish_login(self, worker, result):
+        if worker.is_alive():
+            self.frame.after(LOGIN_POLL_MS, self._finish_login, worker, result)
+            return
+        self.login_button.config(state="normal")
+        if "error" in result:
+            messagebox.showerror("Error", f"Login failed: {result['error']}")
+            return
 
+        user = result.get("user")
         if user:
             messagebox.showinfo("Success", f"Logged in as {user.get('role','User')}")
             # close login UI
@@ -45,14 +66,60 @@ class LoginScreen:
             role = user.get("role","User").strip().lower()
             if role == "admin":
                 # AdminDashboard uses notebook tabs and expects to create its own frames
-                AdminDashboard(self.root, self.data_dir, user)
+                with span("AdminDashboard"):
+                    AdminDashboard(self.root, self.data_dir, user)
             else:
                 # Worker -> open POS screen (standalone frame)
-                POSScreen(self.root, self.data_dir, user=user)
+                with span("gui.pos_screen"):
+                    from gui.pos_screen import POSScreen
+                    POSScreen(self.root, self.data_dir, user=user)
         else:
             messagebox.showerror("Error", "Invalid username or password")
 
 
+# Screens are imported here rather than at module level so that login does not
+# pay for modules (and their qrcode/pywin32 imports) until a tab is opened.
+def _build_pos(dashboard, parent):
+    from gui.pos_screen import POSScreen
+    return POSScreen(dashboard.root, data_dir=dashboard.data_dir, frame_parent=parent, user=dashboard.user)
+
+
+def _build_products(dashboard, parent):
+    from gui.product_management import ProductManagementScreen
+    return ProductManagementScreen(dashboard.root, data_dir=dashboard.data_dir, frame_parent=parent)
+
+
+def _build_promos(dashboard, parent):
+    from gui.promo_management import PromoManagementScreen
+    return PromoManagementScreen(dashboard.root, data_dir=dashboard.data_dir, frame_parent=parent)
+
+
+def _build_feedback(dashboard, parent):
+    from gui.daily_feedback import DailyFeedbackScreen
+    return DailyFeedbackScreen(dashboard.root, data_dir=dashboard.data_dir, frame_parent=parent, admin=True)
+
+
+def _build_reports(dashboard, parent):
+    from gui.sales_reports import SalesReportScreen
+    return SalesReportScreen(dashboard.root, data_dir=dashboard.data_dir, frame_parent=parent)
+
+
+def _build_performance(dashboard, parent):
+    from gui.performance_panel import PerformancePanel
+    return PerformancePanel(dashboard.root, data_dir=dashboard.data_dir, frame_parent=parent)
+
+
+# (tab title, builder) in notebook order
+DASHBOARD_TABS = [
+    ("POS", _build_pos),
+    ("Products", _build_products),
+    ("Promotions", _build_promos),
+    ("Daily Feedback", _build_feedback),
+    ("Reports", _build_reports),
+    ("Performance", _build_performance),
+]
+
+
 class AdminDashboard:
     def __init__(self, root, data_dir, user=None):
         import tkinter.ttk as ttk
@@ -64,16 +131,32 @@ class AdminDashboard:
         self.notebook = ttk.Notebook(root)
         self.notebook.pack(fill="both", expand=True)
 
-        # Create each tab's frame via the screen classes (they return .frame)
-        # Note: the screen classes expect (root, data_dir, frame_parent)
-        # We pass frame_parent=self.notebook so they place their UI inside the notebook tab.
-        self.pos_tab = POSScreen(root, data_dir=self.data_dir, frame_parent=self.notebook, user=self.user).frame
-        self.product_tab = ProductManagementScreen(root, data_dir=self.data_dir, frame_parent=self.notebook).frame
-        self.promo_tab = PromoManagementScreen(root, data_dir=self.data_dir, frame_parent=self.notebook).frame
-        self.feedback_tab = DailyFeedbackScreen(root, data_dir=self.data_dir, frame_parent=self.notebook, admin=True).frame
-
-        # Add tabs
-        self.notebook.add(self.pos_tab, text="POS")
-        self.notebook.add(self.product_tab, text="Products")
-        self.notebook.add(self.promo_tab, text="Promotions")
-        self.notebook.add(self.feedback_tab, text="Daily Feedback")
+        # Each tab starts as an empty frame; the screen is built into it the
+        # first time the tab is selected (screens pack their own .frame into it).
+        self.tab_frames = []
+        self.screens = {}
+        for title, _ in DASHBOARD_TABS:
+            holder = tk.Frame(self.notebook)
+            self.notebook.add(holder, text=title)
+            self.tab_frames.append(holder)
+
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+        # Let the window draw before the first tab is built
+        self.root.after_idle(self._build_tab, 0)
+
+    def _on_tab_changed(self, event=None):
+        self._build_tab(self.notebook.index("current"))
+
+    def _build_tab(self, index):
+        if index in self.screens:
+            return
+        title, builder = DASHBOARD_TABS[index]
+        self.root.config(cursor="watch")
+        self.root.update_idletasks()
+        try:
+            with span(f"tab: {title}"):
+                self.screens[index] = builder(self, self.tab_frames[index])
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not open {title}: {e}")
+        finally:
+            self.root.config(cursor="")
@@ -0,0 +1,38 @@
+# gui/performance_panel.py
+import tkinter as tk
+from utils import tracing
+from gui.common_widgets import VirtualTreeview
+
+# Most recent spans read from the perf log for the table
+MAX_RECORDS = 200000
+
+
+class PerformancePanel:
+    """Admin tab: p50/p95/p99 per traced operation, read from the rotating perf log."""
+
+    def __init__(self, root, data_dir, frame_parent=None):
+        self.root = root
+        self.data_dir = data_dir
+        self.frame = tk.Frame(frame_parent or root, padx=10, pady=10)
+        self.frame.pack(fill="both", expand=True)
+
+        self.status_label = tk.Label(self.frame, text="", font=("Helvetica", 10), fg="gray", justify="left")
+        self.status_label.pack(anchor="w", pady=(0, 5))
+
+        columns = ("Operation", "Count", "p50 ms", "p95 ms", "p99 ms", "Max ms")
+        self.tree = VirtualTreeview(self.frame, columns=columns)
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, anchor="center", width=110)
+        self.tree.pack(fill="both", expand=True, pady=(0, 8))
+
+        tk.Button(self.frame, text="Refresh", command=self.load_stats).pack(anchor="w")
+        self.load_stats()
+
+    def load_stats(self):
+        records = tracing.read_records(self.data_dir, limit=MAX_RECORDS)
+        summary = tracing.summarize(records)
+        self.tree.set_rows((s["op"], s["count"], f"{s['p50']:.2f}", f"{s['p95']:.2f}",
+                            f"{s['p99']:.2f}", f"{s['max']:.2f}") for s in summary)
+        state = "on" if tracing.enabled() else "off (start with --trace or JUSTB_TRACE=1)"
+        self.status_label.config(text=f"Tracing is {state}. {len(records)} span(s) from {tracing.log_path(self.data_dir)}")
@@ -1,21 +1,15 @@
 # gui/pos_screen.py
 import tkinter as tk
-from tkinter import messagebox, ttk, simpledialog
-from utils.helpers import load_json, save_json, get_today_date
-import os
-import tempfile
+from tkinter import messagebox, ttk
+from utils.helpers import get_today_date
+from utils.checkout import CheckoutError, OutOfStock
+from utils.store_client import open_checkout
+from utils.print_spooler import get_print_spooler
+from utils.tracing import span
+import queue
 
-# Try to import win32 printing libs for silent printing on Windows
-try:
-    import win32print
-    import win32ui
-    from win32.lib import win32con
-    import win32api
-    WIN32_AVAILABLE = True
-    WIN32API_AVAILABLE = True
-except Exception:
-    WIN32_AVAILABLE = False
-    WIN32API_AVAILABLE = False
+# Milliseconds between checks for print job status
+PRINT_STATUS_POLL_MS = 500
 
 
 class POSScreen:
@@ -27,7 +21,11 @@ class POSScreen:
         self.frame = tk.Frame(frame_parent or root, padx=10, pady=10)
         self.frame.pack(fill="both", expand=True)
 
-        self.cart = []
+        # All checkout rules live in the engine (local, or the shared store server);
+        # this screen only shows and asks
+        self.engine = open_checkout(data_dir, self.user_name)
+        self.cart = self.engine.cart
+        self.cart.subscribe(self._on_cart_change)
 
         # Barcode entry
         tk.Label(self.frame, text="Barcode:", font=("Helvetica", 12, "bold")).grid(row=0, column=0, pady=5, sticky="e")
@@ -64,11 +62,10 @@ class POSScreen:
         tk.Button(self.frame, text="Finalize Sale", command=self.finalize_sale, bg="green", fg="white").grid(row=4, column=0, pady=10)
         tk.Button(self.frame, text="Clear Cart", command=self.clear_cart, bg="red", fg="white").grid(row=4, column=1, pady=10)
 
-    def _products_path(self):
-        return os.path.join(self.data_dir, "products.json")
-
-    def _sales_path(self):
-        return os.path.join(self.data_dir, "sales.json")
+        # Receipt printing runs in the background; results show up here instead of popups
+        self.print_status_label = tk.Label(self.frame, text="", font=("Helvetica", 10), fg="gray")
+        self.print_status_label.grid(row=5, column=0, columnspan=3, sticky="w")
+        self.frame.after(PRINT_STATUS_POLL_MS, self._poll_print_status)
 
     def add_to_cart(self):
         """Add product to cart: check barcode exists -> ask only for quantity -> ensure stock limits."""
@@ -76,109 +73,83 @@ class POSScreen:
         if not barcode:
             return
 
-        products = load_json(self._products_path())
-        product = next((p for p in products if str(p.get("barcode", "")) == barcode), None)
-        if not product:
-            messagebox.showerror("Error", "Product not in inventory. Add it first in Products tab.")
-            self.barcode_entry.delete(0, tk.END)
-            return
-
-        # Available and already-in-cart quantities
-        available_qty = int(product.get("quantity", 0))
-        in_cart_qty = sum(item["quantity"] for item in self.cart if item["barcode"] == barcode)
-        remaining = max(0, available_qty - in_cart_qty)
-        if remaining <= 0:
-            messagebox.showinfo("Info", f"Cannot add more. Only {available_qty} available.")
-            self.barcode_entry.delete(0, tk.END)
-            return
-
-        # Ask how many to add (bulk add) - only quantity prompt
-        qty = simpledialog.askinteger("Quantity", f"How many to add? (max {remaining})", minvalue=1, maxvalue=remaining, parent=self.frame)
-        if qty is None:
+        # Dialogs are left out of the traced time: only our own work counts
+        with span("add_to_cart") as sp:
+            try:
+                product, remaining = self.engine.lookup(barcode)
+
+                # Ask how many to add (bulk add) - only quantity prompt
+                with sp.exclude():
+                    from tkinter import simpledialog
+                    qty = simpledialog.askinteger("Quantity", f"How many to add? (max {remaining})", minvalue=1, maxvalue=remaining, parent=self.frame)
+                if qty is not None:
+                    # The cart listener updates the row and total
+                    self.engine.scan(barcode, qty)
+                    sp.set(rows=len(self.cart))
+            except OutOfStock as e:
+                with sp.exclude():
+                    messagebox.showinfo("Info", str(e))
+            except CheckoutError as e:
+                with sp.exclude():
+                    messagebox.showerror("Error", str(e))
             self.barcode_entry.delete(0, tk.END)
-            return
-
-        # Add / increase in cart
-        for item in self.cart:
-            if item["barcode"] == barcode:
-                item["quantity"] += qty
-                self.update_tree()
-                self.update_total()
-                self.barcode_entry.delete(0, tk.END)
-                return
 
-        self.cart.append({
-            "barcode": product["barcode"],
-            "name": product["name"],
-            "price": float(product["price"]),
-            "quantity": qty
-        })
-        self.update_tree()
+    def _on_cart_change(self, event, barcode, line):
+        """Apply one cart change to the tree: only the affected row is touched."""
+        if event == "added":
+            self.tree.insert("", "end", iid=barcode, values=self._row_values(line))
+        elif event == "updated":
+            self.tree.item(barcode, values=self._row_values(line))
+        elif event == "removed":
+            self.tree.delete(barcode)
+        elif event == "cleared":
+            self.tree.delete(*self.tree.get_children())
         self.update_total()
-        self.barcode_entry.delete(0, tk.END)
 
-    def update_tree(self):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        for item in self.cart:
-            total = float(item["price"]) * int(item["quantity"])
-            self.tree.insert("", "end", values=(item["name"], item["quantity"], f"{float(item['price']):.2f}", f"{total:.2f}"))
+    def _row_values(self, line):
+        total = line["price"] * line["quantity"]
+        return (line["name"], line["quantity"], f"{line['price']:.2f}", f"{total:.2f}")
 
-    def update_total(self, discount=0):
-        total = sum(float(i["price"]) * int(i["quantity"]) for i in self.cart)
-        total_after_discount = total * (1 - float(discount)/100.0)
-        self.total_label.config(text=f"Grand Total: EGP {total_after_discount:.2f}")
+    def update_total(self):
+        self.total_label.config(text=f"Grand Total: EGP {self.cart.total:.2f}")
 
     def apply_promo(self):
         code = self.promo_entry.get().strip()
-        promo_path = os.path.join(self.data_dir, "promo_codes.json")
-        promos = load_json(promo_path)
-        promo = next((p for p in promos if p.get("code") == code and int(p.get("uses_left", 0)) > 0), None)
-        if not promo:
-            messagebox.showerror("Error", "Invalid promo code")
+        try:
+            with span("apply_promo"):
+                promo = self.engine.apply_promo(code)
+        except CheckoutError as e:
+            messagebox.showerror("Error", str(e))
             return
-        self.update_total(discount=float(promo.get("discount_percentage", 0)))
         messagebox.showinfo("Success", f"Promo applied: {promo.get('discount_percentage', 0)}% off")
 
     def finalize_sale(self):
         if not self.cart:
             return
 
-        # Decrease inventory
-        products = load_json(self._products_path())
-        for item in self.cart:
-            prod = next((p for p in products if str(p.get("barcode", "")) == str(item["barcode"])), None)
-            if prod:
-                prod["quantity"] = max(0, int(prod.get("quantity", 0)) - int(item["quantity"]))
-        save_json(self._products_path(), products)
-
-        # Save sale
-        sales = load_json(self._sales_path())
-        sale_id = len(sales) + 1
-        total = sum(float(i["price"]) * int(i["quantity"]) for i in self.cart)
-        sale_record = {
-            "id": sale_id,
-            "user": self.user_name,
-            "items": self.cart,
-            "total": total,
-            "date": get_today_date()
-        }
-        sales.append(sale_record)
-        save_json(self._sales_path(), sales)
+        with span("finalize_sale", rows=len(self.cart)) as sp:
+            # Decrease inventory and record the sale through the engine
+            try:
+                sale_id, sale_record = self.engine.commit()
+            except CheckoutError as e:
+                with sp.exclude():
+                    messagebox.showerror("Error", f"Sale not recorded: {e}")
+                return
 
-        # Print receipt directly (NO SAVE POPUP)
-        self.print_receipt_direct(sale_id, sale_record)
-        self.clear_cart()
+            # Print receipt directly (NO SAVE POPUP)
+            self.print_receipt_direct(sale_id, sale_record)
 
     def clear_cart(self):
-        self.cart = []
-        self.update_tree()
-        self.update_total()
+        try:
+            self.engine.clear()
+        except CheckoutError as e:
+            messagebox.showerror("Error", str(e))
 
     def print_receipt_direct(self, sale_id, sale_record):
         """
-        Auto-print receipt to a connected receipt printer using pywin32 when available.
-        Falls back gracefully if no printer is connected - saves receipt to file instead.
+        Queue the receipt on the background print spooler and return immediately.
+        The spooler prints to the connected receipt printer when available, otherwise
+        it saves the receipt to the receipts folder; the outcome appears in the status line.
         """
         receipt_lines = [
             f"Receipt #{sale_id} - {get_today_date()}", 
@@ -193,76 +164,25 @@ class POSScreen:
         receipt_lines.append(f"Grand Total: EGP {total:.2f}")
         receipt_lines.append("\nThank you for shopping with JustB!")
 
-        # Check if printer is available
-        printer_available = False
-        if WIN32_AVAILABLE:
-            try:
-                default_printer = win32print.GetDefaultPrinter()
-                if default_printer:
-                    printer_available = True
-            except Exception:
-                printer_available = False
-
-        # If no printer, save receipt and notify user
-        if not printer_available:
-            try:
-                # Save receipt to a receipts folder
-                receipts_folder = os.path.join(self.data_dir, "receipts")
-                if not os.path.exists(receipts_folder):
-                    os.makedirs(receipts_folder)
-                
-                receipt_filename = f"receipt_{sale_id}_{get_today_date()}.txt"
-                receipt_path = os.path.join(receipts_folder, receipt_filename)
-                
-                with open(receipt_path, 'w', encoding='utf-8') as f:
-                    f.write("\n".join(receipt_lines))
-                
-                messagebox.showwarning("No Printer", 
-                    f"Sale completed!\n\nNo printer detected. Receipt saved to:\n{receipt_path}")
-                return
-            except Exception as e:
-                messagebox.showwarning("Warning", 
-                    f"Sale completed!\n\nNo printer detected and could not save receipt: {e}")
-                return
-
-        # Write to a temporary file for printing
-        temp = None
+        text = "\n".join(receipt_lines)
         try:
-            temp = tempfile.NamedTemporaryFile(delete=False, suffix=".txt", mode='w', encoding='utf-8')
-            temp.write("\n".join(receipt_lines))
-            temp.close()
-
-            # Try win32api for silent printing
-            if WIN32API_AVAILABLE:
-                try:
-                    win32api.ShellExecute(0, "print", temp.name, None, ".", 0)
-                    messagebox.showinfo("Success", "Sale completed! Receipt printed.")
-                    return
-                except Exception as e:
-                    print("win32api print failed:", e)
-
-            # Fallback: use the Windows print command
-            import subprocess
-            try:
-                subprocess.run(['cmd', '/c', f'print "{temp.name}"'], capture_output=True, timeout=10)
-                messagebox.showinfo("Success", "Sale completed! Receipt printed (fallback).")
-            except Exception as e:
-                # Save receipt as backup
-                receipts_folder = os.path.join(self.data_dir, "receipts")
-                if not os.path.exists(receipts_folder):
-                    os.makedirs(receipts_folder)
-                receipt_filename = f"receipt_{sale_id}_{get_today_date()}.txt"
-                receipt_path = os.path.join(receipts_folder, receipt_filename)
-                with open(receipt_path, 'w', encoding='utf-8') as f:
-                    f.write("\n".join(receipt_lines))
-                messagebox.showwarning("Print Failed", 
-                    f"Sale completed!\n\nPrinting failed: {e}\n\nReceipt saved to:\n{receipt_path}")
-
+            with span("print_receipt_direct", rows=len(sale_record["items"]), bytes=len(text)):
+                get_print_spooler(self.data_dir).submit(f"receipt_{sale_id}_{get_today_date()}", text)
+            self.print_status_label.config(text=f"Sale #{sale_id} completed. Printing receipt...", fg="gray")
         except Exception as e:
-            messagebox.showwarning("Error", f"Sale completed but receipt handling failed: {e}")
-        finally:
-            try:
-                if temp is not None:
-                    os.remove(temp.name)
-            except Exception:
-                pass
\ No newline at end of file
+            messagebox.showwarning("Warning", f"Sale completed but the receipt could not be queued: {e}")
+
+    def _poll_print_status(self):
+        """Show print job results posted by the spooler thread."""
+        status_queue = get_print_spooler(self.data_dir).status_queue
+        try:
+            while True:
+                job_id, status, message = status_queue.get_nowait()
+                color = {"printed": "green", "saved": "orange"}.get(status, "red")
+                self.print_status_label.config(text=message, fg=color)
+        except queue.Empty:
+            pass
+        try:
+            self.frame.after(PRINT_STATUS_POLL_MS, self._poll_print_status)
+        except tk.TclError:
+            pass  # screen destroyed
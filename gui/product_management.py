@@ -1,16 +1,30 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-from utils.helpers import load_json, save_json
+from tkinter import ttk, messagebox, filedialog
 import os
+from datetime import date, datetime, timedelta
+from utils.storage import get_backend
+from utils.catalog import validate_product
+from utils.product_csv import import_products, export_products
+from utils.product_index import ProductSearchIndex
+from utils.labels import LABELS_DIR, make_label_sheets, product_label
+from gui.common_widgets import VirtualTreeview, subscribe_while_alive, run_in_background
 import tempfile
 import subprocess
 
-# Try to import win32api for printing
-try:
-    import win32api
-    WIN32_AVAILABLE = True
-except ImportError:
-    WIN32_AVAILABLE = False
+# Milliseconds of typing pause before the search runs
+SEARCH_DEBOUNCE_MS = 200
+# Days of stock movements shown in the history popup
+STOCK_HISTORY_DAYS = 90
+# Row errors listed after a CSV import (the rest are counted)
+IMPORT_ERRORS_SHOWN = 15
+
+def _load_win32api():
+    """Import win32api on first print; None when pywin32 is not installed."""
+    try:
+        import win32api
+        return win32api
+    except ImportError:
+        return None
 
 class ProductManagementScreen:
     def __init__(self, root, data_dir, frame_parent=None):
@@ -27,7 +41,7 @@ class ProductManagementScreen:
         
         self.search_entry = tk.Entry(search_frame, font=("Helvetica", 11), width=30)
         self.search_entry.pack(side="left", padx=5)
-        self.search_entry.bind("<KeyRelease>", lambda e: self.search_products())
+        self.search_entry.bind("<KeyRelease>", lambda e: self.schedule_search())
         
         tk.Button(search_frame, text="Clear", command=self.clear_search, bg="gray", fg="white").pack(side="left", padx=5)
         
@@ -39,19 +53,12 @@ class ProductManagementScreen:
         self.search_filter.pack(side="left")
         self.search_filter.bind("<<ComboboxSelected>>", lambda e: self.search_products())
 
-        # Table with vertical scrollbar
-        tree_frame = tk.Frame(self.frame)
-        tree_frame.pack(fill="both", expand=True, pady=(0,8))
-
-        self.tree = ttk.Treeview(tree_frame, columns=("Barcode","Name","Price","Qty"), show="headings", selectmode="extended")
+        # Table with vertical scrollbar (only the visible rows are materialized)
+        self.tree = VirtualTreeview(self.frame, columns=("Barcode","Name","Price","Qty"), selectmode="extended")
         for col in ("Barcode","Name","Price","Qty"):
             self.tree.heading(col, text=col)
             self.tree.column(col, anchor="center", width=140)
-        self.tree.pack(side="left", fill="both", expand=True)
-
-        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=vsb.set)
-        vsb.pack(side="right", fill="y")
+        self.tree.pack(fill="both", expand=True, pady=(0,8))
 
         # Results label
         self.results_label = tk.Label(self.frame, text="", font=("Helvetica", 9), fg="gray")
@@ -64,28 +71,39 @@ class ProductManagementScreen:
         tk.Button(btns, text="Edit Product", command=self.edit_product_popup, bg="orange", fg="white").pack(side="left", padx=5, pady=5)
         tk.Button(btns, text="Delete Product", command=self.delete_product, bg="red", fg="white").pack(side="left", padx=5, pady=5)
         tk.Button(btns, text="Print Product", command=self.print_product, bg="blue", fg="white").pack(side="left", padx=5, pady=5)
+        self.labels_button = tk.Button(btns, text="Print Labels", command=self.print_labels)
+        self.labels_button.pack(side="left", padx=5, pady=5)
+        tk.Button(btns, text="Stock History", command=self.stock_history_popup).pack(side="left", padx=5, pady=5)
+        tk.Button(btns, text="Import CSV", command=self.import_csv).pack(side="left", padx=5, pady=5)
+        tk.Button(btns, text="Export CSV", command=self.export_csv).pack(side="left", padx=5, pady=5)
         tk.Button(btns, text="Refresh", command=self.load_products).pack(side="left", padx=5, pady=5)
 
         self.all_products = []  # Store all products for filtering
+        self.shown_products = []
+        self.search_index = ProductSearchIndex()
+        self._search_job = None
+        self._products_version = None
         self.load_products()
-
-    def _products_path(self):
-        return os.path.join(self.data_dir, "products.json")
+        # Stock changes from the POS tab (or another till) refresh the table
+        subscribe_while_alive(self.frame, get_backend(self.data_dir), "products", self._on_products_changed)
 
     def load_products(self):
-        """Load all products from JSON file"""
-        self.all_products = load_json(self._products_path())
-        self.display_products(self.all_products)
+        """Load all products from the storage backend"""
+        backend = get_backend(self.data_dir)
+        self._products_version = backend.version("products")
+        self.all_products = backend.list_products()
+        self.search_index = ProductSearchIndex(self.all_products)
+        self.search_products()
+
+    def _on_products_changed(self, topic):
+        # Our own edits already updated the table in place
+        if get_backend(self.data_dir).version("products") != self._products_version:
+            self.load_products()
 
     def display_products(self, products):
         """Display products in the treeview"""
-        # Clear table
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        
-        # Add products to table
-        for p in products:
-            self.tree.insert("", "end", values=(p["barcode"], p["name"], p["price"], p.get("quantity", 0)))
+        self.shown_products = products
+        self.tree.set_rows((p["barcode"], p["name"], p["price"], p.get("quantity", 0)) for p in products)
         
         # Update results label
         total = len(self.all_products)
@@ -95,41 +113,23 @@ class ProductManagementScreen:
         else:
             self.results_label.config(text=f"Showing {shown} of {total} product(s)")
 
+    def schedule_search(self, delay_ms=SEARCH_DEBOUNCE_MS):
+        """Debounce keystrokes: run one search once typing pauses"""
+        if self._search_job is not None:
+            self.frame.after_cancel(self._search_job)
+        self._search_job = self.frame.after(delay_ms, self.search_products)
+
     def search_products(self):
         """Filter products based on search query"""
+        self._search_job = None
         query = self.search_entry.get().strip().lower()
         filter_by = self.search_filter.get()
-        
+
         if not query:
             self.display_products(self.all_products)
             return
-        
-        filtered = []
-        
-        for product in self.all_products:
-            barcode = str(product.get("barcode", "")).lower()
-            name = str(product.get("name", "")).lower()
-            price = str(product.get("price", "")).lower()
-            qty = str(product.get("quantity", 0)).lower()
-            
-            # Check based on filter selection
-            if filter_by == "All":
-                if query in barcode or query in name or query in price or query in qty:
-                    filtered.append(product)
-            elif filter_by == "Barcode":
-                if query in barcode:
-                    filtered.append(product)
-            elif filter_by == "Name":
-                if query in name:
-                    filtered.append(product)
-            elif filter_by == "Price":
-                if query in price:
-                    filtered.append(product)
-            elif filter_by == "Quantity":
-                if query in qty:
-                    filtered.append(product)
-        
-        self.display_products(filtered)
+
+        self.display_products(self.search_index.search(query, filter_by))
 
     def clear_search(self):
         """Clear search and show all products"""
@@ -160,53 +160,28 @@ class ProductManagementScreen:
         qty_entry.grid(row=3, column=1, padx=6, pady=6)
 
         def save_product():
-            barcode = barcode_entry.get().strip()
-            name = name_entry.get().strip()
-            price_raw = price_entry.get().strip()
-            qty_raw = qty_entry.get().strip()
-
-            if not barcode:
-                messagebox.showerror("Error", "Barcode is required")
-                return
-            if not name:
-                messagebox.showerror("Error", "Name is required")
-                return
-            try:
-                price = float(price_raw)
-                if price < 0:
-                    raise ValueError
-            except Exception:
-                messagebox.showerror("Error", "Price must be a non-negative number")
-                return
             try:
-                qty = int(qty_raw)
-                if qty < 0:
-                    raise ValueError
-            except Exception:
-                messagebox.showerror("Error", "Quantity must be a non-negative integer")
+                product = validate_product(barcode_entry.get(), name_entry.get(), price_entry.get(), qty_entry.get())
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
                 return
 
-            products_path = self._products_path()
-            products = load_json(products_path)
+            backend = get_backend(self.data_dir)
 
             # Check if barcode already exists
-            existing = next((p for p in products if p["barcode"] == barcode), None)
+            existing = backend.get_product(product["barcode"])
             if existing:
                 messagebox.showerror("Error", "Product with this barcode already exists! Use Edit to modify it.")
                 return
 
             # Add new product
-            products.append({
-                "barcode": barcode,
-                "name": name,
-                "price": price,
-                "quantity": qty
-            })
-
-            save_json(products_path, products)
+            backend.add_product(product)
+            self._products_version = backend.version("products")
             messagebox.showinfo("Success", "Product added successfully")
             popup.destroy()
-            self.load_products()
+            self.all_products.append(product)
+            self.search_index.add(product)
+            self.search_products()
 
         tk.Button(popup, text="Save", command=save_product, bg="green", fg="white").grid(row=4, column=0, columnspan=2, pady=10)
 
@@ -254,55 +229,33 @@ class ProductManagementScreen:
         qty_entry.grid(row=3, column=1, padx=6, pady=6)
 
         def update_product():
-            new_barcode = barcode_entry.get().strip()
-            new_name = name_entry.get().strip()
-            price_raw = price_entry.get().strip()
-            qty_raw = qty_entry.get().strip()
-
-            if not new_barcode:
-                messagebox.showerror("Error", "Barcode is required")
-                return
-            if not new_name:
-                messagebox.showerror("Error", "Name is required")
-                return
-            try:
-                new_price = float(price_raw)
-                if new_price < 0:
-                    raise ValueError
-            except Exception:
-                messagebox.showerror("Error", "Price must be a non-negative number")
-                return
             try:
-                new_qty = int(qty_raw)
-                if new_qty < 0:
-                    raise ValueError
-            except Exception:
-                messagebox.showerror("Error", "Quantity must be a non-negative integer")
+                fields = validate_product(barcode_entry.get(), name_entry.get(), price_entry.get(), qty_entry.get())
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
                 return
+            new_barcode = fields["barcode"]
 
-            products_path = self._products_path()
-            products = load_json(products_path)
+            backend = get_backend(self.data_dir)
 
             # Check if new barcode conflicts with another product
             if new_barcode != old_barcode:
-                conflict = next((p for p in products if p["barcode"] == new_barcode), None)
+                conflict = backend.get_product(new_barcode)
                 if conflict:
                     messagebox.showerror("Error", "Another product already has this barcode!")
                     return
 
-            # Find and update the product
-            for p in products:
-                if p["barcode"] == old_barcode:
-                    p["barcode"] = new_barcode
-                    p["name"] = new_name
-                    p["price"] = new_price
-                    p["quantity"] = new_qty
-                    break
+            # Update the product in storage, then in the table's copy
+            backend.update_product(old_barcode, fields)
+            self._products_version = backend.version("products")
+            p = self.search_index.get(old_barcode)
+            if p is not None:
+                p.update(fields)
+                self.search_index.update(old_barcode, p)
 
-            save_json(products_path, products)
             messagebox.showinfo("Success", "Product updated successfully")
             popup.destroy()
-            self.load_products()
+            self.search_products()
 
         tk.Button(popup, text="Update", command=update_product, bg="orange", fg="white").grid(row=4, column=0, columnspan=2, pady=10)
 
@@ -315,9 +268,6 @@ class ProductManagementScreen:
         if not messagebox.askyesno("Confirm", "Delete selected product(s)?"):
             return
 
-        products_path = self._products_path()
-        products = load_json(products_path)
-
         # Collect barcodes to remove
         barcodes_to_remove = set()
         for sel in selected:
@@ -325,13 +275,138 @@ class ProductManagementScreen:
             if vals:
                 barcodes_to_remove.add(str(vals[0]))
 
-        # Filter products
-        new_products = [p for p in products if str(p.get("barcode", "")) not in barcodes_to_remove]
-        save_json(products_path, new_products)
+        backend = get_backend(self.data_dir)
+        backend.delete_products(barcodes_to_remove)
+        self._products_version = backend.version("products")
 
-        self.load_products()
+        for barcode in barcodes_to_remove:
+            self.search_index.remove(barcode)
+        self.all_products = [p for p in self.all_products if str(p.get("barcode", "")) not in barcodes_to_remove]
+        self.search_products()
         messagebox.showinfo("Success", "Product(s) deleted")
 
+    def import_csv(self):
+        """Add or update products from a CSV with barcode, name, price and quantity columns."""
+        file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not file_path:
+            return
+        try:
+            result = import_products(self.data_dir, file_path)
+        except (OSError, UnicodeDecodeError, ValueError) as e:
+            messagebox.showerror("Error", f"Could not import {file_path}: {e}")
+            return
+        self.load_products()
+
+        errors = result["errors"]
+        message = f"Added {result['added']} and updated {result['updated']} product(s)."
+        if errors:
+            message += f"\n\n{len(errors)} row(s) skipped:\n"
+            message += "\n".join(f"Line {line}: {error}" for line, error in errors[:IMPORT_ERRORS_SHOWN])
+            if len(errors) > IMPORT_ERRORS_SHOWN:
+                message += f"\n... and {len(errors) - IMPORT_ERRORS_SHOWN} more"
+            messagebox.showwarning("Import", message)
+        else:
+            messagebox.showinfo("Import", message)
+
+    def export_csv(self):
+        file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")],
+                                                 initialfile="products.csv")
+        if not file_path:
+            return
+        try:
+            count = export_products(self.data_dir, file_path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not export products: {e}")
+            return
+        messagebox.showinfo("Success", f"{count} product(s) saved as {file_path}")
+
+    def print_labels(self):
+        """One sheet of shelf labels for the selected products, or for every product shown (e.g. an aisle search)."""
+        selected = self.tree.selection()
+        if selected:
+            # Row ids are "v<index>" into the products shown
+            products = [self.shown_products[int(sel[1:])] for sel in selected]
+        else:
+            products = list(self.shown_products)
+            if products and not messagebox.askyesno("Print Labels",
+                                                    f"Print labels for all {len(products)} product(s) shown?"):
+                return
+        if not products:
+            messagebox.showinfo("Info", "No products to print labels for")
+            return
+
+        specs = [product_label(p) for p in products]
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        out_path = os.path.join(self.data_dir, LABELS_DIR, "sheets", f"labels_{stamp}.pdf")
+        self.labels_button.config(state="disabled")
+        self.results_label.config(text=f"Rendering {len(specs)} label(s)...")
+        run_in_background(self.frame, lambda: make_label_sheets(self.data_dir, specs, out_path),
+                          self._labels_done)
+
+    def _labels_done(self, result, error):
+        self.labels_button.config(state="normal")
+        self.display_products(self.shown_products)
+        if error is not None:
+            messagebox.showerror("Error", f"Could not make labels: {error}")
+            return
+        if not result["files"]:
+            messagebox.showinfo("Labels", "No labels to print")
+            return
+        path = result["files"][0]
+        win32api = _load_win32api()
+        if win32api is not None:
+            try:
+                win32api.ShellExecute(0, "print", path, None, ".", 0)
+                messagebox.showinfo("Printed", f"{result['labels']} label(s) sent to printer.")
+                return
+            except Exception as e:
+                print(f"Label printing failed: {e}")
+        messagebox.showinfo("Labels", f"{result['labels']} label(s) saved as {path}")
+
+    def stock_history_popup(self):
+        selected = self.tree.selection()
+        if len(selected) != 1:
+            messagebox.showinfo("Info", "Select one product to see its stock history")
+            return
+        barcode = str(self.tree.item(selected[0])["values"][0])
+        ledger = get_backend(self.data_dir).ledger()
+
+        popup = tk.Toplevel(self.root)
+        popup.title(f"Stock History - {barcode}")
+
+        tk.Label(popup, text=f"Current stock: {ledger.stock(barcode)}", font=("Helvetica", 11, "bold")).grid(
+            row=0, column=0, columnspan=3, sticky="w", padx=6, pady=6)
+        tk.Label(popup, text="Stock on (YYYY-MM-DD):").grid(row=1, column=0, sticky="e", padx=6)
+        date_entry = tk.Entry(popup, width=12)
+        date_entry.insert(0, date.today().isoformat())
+        date_entry.grid(row=1, column=1, sticky="w")
+        as_of_label = tk.Label(popup, text="")
+        as_of_label.grid(row=1, column=3, sticky="w", padx=6)
+
+        def show_as_of():
+            day = date_entry.get().strip()
+            try:
+                date.fromisoformat(day)
+            except ValueError:
+                messagebox.showerror("Error", "Enter the date as YYYY-MM-DD", parent=popup)
+                return
+            as_of_label.config(text=f"{ledger.stock_as_of(day, barcode)} in stock at end of {day}")
+
+        tk.Button(popup, text="Show", command=show_as_of).grid(row=1, column=2, padx=6)
+
+        columns = ("Time", "Kind", "Change", "Reference")
+        tree = VirtualTreeview(popup, columns=columns)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, anchor="center", width=140)
+        tree.grid(row=2, column=0, columnspan=4, padx=6, pady=6)
+        since = (date.today() - timedelta(days=STOCK_HISTORY_DAYS)).isoformat()
+        events = ledger.history(barcode, since=since)
+        tree.set_rows((e["time"].replace("T", " "), e["kind"], f"{e['delta']:+d}", e["ref"] if e["ref"] is not None else "")
+                      for e in reversed(events))
+        tk.Label(popup, text=f"Last {STOCK_HISTORY_DAYS} days, newest first", fg="gray").grid(
+            row=3, column=0, columnspan=4, sticky="w", padx=6, pady=(0, 6))
+
     def print_product(self):
         selected = self.tree.selection()
         if not selected:
@@ -357,7 +432,8 @@ class ProductManagementScreen:
                 temp.write(text)
                 temp.close()
                 
-                if WIN32_AVAILABLE:
+                win32api = _load_win32api()
+                if win32api is not None:
                     # Send directly to printer using win32api
                     win32api.ShellExecute(0, "print", temp.name, None, ".", 0)
                     messagebox.showinfo("Printed", "Product info sent to printer.")
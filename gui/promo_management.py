@@ -1,8 +1,11 @@
+import csv
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-from utils.helpers import load_json, save_json
-import qrcode
-import os
+from datetime import date
+from tkinter import messagebox, filedialog
+from utils.storage import get_backend
+from utils.promotions import generate_codes
+from utils.labels import make_label_sheets, promo_label
+from gui.common_widgets import VirtualTreeview, subscribe_while_alive, run_in_background
 
 class PromoManagementScreen:
     def __init__(self, root, frame_parent=None, data_dir=None):
@@ -11,37 +14,49 @@ class PromoManagementScreen:
         self.frame = tk.Frame(frame_parent or root, padx=10, pady=10)
         self.frame.pack(fill="both", expand=True)
 
-        self.tree = ttk.Treeview(self.frame, columns=("Code", "Discount", "Uses Left"), show="headings")
-        for col in ("Code", "Discount", "Uses Left"):
+        columns = ("Code", "Discount", "Uses Left", "Valid From", "Valid Until", "Active")
+        self.tree = VirtualTreeview(self.frame, columns=columns, selectmode="extended")
+        for col in columns:
             self.tree.heading(col, text=col)
-            self.tree.column(col, anchor="center", width=120)
-        self.tree.grid(row=0, column=0, rowspan=5, padx=10, pady=10)
+            self.tree.column(col, anchor="center", width=100)
+        self.tree.grid(row=0, column=0, rowspan=8, padx=10, pady=10)
         self.tree.bind("<<TreeviewSelect>>", self.load_selected)
 
         tk.Label(self.frame, text="Code").grid(row=0, column=1, sticky="e")
         tk.Label(self.frame, text="Discount %").grid(row=1, column=1, sticky="e")
         tk.Label(self.frame, text="Max Uses").grid(row=2, column=1, sticky="e")
+        tk.Label(self.frame, text="Valid From (YYYY-MM-DD)").grid(row=3, column=1, sticky="e")
+        tk.Label(self.frame, text="Valid Until (YYYY-MM-DD)").grid(row=4, column=1, sticky="e")
 
         self.code_entry = tk.Entry(self.frame)
         self.discount_entry = tk.Entry(self.frame)
         self.max_entry = tk.Entry(self.frame)
+        self.start_entry = tk.Entry(self.frame)
+        self.end_entry = tk.Entry(self.frame)
+        self.active_var = tk.BooleanVar(value=True)
 
         self.code_entry.grid(row=0, column=2)
         self.discount_entry.grid(row=1, column=2)
         self.max_entry.grid(row=2, column=2)
+        self.start_entry.grid(row=3, column=2)
+        self.end_entry.grid(row=4, column=2)
+        tk.Checkbutton(self.frame, text="Active", variable=self.active_var).grid(row=5, column=2, sticky="w")
 
-        tk.Button(self.frame, text="Add New Code", command=self.add_code).grid(row=3, column=1, pady=5)
-        tk.Button(self.frame, text="Delete Selected Code", command=self.delete_code).grid(row=3, column=2, pady=5)
-        tk.Button(self.frame, text="Generate QR Code", command=self.generate_qr).grid(row=4, column=1, columnspan=2, pady=5)
+        tk.Button(self.frame, text="Add New Code", command=self.add_code).grid(row=6, column=1, pady=5)
+        tk.Button(self.frame, text="Delete Selected Code", command=self.delete_code).grid(row=6, column=2, pady=5)
+        tk.Button(self.frame, text="Generate QR Code", command=self.generate_qr).grid(row=7, column=1, pady=5)
+        tk.Button(self.frame, text="Generate One-Time Codes", command=self.generate_codes).grid(row=7, column=2, pady=5)
+        self.sheet_button = tk.Button(self.frame, text="QR Sheet for Selected", command=self.generate_qr_sheet)
+        self.sheet_button.grid(row=8, column=1, columnspan=2, pady=5)
 
         self.load_codes()
+        subscribe_while_alive(self.frame, get_backend(self.data_dir), "promos", lambda topic: self.load_codes())
 
     def load_codes(self):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        promos = load_json(os.path.join(self.data_dir, "promo_codes.json"))
-        for promo in promos:
-            self.tree.insert("", "end", values=(promo["code"], promo["discount_percentage"], promo["uses_left"]))
+        promos = get_backend(self.data_dir).list_promos()
+        self.tree.set_rows((promo["code"], promo["discount_percentage"], promo["uses_left"],
+                            promo.get("start_date", ""), promo.get("end_date", ""),
+                            "Yes" if promo.get("is_active", True) else "No") for promo in promos)
 
     def load_selected(self, event):
         selected = self.tree.selection()
@@ -53,29 +68,100 @@ class PromoManagementScreen:
             self.discount_entry.insert(0, values[1])
             self.max_entry.delete(0, tk.END)
             self.max_entry.insert(0, values[2])
+            self.start_entry.delete(0, tk.END)
+            self.start_entry.insert(0, values[3])
+            self.end_entry.delete(0, tk.END)
+            self.end_entry.insert(0, values[4])
+            self.active_var.set(values[5] == "Yes")
 
     def add_code(self):
         code = self.code_entry.get().strip()
-        discount = float(self.discount_entry.get().strip())
-        max_uses = int(self.max_entry.get().strip())
-        if not all([code, discount, max_uses]):
+        if not all([code, self.discount_entry.get().strip(), self.max_entry.get().strip()]):
             messagebox.showerror("Error", "All fields required")
             return
-        promos = load_json(os.path.join(self.data_dir, "promo_codes.json"))
-        promos.append({"code": code, "discount_percentage": discount, "max_uses": max_uses, "uses_left": max_uses})
-        save_json(os.path.join(self.data_dir, "promo_codes.json"), promos)
+        try:
+            discount = float(self.discount_entry.get().strip())
+            max_uses = int(self.max_entry.get().strip())
+        except ValueError:
+            messagebox.showerror("Error", "Discount must be a number and Max Uses a whole number")
+            return
+        if not 0 < discount <= 100 or max_uses < 1:
+            messagebox.showerror("Error", "Discount must be above 0 and at most 100, and Max Uses at least 1")
+            return
+        dates = self.read_dates()
+        if dates is None:
+            return
+
+        backend = get_backend(self.data_dir)
+        if backend.get_promo(code):
+            messagebox.showerror("Error", "A promo with this code already exists! Delete it first to replace it.")
+            return
+        promo = {"code": code, "discount_percentage": discount, "max_uses": max_uses, "uses_left": max_uses,
+                 "is_active": self.active_var.get()}
+        promo.update(dates)
+        backend.add_promo(promo)
         messagebox.showinfo("Success", "Promo code added")
         self.load_codes()
 
+    def read_dates(self):
+        """The optional validity dates from the form, or None after reporting a bad one."""
+        dates = {}
+        for field, entry in (("start_date", self.start_entry), ("end_date", self.end_entry)):
+            value = entry.get().strip()
+            if not value:
+                continue
+            try:
+                date.fromisoformat(value)
+            except ValueError:
+                messagebox.showerror("Error", f"Invalid date: {value}. Use YYYY-MM-DD.")
+                return None
+            dates[field] = value
+        if "start_date" in dates and "end_date" in dates and dates["end_date"] < dates["start_date"]:
+            messagebox.showerror("Error", "Valid Until is before Valid From")
+            return None
+        return dates
+
+    def generate_codes(self):
+        from tkinter import simpledialog
+        count = simpledialog.askinteger("One-Time Codes", "How many codes?", minvalue=1, maxvalue=1000000,
+                                        parent=self.root)
+        if not count:
+            return
+        discount = simpledialog.askfloat("One-Time Codes", "Discount %:", minvalue=0.01, maxvalue=100,
+                                         parent=self.root)
+        if not discount:
+            return
+        dates = self.read_dates()
+        if dates is None:
+            return
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV Files", "*.csv")],
+            title="Save Generated Codes As",
+            initialfile=f"promo_codes_{count}.csv"
+        )
+        if not file_path:
+            return
+
+        backend = get_backend(self.data_dir)
+        existing = [p["code"] for p in backend.list_promos()]
+        promos = generate_codes(count, discount, start_date=dates.get("start_date"),
+                                end_date=dates.get("end_date"), existing=existing)
+        backend.add_promos(promos)
+        with open(file_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["code", "discount_percentage"])
+            writer.writerows((p["code"], p["discount_percentage"]) for p in promos)
+        messagebox.showinfo("Success", f"{count} one-time codes added and saved to:\n{file_path}")
+        self.load_codes()
+
     def delete_code(self):
         selected = self.tree.selection()
         if not selected:
             messagebox.showerror("Error", "Select a code first")
             return
         code = self.tree.item(selected[0])["values"][0]
-        promos = load_json(os.path.join(self.data_dir, "promo_codes.json"))
-        promos = [p for p in promos if p["code"] != code]
-        save_json(os.path.join(self.data_dir, "promo_codes.json"), promos)
+        get_backend(self.data_dir).delete_promo(str(code))
         messagebox.showinfo("Success", "Promo code deleted")
         self.load_codes()
 
@@ -95,6 +181,36 @@ class PromoManagementScreen:
         if not file_path:
             return
 
+        import qrcode  # imported on first use: it pulls in PIL
         qr_img = qrcode.make(code)
         qr_img.save(file_path)
         messagebox.showinfo("Success", f"QR Code saved at:\n{file_path}")
+
+    def generate_qr_sheet(self):
+        """Printable sheets with a QR coupon for each selected code."""
+        selected = self.tree.selection()
+        if not selected:
+            messagebox.showerror("Error", "Select one or more codes first")
+            return
+        backend = get_backend(self.data_dir)
+        promos = [backend.get_promo(str(self.tree.item(sel)["values"][0])) for sel in selected]
+        specs = [promo_label(promo) for promo in promos if promo]
+
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".pdf",
+            filetypes=[("PDF Files", "*.pdf"), ("PNG Files", "*.png")],
+            title="Save QR Sheet As",
+            initialfile=f"promo_codes_{date.today().isoformat()}.pdf"
+        )
+        if not file_path:
+            return
+        self.sheet_button.config(state="disabled")
+        run_in_background(self.frame, lambda: make_label_sheets(self.data_dir, specs, file_path),
+                          self._qr_sheet_done)
+
+    def _qr_sheet_done(self, result, error):
+        self.sheet_button.config(state="normal")
+        if error is not None:
+            messagebox.showerror("Error", f"Could not make the QR sheet: {error}")
+            return
+        messagebox.showinfo("Success", f"{result['labels']} QR code(s) saved at:\n" + "\n".join(result["files"]))
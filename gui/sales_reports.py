@@ -0,0 +1,111 @@
+# gui/sales_reports.py
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from datetime import date
+
+from utils.helpers import get_today_date
+from utils.reports import period_bounds, period_report
+from utils.storage import get_backend
+from gui.common_widgets import VirtualTreeview, subscribe_while_alive
+
+
+class SalesReportScreen:
+    """Admin tab: revenue per day, units per product and basket size for a week, month or date range."""
+
+    def __init__(self, root, data_dir, frame_parent=None):
+        self.root = root
+        self.data_dir = data_dir
+        self.report = None
+        self.frame = tk.Frame(frame_parent or root, padx=10, pady=10)
+        self.frame.pack(fill="both", expand=True)
+
+        controls = tk.Frame(self.frame)
+        controls.pack(fill="x", pady=(0, 8))
+        tk.Label(controls, text="Period:").pack(side="left")
+        self.period_var = tk.StringVar(value="Week")
+        period_box = ttk.Combobox(controls, textvariable=self.period_var, state="readonly", width=8,
+                                  values=["Day", "Week", "Month", "Custom"])
+        period_box.pack(side="left", padx=5)
+        period_box.bind("<<ComboboxSelected>>", lambda e: self.on_period_changed())
+        tk.Label(controls, text="From:").pack(side="left")
+        self.start_entry = tk.Entry(controls, width=12)
+        self.start_entry.pack(side="left", padx=5)
+        tk.Label(controls, text="To:").pack(side="left")
+        self.end_entry = tk.Entry(controls, width=12)
+        self.end_entry.pack(side="left", padx=5)
+        tk.Button(controls, text="Show", command=self.load_report).pack(side="left", padx=5)
+        tk.Button(controls, text="Export", command=self.export_report).pack(side="left")
+
+        self.summary_label = tk.Label(self.frame, text="", font=("Helvetica", 11), justify="left")
+        self.summary_label.pack(anchor="w", pady=(0, 8))
+
+        tables = tk.Frame(self.frame)
+        tables.pack(fill="both", expand=True)
+        day_columns = ("Date", "Sales", "Units", "Revenue")
+        self.day_tree = VirtualTreeview(tables, columns=day_columns)
+        for col in day_columns:
+            self.day_tree.heading(col, text=col)
+            self.day_tree.column(col, anchor="center", width=100)
+        self.day_tree.pack(side="left", fill="both", expand=True, padx=(0, 5))
+        product_columns = ("Product", "Barcode", "Qty Sold", "Revenue")
+        self.product_tree = VirtualTreeview(tables, columns=product_columns)
+        for col in product_columns:
+            self.product_tree.heading(col, text=col)
+            self.product_tree.column(col, anchor="center", width=120)
+        self.product_tree.pack(side="left", fill="both", expand=True)
+
+        self.on_period_changed()
+        subscribe_while_alive(self.frame, get_backend(self.data_dir), "sales", lambda topic: self.load_report())
+
+    def on_period_changed(self):
+        period = self.period_var.get().lower()
+        if period == "custom":
+            return
+        start, end = period_bounds(period, self.start_entry.get().strip() or get_today_date())
+        for entry, value in ((self.start_entry, start), (self.end_entry, end)):
+            entry.delete(0, tk.END)
+            entry.insert(0, value)
+        self.load_report()
+
+    def load_report(self):
+        start = self.start_entry.get().strip()
+        end = self.end_entry.get().strip() or start
+        try:
+            if date.fromisoformat(end) < date.fromisoformat(start):
+                raise ValueError("To is before From")
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid date range: {e}")
+            return
+        self.report = report = period_report(self.data_dir, start, end)
+        self.summary_label.config(
+            text=f"{report['start']} to {report['end']}:  Revenue EGP {report['revenue']:.2f}  |  "
+                 f"Sales {report['sales_count']}  |  Units {report['units']}  |  "
+                 f"Avg basket {report['avg_basket_units']:.2f} items, EGP {report['avg_basket_value']:.2f}")
+        self.day_tree.set_rows((d["date"], d["sales_count"], d["units"], f"EGP {d['revenue']:.2f}")
+                               for d in report["days"])
+        self.product_tree.set_rows((p["name"], p["barcode"], p["qty"], f"EGP {p['revenue']:.2f}")
+                                   for p in report["products"])
+
+    def export_report(self):
+        if not self.report:
+            return
+        report = self.report
+        file_path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text files", "*.txt")],
+                                                 initialfile=f"report_{report['start']}_{report['end']}.txt")
+        if not file_path:
+            return
+
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(f"Sales Report - {report['start']} to {report['end']}\n")
+            f.write(f"Total Revenue: EGP {report['revenue']:.2f}\n")
+            f.write(f"Total Sales: {report['sales_count']}\n")
+            f.write(f"Units Sold: {report['units']}\n")
+            f.write(f"Average Basket: {report['avg_basket_units']:.2f} items, EGP {report['avg_basket_value']:.2f}\n\n")
+            f.write("Per Day:\n")
+            for d in report["days"]:
+                f.write(f"{d['date']} | Sales: {d['sales_count']} | Units: {d['units']} | Revenue: EGP {d['revenue']:.2f}\n")
+            f.write("\nPer Product:\n")
+            for p in report["products"]:
+                f.write(f"{p['name']} ({p['barcode']}) | Qty: {p['qty']} | Revenue: EGP {p['revenue']:.2f}\n")
+
+        messagebox.showinfo("Success", f"Report saved as {file_path}")
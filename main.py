@@ -1,29 +1,83 @@
+import multiprocessing
+import sys
+from utils.startup_profile import start_profiling, span, write_report
+
+# --profile-startup: report import and construction time per module on exit.
+# The hook has to be installed before anything else is imported.
+PROFILE_STARTUP = "--profile-startup" in sys.argv
+if PROFILE_STARTUP:
+    start_profiling()
+
 import tkinter as tk
 from gui.login_screen import LoginScreen
+from utils.helpers import flush
+from utils.storage import get_backend
+from utils import tracing
+from config import TRACING_ENABLED
 import os
 
 # Client PC data folder path
 DATA_DIR = r"C:\Users\A\Desktop\JustB\data"
 
+# Milliseconds between checks for data changed by other screens or tills
+DATA_POLL_MS = 1000
+
+
+def main():
+    # Initialize root window
+    with span("tk.Tk"):
+        root = tk.Tk()
+    root.title("SMGS")
+
+    # Set window icon
+    icon_path = r"C:\Users\Ziad\OneDrive\Documents\SMGS\WhatsApp Image 2025-12-16 at 12.28.37 AM.ico"
+    if os.path.exists(icon_path):
+        try:
+            root.iconbitmap(icon_path)
+        except Exception as e:
+            print(f"Could not load icon: {e}")
+    else:
+        print(f"Icon file not found at: {icon_path}")
+
+    # Hot-path timings for the admin Performance tab; off by default
+    if TRACING_ENABLED or "--trace" in sys.argv:
+        tracing.enable(DATA_DIR)
+
+    # Pick the storage backend (config.STORAGE_BACKEND) before any screen touches the data
+    with span("storage backend"):
+        get_backend(DATA_DIR)
+
+    def poll_data_changes():
+        # Screens subscribed to the backend refresh from here, on the Tk thread
+        try:
+            get_backend(DATA_DIR).poll_changes()
+        except Exception as e:
+            print(f"Data change check failed: {e}")
+        root.after(DATA_POLL_MS, poll_data_changes)
+
+    root.after(DATA_POLL_MS, poll_data_changes)
+
+    # Launch login screen with forced data path
+    with span("LoginScreen"):
+        LoginScreen(root, DATA_DIR)
+
+    def on_close():
+        # Commit queued saves before the process exits
+        flush()
+        if PROFILE_STARTUP:
+            write_report(os.path.join(DATA_DIR, "startup_profile.txt"))
+        root.destroy()
 
-# Initialize root window
-root = tk.Tk()
-root.title("SMGS")
+    root.protocol("WM_DELETE_WINDOW", on_close)
 
-# Set window icon
-icon_path = r"C:\Users\Ziad\OneDrive\Documents\SMGS\WhatsApp Image 2025-12-16 at 12.28.37 AM.ico"
-if os.path.exists(icon_path):
-    try:
-        root.iconbitmap(icon_path)
-    except Exception as e:
-        print(f"Could not load icon: {e}")
-else:
-    print(f"Icon file not found at: {icon_path}")
+    # Start GUI loop
+    root.mainloop()
 
-# Launch login screen with forced data path
-LoginScreen(root, DATA_DIR)
 
-# Start GUI loop
-root.mainloop()
+if __name__ == "__main__":
+    # Label rendering runs in worker processes; on Windows (and in the packaged
+    # exe) they start by importing this module, which must not open a window
+    multiprocessing.freeze_support()
+    main()
 
 #r"C:\Users\20102\Desktop\JustB\data" this is the original path I will use when the project runs after the testing.
\ No newline at end of file
@@ -1,58 +1,89 @@
-import mysql.connector
 import sqlite3
-import os
-from config import DB_HOST, DB_USER, DB_PASSWORD, DB_NAME
+from database import db
 
 BACKUP_FILE = "backup.db"
 
-def init_backup():
-    if not os.path.exists(BACKUP_FILE):
-        conn = sqlite3.connect(BACKUP_FILE)
-        cursor = conn.cursor()
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS sales (
-            id INTEGER PRIMARY KEY,
-            sale_date TEXT,
-            total_amount REAL
-        )""")
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS sale_items (
-            id INTEGER PRIMARY KEY,
-            sale_id INTEGER,
-            product_id INTEGER,
-            quantity_sold INTEGER,
-            price_per_unit REAL
-        )""")
-        conn.commit()
-        conn.close()
-
-def backup_new_data():
-    init_backup()
-    mysql_conn = mysql.connector.connect(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME)
-    mysql_cursor = mysql_conn.cursor(dictionary=True)
-
-    sqlite_conn = sqlite3.connect(BACKUP_FILE)
-    sqlite_cursor = sqlite_conn.cursor()
-
-    sqlite_cursor.execute("SELECT MAX(id) FROM sales")
-    last_backup_id = sqlite_cursor.fetchone()[0] or 0
-
-    mysql_cursor.execute("SELECT * FROM sales WHERE id > %s", (last_backup_id,))
-    new_sales = mysql_cursor.fetchall()
-
-    for sale in new_sales:
-        sqlite_cursor.execute("INSERT INTO sales (id, sale_date, total_amount) VALUES (?, ?, ?)",
-                              (sale['id'], str(sale['sale_date']), float(sale['total_amount'])))
-        mysql_cursor.execute("SELECT * FROM sale_items WHERE sale_id = %s", (sale['id'],))
-        items = mysql_cursor.fetchall()
-        for item in items:
-            sqlite_cursor.execute("""INSERT INTO sale_items 
-                                     (id, sale_id, product_id, quantity_sold, price_per_unit)
-                                     VALUES (?, ?, ?, ?, ?)""",
-                                  (item['id'], item['sale_id'], item['product_id'],
-                                   item['quantity_sold'], float(item['price_per_unit'])))
-
-    sqlite_conn.commit()
-    sqlite_conn.close()
-    mysql_cursor.close()
-    mysql_conn.close()
+# Sales copied per MySQL round trip / SQLite transaction
+BATCH_SIZE = 1000
+
+def init_backup(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS sales (
+        id INTEGER PRIMARY KEY,
+        sale_date TEXT,
+        total_amount REAL
+    )""")
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS sale_items (
+        id INTEGER PRIMARY KEY,
+        sale_id INTEGER,
+        product_id INTEGER,
+        quantity_sold INTEGER,
+        price_per_unit REAL
+    )""")
+    # High-water mark: the last sale id whose batch was fully committed
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS backup_state (
+        key TEXT PRIMARY KEY,
+        value INTEGER
+    )""")
+    conn.commit()
+
+def _last_backed_up_id(conn):
+    row = conn.execute("SELECT value FROM backup_state WHERE key = 'last_sale_id'").fetchone()
+    if row is not None:
+        return row[0]
+    # Backups made before the high-water mark existed
+    return conn.execute("SELECT MAX(id) FROM sales").fetchone()[0] or 0
+
+def backup_new_data(batch_size=BATCH_SIZE, backup_file=BACKUP_FILE):
+    """
+    Copy sales (and their items) newer than the last backup from MySQL into backup.db.
+    Works in batches: one range query each for sales and sale_items, then one SQLite
+    transaction that also advances the high-water mark, so an interrupted run resumes
+    after the last committed batch. Returns the number of sales copied.
+    """
+    sqlite_conn = sqlite3.connect(backup_file)
+    try:
+        init_backup(sqlite_conn)
+        last_backup_id = _last_backed_up_id(sqlite_conn)
+        copied = 0
+
+        while True:
+            sales = db.execute_query(
+                "SELECT id, sale_date, total_amount FROM sales WHERE id > %s ORDER BY id LIMIT %s",
+                (last_backup_id, batch_size), fetch=True)
+            if sales is None:
+                raise ConnectionError("Could not read sales from MySQL")
+            if not sales:
+                break
+            first_id, last_id = sales[0]["id"], sales[-1]["id"]
+            items = db.execute_query(
+                "SELECT id, sale_id, product_id, quantity, price_at_sale FROM sale_items "
+                "WHERE sale_id BETWEEN %s AND %s",
+                (first_id, last_id), fetch=True)
+            if items is None:
+                raise ConnectionError("Could not read sale_items from MySQL")
+
+            with sqlite_conn:  # one transaction per batch
+                # INSERT OR REPLACE keeps a re-run of a half-copied batch idempotent
+                sqlite_conn.executemany(
+                    "INSERT OR REPLACE INTO sales (id, sale_date, total_amount) VALUES (?, ?, ?)",
+                    [(s["id"], str(s["sale_date"]), float(s["total_amount"])) for s in sales])
+                sqlite_conn.executemany(
+                    """INSERT OR REPLACE INTO sale_items
+                       (id, sale_id, product_id, quantity_sold, price_per_unit)
+                       VALUES (?, ?, ?, ?, ?)""",
+                    [(i["id"], i["sale_id"], i["product_id"], i["quantity"], float(i["price_at_sale"]))
+                     for i in items])
+                sqlite_conn.execute(
+                    "INSERT OR REPLACE INTO backup_state (key, value) VALUES ('last_sale_id', ?)", (last_id,))
+
+            copied += len(sales)
+            last_backup_id = last_id
+            if len(sales) < batch_size:
+                break
+        return copied
+    finally:
+        sqlite_conn.close()
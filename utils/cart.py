@@ -0,0 +1,105 @@
+# utils/cart.py
+
+
+class Cart:
+    """
+    POS cart keyed by barcode, in scan order.
+    Subtotal is maintained as lines change, so totals never re-sum the cart.
+    Listeners are called as listener(event, barcode, line) with event one of
+    "added", "updated", "removed", "cleared" or "discount" (barcode and line
+    are None for the last two).
+    """
+
+    def __init__(self):
+        self._lines = {}
+        self._listeners = []
+        self.subtotal = 0.0
+        self.discount_percentage = 0.0
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _emit(self, event, barcode=None, line=None):
+        for listener in self._listeners:
+            listener(event, barcode, line)
+
+    # ---- lines ----
+    def __len__(self):
+        return len(self._lines)
+
+    def __bool__(self):
+        return bool(self._lines)
+
+    def __iter__(self):
+        return iter(self._lines.values())
+
+    def get(self, barcode):
+        return self._lines.get(str(barcode))
+
+    def quantity_of(self, barcode):
+        line = self._lines.get(str(barcode))
+        return line["quantity"] if line else 0
+
+    def add(self, product, qty):
+        """Add qty of product, merging with an existing line for the same barcode."""
+        barcode = str(product["barcode"])
+        line = self._lines.get(barcode)
+        if line is None:
+            line = {
+                "barcode": product["barcode"],
+                "name": product["name"],
+                "price": float(product["price"]),
+                "quantity": int(qty)
+            }
+            self._lines[barcode] = line
+            self.subtotal += line["price"] * line["quantity"]
+            self._emit("added", barcode, line)
+        else:
+            line["quantity"] += int(qty)
+            self.subtotal += line["price"] * int(qty)
+            self._emit("updated", barcode, line)
+        return line
+
+    def set_quantity(self, barcode, qty):
+        """Set a line's quantity; 0 removes the line."""
+        barcode = str(barcode)
+        line = self._lines[barcode]
+        if qty <= 0:
+            self.remove(barcode)
+            return
+        self.subtotal += line["price"] * (int(qty) - line["quantity"])
+        line["quantity"] = int(qty)
+        self._emit("updated", barcode, line)
+
+    def remove(self, barcode):
+        barcode = str(barcode)
+        line = self._lines.pop(barcode, None)
+        if line is None:
+            return
+        self.subtotal -= line["price"] * line["quantity"]
+        if not self._lines:
+            self.subtotal = 0.0  # drop accumulated float error
+        self._emit("removed", barcode, line)
+
+    def clear(self):
+        self._lines = {}
+        self.subtotal = 0.0
+        self.discount_percentage = 0.0
+        self._emit("cleared")
+
+    def lines(self):
+        """Copies of the cart lines, e.g. for a sale record."""
+        return [dict(line) for line in self._lines.values()]
+
+    # ---- totals ----
+    def set_discount(self, percentage):
+        self.discount_percentage = float(percentage)
+        self._emit("discount")
+
+    @property
+    def discount_amount(self):
+        return self.subtotal * self.discount_percentage / 100.0
+
+    @property
+    def total(self):
+        return self.subtotal - self.discount_amount
@@ -0,0 +1,114 @@
+# utils/catalog.py
+import math
+import os
+import threading
+
+from utils.data_cache import get_data_cache
+from utils.helpers import DataDirRegistry
+
+_catalogs = DataDirRegistry(lambda data_dir: ProductCatalog(os.path.join(data_dir, "products.json")))
+
+
+def get_catalog(data_dir):
+    """Return the shared ProductCatalog for data_dir (one per process)."""
+    return _catalogs.get(data_dir)
+
+
+def validate_product(barcode, name, price, quantity):
+    """
+    The product dict for raw field values (e.g. form entries or CSV cells),
+    checked with the add/edit form rules. Raises ValueError with the message
+    to show the user.
+    """
+    barcode = str(barcode if barcode is not None else "").strip()
+    name = str(name if name is not None else "").strip()
+    if not barcode:
+        raise ValueError("Barcode is required")
+    if not name:
+        raise ValueError("Name is required")
+    try:
+        price = float(str(price).strip())
+        if price < 0 or not math.isfinite(price):
+            raise ValueError
+    except (TypeError, ValueError):
+        raise ValueError("Price must be a non-negative number") from None
+    try:
+        quantity = int(str(quantity).strip())
+        if quantity < 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        raise ValueError("Quantity must be a non-negative integer") from None
+    return {"barcode": barcode, "name": name, "price": price, "quantity": quantity}
+
+
+class ProductCatalog:
+    """
+    barcode -> product index over the products.json list held by the data
+    cache. The index is rebuilt only when the cache hands back a different
+    list, i.e. when the file changed on disk, so scans are plain dict lookups.
+
+    Saved products are replaced (replace()), never edited in place: the
+    write-behind store only copies the list on save, so an edited dict would
+    leak into a write still queued.
+    """
+
+    def __init__(self, products_path):
+        self.products_path = products_path
+        self._lock = threading.RLock()
+        self._products = None
+        self._by_barcode = {}
+        self._positions = {}
+
+    def _reindex(self):
+        self._by_barcode = {}
+        self._positions = {}
+        for i, p in enumerate(self._products):
+            key = str(p.get("barcode", ""))
+            self._by_barcode[key] = p
+            self._positions[key] = i
+
+    def refresh_if_changed(self, force=False):
+        """Reload when the file changed on disk. force skips the cache's check throttle."""
+        with self._lock:
+            products = get_data_cache().get(self.products_path, force=force)
+            if products is not self._products:
+                self._products = products
+                self._reindex()
+
+    def invalidate(self):
+        """Force a reload on the next access."""
+        get_data_cache().invalidate(self.products_path)
+
+    def get(self, barcode):
+        """Return the product dict for barcode, or None."""
+        self.refresh_if_changed()
+        return self._by_barcode.get(str(barcode))
+
+    def all(self):
+        """Return the product list (shared; call save() after adding or removing products)."""
+        self.refresh_if_changed()
+        return self._products
+
+    def replace(self, old, new):
+        """Put the product dict new where old is in the list (e.g. a stock change); call save() after."""
+        with self._lock:
+            key = str(old.get("barcode", ""))
+            i = self._positions.pop(key, None)
+            if i is None or i >= len(self._products) or self._products[i] is not old:
+                # The list was changed without a save(); find old the slow way
+                i = next(i for i, p in enumerate(self._products) if p is old)
+            self._by_barcode.pop(key, None)
+            self._products[i] = new
+            key = str(new.get("barcode", ""))
+            self._by_barcode[key] = new
+            self._positions[key] = i
+
+    def save(self, reindex=True):
+        """
+        Persist the in-memory products through the data cache. reindex=False
+        skips rebuilding the barcode index, for saves after replace() only.
+        """
+        with self._lock:
+            get_data_cache().put(self.products_path, self._products)
+            if reindex:
+                self._reindex()
@@ -0,0 +1,237 @@
+# utils/checkout.py
+from utils.cart import Cart
+from utils.helpers import get_today_date
+from utils.promotions import promo_problem, PromoUnavailable
+from utils.storage import get_backend
+from utils.tracing import span
+
+
+class CheckoutError(Exception):
+    """A scan, promo or commit the engine refused; the message is meant for the cashier."""
+
+
+class UnknownProduct(CheckoutError):
+    def __init__(self, barcode):
+        super().__init__("Product not in inventory. Add it first in Products tab.")
+        self.barcode = barcode
+
+
+class OutOfStock(CheckoutError):
+    def __init__(self, barcode, available, remaining):
+        super().__init__(f"Cannot add more. Only {available} available.")
+        self.barcode = barcode
+        self.available = available
+        self.remaining = remaining
+
+
+class InvalidPromo(CheckoutError):
+    def __init__(self, code, reason=None):
+        super().__init__(f"Promo code {code} {reason}" if reason else "Invalid promo code")
+        self.code = code
+        self.reason = reason
+
+
+def check_quantity(qty):
+    """qty, if it is a whole number of at least 1; otherwise raises CheckoutError."""
+    if isinstance(qty, bool) or not isinstance(qty, int) or qty < 1:
+        raise CheckoutError(f"Quantity must be a whole number of at least 1, not {qty!r}")
+    return qty
+
+
+class StockReservations:
+    """
+    Stock held by open carts, shared by every CheckoutEngine of one process
+    (the store server). A scanned line holds its quantity until the sale is
+    committed or the line is dropped, so two tills cannot sell the same unit.
+    """
+
+    def __init__(self):
+        self._held = {}
+
+    def held(self, barcode):
+        return self._held.get(str(barcode), 0)
+
+    def reserve(self, barcode, qty):
+        key = str(barcode)
+        self._held[key] = self._held.get(key, 0) + check_quantity(qty)
+
+    def release(self, barcode, qty):
+        key = str(barcode)
+        left = self._held.get(key, 0) - int(qty)
+        if left > 0:
+            self._held[key] = left
+        else:
+            self._held.pop(key, None)
+
+
+class CheckoutEngine:
+    """
+    One till's checkout without any UI: scan items into a Cart, apply a promo
+    code and commit the sale through the storage backend. POSScreen is a view
+    over this; the same calls can be driven from scripts and benchmarks.
+    With shared StockReservations, stock held by other carts counts as sold.
+    """
+
+    def __init__(self, data_dir, user_name="Unknown", backend=None, reservations=None):
+        self.data_dir = data_dir
+        self.user_name = user_name
+        self.backend = backend or get_backend(data_dir)
+        self.reservations = reservations
+        self.cart = Cart()
+        self.promo = None
+
+    # ---- scanning ----
+    def lookup(self, barcode):
+        """Return (product, remaining) where remaining is what can still be added to this cart."""
+        product = self.backend.get_product(barcode)
+        if not product:
+            raise UnknownProduct(barcode)
+        available = int(product.get("quantity", 0))
+        # Shared reservations already include this cart's own lines
+        held = self.reservations.held(barcode) if self.reservations else self.cart.quantity_of(barcode)
+        remaining = max(0, available - held)
+        if remaining <= 0:
+            raise OutOfStock(barcode, available, remaining)
+        return product, remaining
+
+    def scan(self, barcode, qty=1):
+        """Add qty of barcode to the cart, within the stock left. Returns the cart line."""
+        check_quantity(qty)
+        product, remaining = self.lookup(barcode)
+        if qty > remaining:
+            raise OutOfStock(barcode, int(product.get("quantity", 0)), remaining)
+        if self.reservations:
+            self.reservations.reserve(barcode, qty)
+        return self.cart.add(product, qty)
+
+    def remove(self, barcode):
+        """Drop a line from the cart and release its stock."""
+        line = self.cart.get(barcode)
+        if line is None:
+            return
+        if self.reservations:
+            self.reservations.release(barcode, line["quantity"])
+        self.cart.remove(barcode)
+
+    # ---- promotions ----
+    def apply_promo(self, code):
+        """
+        Apply a promo code's discount to the cart. Returns the promo. The use
+        is only taken when the sale is committed, so a cart that is abandoned
+        does not burn a one-time code.
+        """
+        promo = self.backend.get_promo(code)
+        problem = promo_problem(promo)
+        if problem:
+            raise InvalidPromo(code, problem)
+        self.cart.set_discount(float(promo.get("discount_percentage", 0)))
+        self.promo = promo
+        return promo
+
+    # ---- committing ----
+    def build_record(self, date=None):
+        """The sale record for the current cart, as stored by the backend."""
+        record = {
+            "user": self.user_name,
+            "items": self.cart.lines(),
+            "total": self.cart.total,
+            "date": date or get_today_date()
+        }
+        if self.cart.discount_amount:
+            record["discount"] = self.cart.discount_amount
+        if self.promo:
+            record["promo_code"] = self.promo["code"]
+        return record
+
+    def commit(self):
+        """Record the sale, decrement stock and start a new cart. Returns (sale_id, record)."""
+        if not self.cart:
+            raise CheckoutError("Cart is empty")
+        record = self.build_record()
+        try:
+            sale_id = self.backend.commit_sale(record)
+        except PromoUnavailable as e:
+            # Used up or expired since it was applied; the cart stays as it is
+            raise InvalidPromo(e.code, e.reason) from e
+        self.clear()
+        return sale_id, record
+
+    def clear(self):
+        """Empty the cart, releasing any stock it held."""
+        if self.reservations:
+            for line in self.cart:
+                self.reservations.release(line["barcode"], line["quantity"])
+        self.cart.clear()
+        self.promo = None
+
+    # ---- batches ----
+    def commit_batch(self, baskets, check_stock=False):
+        """
+        Commit many pre-built baskets in one backend write, e.g. offline sales
+        or test replays. A basket is {"items": [(barcode, qty), ...] or
+        [{"barcode": ..., "quantity": ...}], and optionally "promo", "user",
+        "date"}. Totals are computed exactly as for a scanned cart. With
+        check_stock, baskets that would overdraw stock (counting earlier
+        baskets in the batch) are rejected. Returns (sale_ids, errors) where
+        errors lists (basket index, message) for rejected baskets.
+        """
+        records, errors = [], []
+        used = {}
+        promos = {}
+        promo_used = {}
+        with span("commit_batch") as sp:
+            for index, basket in enumerate(baskets):
+                try:
+                    cart = Cart()
+                    wanted = {}
+                    for item in basket["items"]:
+                        barcode, qty = ((item["barcode"], item["quantity"]) if isinstance(item, dict) else item)
+                        check_quantity(qty)
+                        product = self.backend.get_product(barcode)
+                        if not product:
+                            raise UnknownProduct(barcode)
+                        cart.add(product, qty)
+                        key = str(product["barcode"])
+                        wanted[key] = wanted.get(key, 0) + qty
+                        if check_stock:
+                            held = self.reservations.held(key) if self.reservations else 0
+                            available = int(product.get("quantity", 0)) - used.get(key, 0) - held
+                            if wanted[key] > available:
+                                raise OutOfStock(barcode, int(product.get("quantity", 0)), max(0, available))
+
+                    code = basket.get("promo")
+                    if code:
+                        if code not in promos:
+                            promos[code] = self.backend.get_promo(code)
+                        promo = promos[code]
+                        # Earlier baskets in the batch count against uses_left
+                        problem = promo_problem(promo, basket.get("date"), promo_used.get(code, 0) + 1)
+                        if problem:
+                            raise InvalidPromo(code, problem)
+                        cart.set_discount(float(promo.get("discount_percentage", 0)))
+                except (CheckoutError, KeyError, TypeError, ValueError) as e:
+                    errors.append((index, str(e)))
+                    continue
+
+                for key, qty in wanted.items():
+                    used[key] = used.get(key, 0) + qty
+                if code:
+                    promo_used[code] = promo_used.get(code, 0) + 1
+                record = {
+                    "user": basket.get("user", self.user_name),
+                    "items": cart.lines(),
+                    "total": cart.total,
+                    "date": basket.get("date") or get_today_date()
+                }
+                if cart.discount_amount:
+                    record["discount"] = cart.discount_amount
+                if code:
+                    record["promo_code"] = promos[code]["code"]
+                records.append(record)
+
+            try:
+                sale_ids = self.backend.commit_sales(records)
+            except PromoUnavailable as e:
+                raise InvalidPromo(e.code, e.reason) from e
+            sp.set(rows=len(records), errors=len(errors))
+        return sale_ids, errors
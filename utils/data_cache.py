@@ -0,0 +1,166 @@
+# utils/data_cache.py
+import os
+import threading
+import time
+
+from utils.helpers import file_stamp, load_json, save_json
+from utils.write_behind import get_store
+
+# Seconds between file-change checks for the same file
+CHECK_INTERVAL = 2.0
+
+# Stamp marker for "last written through this cache via the write-behind store"
+_SAVED = object()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_data_cache():
+    """Return the process-wide DataCache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DataCache()
+        return _cache
+
+
+class _Entry:
+    __slots__ = ("data", "stamp", "checked_at", "loaded")
+
+    def __init__(self):
+        self.data = None
+        self.stamp = None
+        self.checked_at = 0.0
+        self.loaded = False
+
+
+class DataCache:
+    """
+    Parsed JSON collections shared by every screen, keyed by file path.
+    A file is re-parsed only when its mtime/size changes (checked at most once
+    per CHECK_INTERVAL) or after invalidate(). Writes through put() replace the
+    cached copy without a re-read.
+
+    Every change, whether written through put(), announced with touch() or
+    found on disk, bumps the key's version and is reported to subscribers on
+    the next poll(). poll() is meant to be called from the Tk thread, so
+    callbacks may update widgets directly.
+    """
+
+    def __init__(self, check_interval=CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._versions = {}
+        self._listeners = {}
+        self._changed = set()
+
+    @staticmethod
+    def _key(path):
+        return os.path.abspath(path)
+
+    def _entry(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry()
+        return entry
+
+    def _is_current(self, key, entry):
+        if entry.stamp is _SAVED:
+            # Our own save is still queued, or was committed by the store:
+            # either way memory already matches it
+            store = get_store()
+            if store.has_pending(key):
+                return True
+            entry.stamp = store.committed_stamp(key)
+        return file_stamp(key) == entry.stamp
+
+    def _refresh(self, key, entry, force):
+        """Reload entry if the file changed. Returns True when it was reloaded."""
+        now = time.monotonic()
+        if entry.loaded and not force and now - entry.checked_at < self.check_interval:
+            return False
+        entry.checked_at = now
+        if entry.loaded and self._is_current(key, entry):
+            return False
+        was_loaded = entry.loaded
+        entry.stamp = file_stamp(key)
+        entry.data = load_json(key)
+        entry.loaded = True
+        if was_loaded:
+            self._mark_changed(key)
+        return True
+
+    def _mark_changed(self, key):
+        self._versions[key] = self._versions.get(key, 0) + 1
+        self._changed.add(key)
+
+    # ---- data ----
+    def get(self, path, force=False):
+        """Parsed contents of path (shared; write changes back with put()). force skips the throttle."""
+        key = self._key(path)
+        with self._lock:
+            entry = self._entry(key)
+            self._refresh(key, entry, force)
+            return entry.data
+
+    def put(self, path, data):
+        """Cache data as the contents of path and queue it for writing."""
+        key = self._key(path)
+        with self._lock:
+            save_json(key, data)
+            entry = self._entry(key)
+            entry.data = data
+            entry.stamp = _SAVED
+            entry.loaded = True
+            self._mark_changed(key)
+
+    def touch(self, path):
+        """Announce a change to path made outside the cache (e.g. an appended journal)."""
+        with self._lock:
+            self._mark_changed(self._key(path))
+
+    def invalidate(self, path=None):
+        """Re-read path (or every file) on next access."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self._key(path), None)
+
+    def version(self, path):
+        """Counter bumped on every change to path; lets a screen skip its own writes."""
+        with self._lock:
+            return self._versions.get(self._key(path), 0)
+
+    # ---- notifications ----
+    def subscribe(self, path, callback):
+        """Call callback(path) from poll() whenever path changes."""
+        key = self._key(path)
+        with self._lock:
+            self._listeners.setdefault(key, []).append(callback)
+
+    def unsubscribe(self, path, callback):
+        key = self._key(path)
+        with self._lock:
+            listeners = self._listeners.get(key, [])
+            if callback in listeners:
+                listeners.remove(callback)
+
+    def poll(self):
+        """Check subscribed files for outside changes and notify subscribers of every change."""
+        with self._lock:
+            for key in [k for k, listeners in self._listeners.items() if listeners]:
+                entry = self._entries.get(key)
+                if entry is not None and entry.loaded:
+                    self._refresh(key, entry, force=False)
+            changed = self._changed
+            self._changed = set()
+            calls = [(key, list(self._listeners.get(key, []))) for key in changed]
+        for key, listeners in calls:
+            for callback in listeners:
+                try:
+                    callback(key)
+                except Exception as e:
+                    print(f"Data change listener failed for {key}: {e}")
@@ -1,8 +1,25 @@
 import json
+from contextlib import contextmanager
 from datetime import date
 import os
+import threading
 
+from utils import write_behind
+from utils.tracing import traced
+
+def _describe_load(data, file_path):
+    size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+    return {"file": os.path.basename(file_path), "rows": len(data), "bytes": size}
+
+def _describe_save(result, file_path, data):
+    return {"file": os.path.basename(file_path), "rows": len(data)}
+
+@traced("load_json", _describe_load)
 def load_json(file_path):
+    # Writes still queued in the write-behind store win over what is on disk
+    is_pending, data = write_behind.get_store().pending(file_path)
+    if is_pending:
+        return data
     if not os.path.exists(file_path):
         return []
     with open(file_path, "r", encoding="utf-8") as f:
@@ -11,13 +28,84 @@ def load_json(file_path):
         except json.JSONDecodeError:
             return []
 
+@traced("save_json", _describe_save)
 def save_json(file_path, data):
-    # Ensure the folder exists
+    """Queue data for file_path; the write-behind store commits it shortly after."""
+    write_behind.get_store().put(file_path, data)
+
+def flush():
+    """Block until every queued save_json has been committed to disk."""
+    write_behind.get_store().flush()
+
+def save_json_atomic(file_path, data, indent=4):
+    """Write to a temp file next to file_path, fsync it, then rename over the original."""
     folder = os.path.dirname(file_path)
     if folder and not os.path.exists(folder):
         os.makedirs(folder, exist_ok=True)
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+def file_stamp(path):
+    """(mtime_ns, size) of path, or None when it cannot be read; any rewrite changes it."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on path (created if missing) that other processes respect too."""
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder, exist_ok=True)
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after about 10 seconds; keep waiting
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
 
 def get_today_date():
     return date.today().isoformat()
+
+class DataDirRegistry:
+    """
+    One shared object per data folder (one per process), made by
+    factory(data_dir, *args) on first use. The first caller's args win.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def get(self, data_dir, *args):
+        key = os.path.abspath(data_dir)
+        with self._lock:
+            obj = self._objects.get(key)
+            if obj is None:
+                obj = self.factory(data_dir, *args)
+                self._objects[key] = obj
+            return obj
@@ -0,0 +1,302 @@
+# utils/inventory_ledger.py
+import argparse
+import bisect
+import json
+import os
+import threading
+from datetime import datetime
+
+from utils.helpers import DataDirRegistry, load_json, save_json_atomic
+
+LEDGER_DIR = "inventory"
+EVENTS_FILE = "events.jsonl"
+# A snapshot is taken after this many events, and at the first event of each day
+SNAPSHOT_EVERY = 1000
+
+KINDS = ("sale", "restock", "adjustment", "delete")
+
+# One encoder for all events; json.dumps with options builds a new one per call
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _open_ledger(data_dir, opening_stock=None):
+    ledger = InventoryLedger(data_dir)
+    ledger.open(opening_stock() if opening_stock else {})
+    return ledger
+
+
+_ledgers = DataDirRegistry(_open_ledger)
+
+
+def get_ledger(data_dir, opening_stock=None):
+    """
+    Return the shared InventoryLedger for data_dir. opening_stock() gives
+    {barcode: quantity} to start a new ledger from, and on later starts
+    is compared against the ledger so edits made outside it are recorded.
+    """
+    return _ledgers.get(data_dir, opening_stock)
+
+
+def _read_events(path, offset=0):
+    """Yield (event, end offset) from offset on, skipping a torn line left by a crash."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            offset += len(line)
+            try:
+                yield json.loads(line), offset
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+
+
+class InventoryLedger:
+    """
+    Append-only history of stock changes: one event per line in
+    inventory/events.jsonl ({"seq", "time", "date", "barcode", "delta",
+    "kind", "ref"}), fsync'd before it counts. Snapshots of every barcode's
+    quantity go to inventory/snapshots/<date>_<seq>.json together with the
+    events file offset they cover, so current stock is the latest snapshot
+    plus at most SNAPSHOT_EVERY events (then kept in a dict for O(1)
+    lookups), and stock on a past date is the last snapshot of that day or
+    before plus the events after it.
+    """
+
+    def __init__(self, data_dir):
+        self.folder = os.path.join(data_dir, LEDGER_DIR)
+        self.events_path = os.path.join(self.folder, EVENTS_FILE)
+        self.snapshots_dir = os.path.join(self.folder, "snapshots")
+        self._lock = threading.Lock()
+        self._stock = {}
+        self._seq = 0
+        self._offset = 0
+        self._snapshots = []     # sorted (date, seq, file name)
+        self._since_snapshot = 0
+        self._last_date = None   # date of the newest event (or snapshot)
+
+    # ---- startup ----
+    def open(self, opening_stock):
+        with self._lock:
+            os.makedirs(self.snapshots_dir, exist_ok=True)
+            self._snapshots = sorted(self._snapshot_key(name) for name in os.listdir(self.snapshots_dir)
+                                     if name.endswith(".json"))
+            self._truncate_torn_tail()
+            if not self._snapshots:
+                # A new ledger opens with the stock on file as its first snapshot,
+                # after any events left over from lost snapshots
+                for event, offset in _read_events(self.events_path):
+                    self._seq, self._offset = event["seq"], offset
+                self._stock = {str(b): int(q) for b, q in opening_stock.items()}
+                self._write_snapshot()
+                return
+            snapshot = self._load_snapshot(self._snapshots[-1])
+            self._stock = snapshot["stock"]
+            self._seq = snapshot["seq"]
+            self._offset = snapshot["offset"]
+            self._last_date = snapshot["date"]
+            for event, offset in _read_events(self.events_path, self._offset):
+                self._apply(event)
+                self._seq = event["seq"]
+                self._offset = offset
+                self._since_snapshot += 1
+        if opening_stock:
+            self.reconcile(opening_stock)
+
+    def _truncate_torn_tail(self):
+        # A crash mid-append leaves a partial line; appending after it would corrupt the next event
+        if not os.path.exists(self.events_path):
+            return
+        with open(self.events_path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            pos = max(0, size - 65536)
+            f.seek(pos)
+            tail = f.read()
+            cut = tail.rfind(b"\n")
+            f.truncate(pos + cut + 1 if cut >= 0 else 0)
+
+    def reconcile(self, stock_on_file):
+        """Record adjustments for quantities that were changed without going through the ledger."""
+        events = []
+        for barcode, qty in stock_on_file.items():
+            delta = int(qty) - self.stock(barcode)
+            if delta:
+                events.append((barcode, delta, "adjustment", "reconcile"))
+        for barcode in set(self._stock) - {str(b) for b in stock_on_file}:
+            events.append((barcode, -self._stock[barcode], "delete", "reconcile"))
+        self.record(events)
+        return len(events)
+
+    # ---- snapshots ----
+    @staticmethod
+    def _snapshot_key(name):
+        day, seq = name[:-len(".json")].rsplit("_", 1)
+        return day, int(seq), name
+
+    def _load_snapshot(self, key):
+        return load_json(os.path.join(self.snapshots_dir, key[2]))
+
+    def _write_snapshot(self, day=None):
+        day = day or datetime.now().date().isoformat()
+        name = f"{day}_{self._seq:012d}.json"
+        save_json_atomic(os.path.join(self.snapshots_dir, name),
+                         {"date": day, "seq": self._seq, "offset": self._offset, "stock": self._stock}, indent=None)
+        self._prune_snapshots(day)
+        self._snapshots.append((day, self._seq, name))
+        self._since_snapshot = 0
+        self._last_date = day
+
+    def _prune_snapshots(self, today):
+        # Past days keep only their last snapshot: enough for as-of lookups at day granularity
+        keep = []
+        for i, key in enumerate(self._snapshots):
+            later_same_day = i + 1 < len(self._snapshots) and self._snapshots[i + 1][0] == key[0]
+            if key[0] < today and later_same_day:
+                try:
+                    os.remove(os.path.join(self.snapshots_dir, key[2]))
+                except OSError:
+                    pass
+                continue
+            keep.append(key)
+        self._snapshots = keep
+
+    def snapshot(self):
+        """Write a snapshot of the current stock now."""
+        with self._lock:
+            self._write_snapshot()
+
+    # ---- writes ----
+    def _apply(self, event):
+        self._last_date = event["date"]
+        barcode = event["barcode"]
+        if event["kind"] == "delete":
+            self._stock.pop(barcode, None)
+        else:
+            self._stock[barcode] = self._stock.get(barcode, 0) + int(event["delta"])
+
+    def record(self, changes):
+        """
+        Durably append (barcode, delta, kind, ref) changes with one write and
+        fsync. Zero deltas are dropped, except for deletes.
+        """
+        now = datetime.now()
+        day = now.date().isoformat()
+        with self._lock:
+            if self._since_snapshot and day != self._last_date:
+                # Close the last day with events with its final stock
+                self._write_snapshot(self._last_date)
+            events = []
+            for barcode, delta, kind, ref in changes:
+                if kind not in KINDS:
+                    raise ValueError(f"Unknown inventory event kind: {kind}")
+                if not delta and kind != "delete":
+                    continue
+                self._seq += 1
+                events.append({"seq": self._seq, "time": now.isoformat(timespec="seconds"), "date": day,
+                               "barcode": str(barcode), "delta": int(delta), "kind": kind, "ref": ref})
+            if not events:
+                return []
+            data = "".join(_encoder.encode(e) + "\n" for e in events)
+            with open(self.events_path, "ab") as f:
+                f.write(data.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+                self._offset = f.tell()
+            for event in events:
+                self._apply(event)
+            self._since_snapshot += len(events)
+            if self._since_snapshot >= SNAPSHOT_EVERY:
+                self._write_snapshot(day)
+            return events
+
+    # ---- reads ----
+    def stock(self, barcode):
+        """Current quantity of barcode according to the ledger."""
+        return self._stock.get(str(barcode), 0)
+
+    def current(self):
+        """{barcode: quantity} for every product the ledger knows."""
+        with self._lock:
+            return dict(self._stock)
+
+    def stock_as_of(self, day, barcode=None):
+        """
+        Stock at the end of day (ISO date): {barcode: quantity}, or one
+        quantity when barcode is given. Reads the last snapshot taken on or
+        before day and replays the events after it up to day.
+        """
+        with self._lock:
+            index = bisect.bisect_right(self._snapshots, (day, float("inf"), "")) - 1
+            if index < 0:
+                # Before the ledger began
+                return {} if barcode is None else 0
+            snapshot = self._load_snapshot(self._snapshots[index])
+            end = self._offset
+        stock = snapshot["stock"]
+        for event, offset in _read_events(self.events_path, snapshot["offset"]):
+            if offset > end or event["date"] > day:
+                break
+            if event["kind"] == "delete":
+                stock.pop(event["barcode"], None)
+            else:
+                stock[event["barcode"]] = stock.get(event["barcode"], 0) + int(event["delta"])
+        if barcode is not None:
+            return stock.get(str(barcode), 0)
+        return stock
+
+    def history(self, barcode=None, since=None, limit=None):
+        """
+        Events dated since (ISO date) or later, oldest first, optionally for
+        one barcode and only the last limit of them. Reading starts at the
+        snapshot before since, not at the start of the file.
+        """
+        barcode = str(barcode) if barcode is not None else None
+        with self._lock:
+            end = self._offset
+            start = 0
+            if since:
+                index = bisect.bisect_left(self._snapshots, (since, -1, "")) - 1
+                if index >= 0:
+                    start = self._load_snapshot(self._snapshots[index])["offset"]
+        events = []
+        for event, offset in _read_events(self.events_path, start):
+            if offset > end:
+                break
+            if since and event["date"] < since:
+                continue
+            if barcode is None or event["barcode"] == barcode:
+                events.append(event)
+        return events[-limit:] if limit else events
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inventory ledger queries")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("as-of", help="Stock at the end of a day")
+    p.add_argument("data_dir")
+    p.add_argument("date")
+    p.add_argument("--barcode")
+    p = sub.add_parser("history", help="Stock events of a product")
+    p.add_argument("data_dir")
+    p.add_argument("barcode")
+    p.add_argument("--since", help="Only events from this date (YYYY-MM-DD)")
+    p.add_argument("--limit", type=int, default=50)
+    p = sub.add_parser("snapshot", help="Write a snapshot now")
+    p.add_argument("data_dir")
+    args = parser.parse_args()
+
+    from utils.storage import get_backend
+    ledger = get_backend(args.data_dir).ledger()
+    if args.command == "as-of":
+        print(json.dumps(ledger.stock_as_of(args.date, args.barcode), indent=2))
+    elif args.command == "history":
+        for event in ledger.history(args.barcode, args.since, args.limit):
+            print(f"{event['time']}  {event['kind']:<10} {event['delta']:+6d}  {event['ref'] or ''}")
+    else:
+        ledger.snapshot()
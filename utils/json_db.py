@@ -1,4 +1,5 @@
 import json, os
+from utils.helpers import load_json as _load_json, save_json as _save_json
 
 DATA_FOLDER = "data"
 
@@ -9,10 +10,7 @@ def load_json(file_name):
     if not os.path.exists(path):
         with open(path, "w") as f:
             json.dump([], f)
-    with open(path, "r") as f:
-        return json.load(f)
+    return _load_json(path)
 
 def save_json(file_name, data):
-    path = os.path.join(DATA_FOLDER, file_name)
-    with open(path, "w") as f:
-        json.dump(data, f, indent=4)
+    _save_json(os.path.join(DATA_FOLDER, file_name), data)
@@ -0,0 +1,284 @@
+# utils/labels.py
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.tracing import span
+
+LABELS_DIR = "labels"
+# Bump when the drawing below changes so cached labels are redrawn
+RENDER_VERSION = 1
+
+# A4 at 300 dpi, 3 x 8 labels per sheet
+PAGE_SIZE = (2480, 3508)
+SHEET_GRID = (3, 8)
+PAGE_MARGIN = 60
+LABEL_PADDING = 24
+# Blank modules around each QR code, so neighbouring labels do not confuse scanners
+QR_BORDER = 2
+TITLE_FONT_SIZE = 46
+TEXT_FONT_SIZE = 38
+FONT_NAMES = ("arialbd.ttf", "arial.ttf", "DejaVuSans-Bold.ttf", "DejaVuSans.ttf")
+
+# Fewer uncached labels than this render in-process: starting workers would take longer
+POOL_MIN_LABELS = 16
+# Rendered labels kept in the cache; the least recently used are removed first
+CACHE_MAX_FILES = 20000
+
+_fonts = {}
+
+
+def label_size():
+    """(width, height) in pixels of one label on the sheet."""
+    cols, rows = SHEET_GRID
+    return ((PAGE_SIZE[0] - 2 * PAGE_MARGIN) // cols, (PAGE_SIZE[1] - 2 * PAGE_MARGIN) // rows)
+
+
+def cache_dir(data_dir):
+    return os.path.join(data_dir, LABELS_DIR, "cache")
+
+
+def product_label(product):
+    """Shelf label: the barcode as a QR code with name, price and barcode."""
+    return {"qr": str(product["barcode"]),
+            "lines": [str(product["name"]), f"EGP {float(product['price']):.2f}", str(product["barcode"])]}
+
+
+def promo_label(promo):
+    """Coupon: the code as a QR code with the discount and validity dates."""
+    lines = [str(promo["code"]), f"{float(promo.get('discount_percentage', 0)):g}% off"]
+    if promo.get("start_date"):
+        lines.append(f"From {str(promo['start_date'])[:10]}")
+    if promo.get("end_date"):
+        lines.append(f"Until {str(promo['end_date'])[:10]}")
+    return {"qr": str(promo["code"]), "lines": lines}
+
+
+def label_key(spec):
+    """Content hash of a label: the same text, size and drawing code give the same image."""
+    data = json.dumps([RENDER_VERSION, label_size(), spec["qr"], spec["lines"]], ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _font(size):
+    font = _fonts.get(size)
+    if font is None:
+        from PIL import ImageFont
+        for name in FONT_NAMES:
+            try:
+                font = ImageFont.truetype(name, size)
+                break
+            except OSError:
+                continue
+        else:
+            try:
+                font = ImageFont.load_default(size)
+            except TypeError:
+                # Pillow before 10.1 only has the small bitmap font
+                font = ImageFont.load_default()
+        _fonts[size] = font
+    return font
+
+
+def _fit(draw, text, font, width):
+    """text, shortened with an ellipsis to fit width pixels."""
+    if draw.textlength(text, font=font) <= width:
+        return text
+    # Longest prefix that fits, by bisection: measuring text is the slow part of drawing
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if draw.textlength(text[:mid] + "...", font=font) <= width:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo] + "..."
+
+
+def _wrap(draw, text, font, width, max_lines):
+    """Word-wrap text into at most max_lines lines of width pixels."""
+    lines, current = [], ""
+    for word in text.split():
+        candidate = f"{current} {word}".strip()
+        if current and draw.textlength(candidate, font=font) > width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    lines.append(current)
+    if len(lines) > max_lines:
+        lines = lines[:max_lines - 1] + [" ".join(lines[max_lines - 1:])]
+    return [_fit(draw, line, font, width) for line in lines]
+
+
+def draw_label(spec):
+    """The label for spec as a black and white PIL image of label_size()."""
+    import qrcode
+    from PIL import Image, ImageDraw
+
+    width, height = label_size()
+    image = Image.new("L", (width, height), 255)
+    side = height - 2 * LABEL_PADDING
+    qr = qrcode.QRCode(border=QR_BORDER, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr.add_data(spec["qr"])
+    qr.make(fit=True)
+    # Whole pixels per module keep the code sharp for scanners
+    qr.box_size = max(1, side // (qr.modules_count + 2 * QR_BORDER))
+    code = qr.make_image().convert("L")
+    image.paste(code, (LABEL_PADDING, (height - code.height) // 2))
+
+    draw = ImageDraw.Draw(image)
+    x = 2 * LABEL_PADDING + code.width
+    text_width = width - x - LABEL_PADDING
+    title_font, text_font = _font(TITLE_FONT_SIZE), _font(TEXT_FONT_SIZE)
+    lines = [(line, title_font) for line in _wrap(draw, spec["lines"][0], title_font, text_width, 2)]
+    lines += [(_fit(draw, line, text_font, text_width), text_font) for line in spec["lines"][1:]]
+    y = LABEL_PADDING
+    for line, font in lines:
+        draw.text((x, y), line, font=font, fill=0)
+        y += int(font.size * 1.3) if hasattr(font, "size") else 16
+    # Label printers are black and white; 1-bit images also encode and paste several times faster
+    return image.convert("1", dither=0)
+
+
+def _render(job):
+    """Draw one label into the cache. Runs in a worker process, so it takes and returns plain data."""
+    spec, path = job
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    draw_label(spec).save(tmp_path, "PNG", compress_level=1)
+    os.replace(tmp_path, path)
+    return path
+
+
+def render_labels(specs, folder, workers=None):
+    """
+    Path of the rendered image of each label spec, in order. Labels already
+    in the cache folder (by content hash) are reused as they are; the rest
+    are drawn across a process pool, or in-process when there are only a few.
+    Returns (paths, number drawn).
+    """
+    os.makedirs(folder, exist_ok=True)
+    paths, jobs = [], {}
+    for spec in specs:
+        path = os.path.join(folder, f"{label_key(spec)}.png")
+        paths.append(path)
+        if path in jobs:
+            continue
+        if os.path.exists(path):
+            # Reprints count as use for the cache's LRU order
+            os.utime(path)
+        else:
+            jobs[path] = (spec, path)
+
+    jobs = list(jobs.values())
+    drawn = len(jobs)
+    workers = workers or os.cpu_count() or 1
+    if len(jobs) >= POOL_MIN_LABELS and workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                list(pool.map(_render, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+            jobs = []
+        except (OSError, BrokenProcessPool) as e:
+            print(f"Label workers failed, drawing in-process: {e}")
+            jobs = [job for job in jobs if not os.path.exists(job[1])]
+    for job in jobs:
+        _render(job)
+    return paths, drawn
+
+
+def prune_cache(folder, max_files=CACHE_MAX_FILES):
+    """Remove the least recently used labels beyond max_files. Returns the number removed."""
+    try:
+        entries = [entry for entry in os.scandir(folder) if entry.name.endswith(".png")]
+    except FileNotFoundError:
+        return 0
+    if len(entries) <= max_files:
+        return 0
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    removed = 0
+    for entry in entries[:len(entries) - max_files]:
+        try:
+            os.remove(entry.path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def compose_sheets(label_paths, out_path):
+    """
+    Lay the label images out SHEET_GRID to a page. A .pdf out_path gets one
+    multi-page PDF; anything else one PNG per page (name-1.png, ...).
+    Returns the files written.
+    """
+    from PIL import Image
+
+    cols, rows = SHEET_GRID
+    width, height = label_size()
+    per_page = cols * rows
+    pages = []
+    for first in range(0, len(label_paths), per_page):
+        page = Image.new("1", PAGE_SIZE, 1)
+        for i, path in enumerate(label_paths[first:first + per_page]):
+            row, col = divmod(i, cols)
+            with Image.open(path) as label:
+                page.paste(label, (PAGE_MARGIN + col * width, PAGE_MARGIN + row * height))
+        pages.append(page)
+    if not pages:
+        return []
+
+    folder = os.path.dirname(out_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    if out_path.lower().endswith(".pdf"):
+        pages[0].save(out_path, "PDF", resolution=300, save_all=True, append_images=pages[1:])
+        return [out_path]
+    stem, ext = os.path.splitext(out_path)
+    written = []
+    for number, page in enumerate(pages, 1):
+        path = f"{stem}-{number}{ext or '.png'}"
+        page.save(path)
+        written.append(path)
+    return written
+
+
+def make_label_sheets(data_dir, specs, out_path, workers=None):
+    """
+    Render specs (see product_label/promo_label) through data_dir's label
+    cache and lay them out into printable sheets at out_path. Returns
+    {"files", "labels", "drawn"}.
+    """
+    specs = list(specs)
+    with span("label_sheets", labels=len(specs)) as sp:
+        folder = cache_dir(data_dir)
+        paths, drawn = render_labels(specs, folder, workers)
+        files = compose_sheets(paths, out_path)
+        prune_cache(folder)
+        sp.set(drawn=drawn, pages=-(-len(specs) // (SHEET_GRID[0] * SHEET_GRID[1])))
+    return {"files": files, "labels": len(specs), "drawn": drawn}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Printable QR label sheets for products or promo codes")
+    parser.add_argument("kind", choices=["products", "promos"])
+    parser.add_argument("data_dir")
+    parser.add_argument("out_path", help="A .pdf file, or a .png name for one image per page")
+    parser.add_argument("--only", nargs="+", help="Barcodes or codes to include (default: all)")
+    parser.add_argument("--workers", type=int, help="Render processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    from utils.storage import get_backend
+    backend = get_backend(args.data_dir)
+    if args.kind == "products":
+        items, key, make_spec = backend.list_products(), "barcode", product_label
+    else:
+        items, key, make_spec = backend.list_promos(), "code", promo_label
+    if args.only:
+        wanted = set(args.only)
+        items = [item for item in items if str(item[key]) in wanted]
+    result = make_label_sheets(args.data_dir, (make_spec(item) for item in items), args.out_path, args.workers)
+    print(f"{result['labels']} label(s), {result['drawn']} drawn, {result['labels'] - result['drawn']} from cache: "
+          + ", ".join(result["files"]))
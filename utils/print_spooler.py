@@ -0,0 +1,248 @@
+# utils/print_spooler.py
+import functools
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+
+from utils.helpers import DataDirRegistry
+
+# Jobs waiting in memory; anything beyond stays in the spool folder until there is room
+MAX_QUEUED_JOBS = 100
+PRINT_RETRIES = 3
+RETRY_DELAY = 2.0
+
+_win32 = None
+
+
+class PrintError(Exception):
+    """Raised by a backend when a job could not be printed."""
+
+
+def _load_win32():
+    """Import the pywin32 printing modules on first use; (None, None) when unavailable."""
+    global _win32
+    if _win32 is None:
+        try:
+            import win32print
+            import win32api
+            _win32 = (win32print, win32api)
+        except Exception:
+            _win32 = (None, None)
+    return _win32
+
+
+class FileBackend:
+    """Writes each job to <folder>/<job_id>.txt. Used when no printer is attached, and in tests."""
+
+    name = "file"
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def available(self):
+        return True
+
+    def print_text(self, job_id, text):
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, f"{job_id}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+
+class WindowsPrinterBackend:
+    """Prints to the default Windows printer through pywin32, falling back to the print command."""
+
+    name = "windows"
+
+    def available(self):
+        win32print, _ = _load_win32()
+        if win32print is None:
+            return False
+        try:
+            return bool(win32print.GetDefaultPrinter())
+        except Exception:
+            return False
+
+    def print_text(self, job_id, text):
+        win32print, win32api = _load_win32()
+        temp = tempfile.NamedTemporaryFile(delete=False, suffix=".txt", mode="w", encoding="utf-8")
+        try:
+            temp.write(text)
+            temp.close()
+            try:
+                win32api.ShellExecute(0, "print", temp.name, None, ".", 0)
+                return win32print.GetDefaultPrinter()
+            except Exception as e:
+                print("win32api print failed:", e)
+            result = subprocess.run(["cmd", "/c", f'print "{temp.name}"'], capture_output=True, timeout=10)
+            if result.returncode != 0:
+                raise PrintError(result.stderr.decode(errors="replace").strip() or "print command failed")
+            return "default printer (fallback)"
+        except subprocess.SubprocessError as e:
+            raise PrintError(str(e)) from e
+        finally:
+            try:
+                os.remove(temp.name)
+            except Exception:
+                pass
+
+
+def default_backend(data_dir):
+    """Windows printer when one is attached, otherwise the receipts folder."""
+    printer = WindowsPrinterBackend()
+    if printer.available():
+        return printer
+    return FileBackend(os.path.join(data_dir, "receipts"))
+
+
+def _start_spooler(data_dir):
+    spooler = PrintSpooler(os.path.join(data_dir, "spool"), default_backend(data_dir),
+                           fallback=FileBackend(os.path.join(data_dir, "receipts")),
+                           choose_backend=functools.partial(default_backend, data_dir))
+    spooler.start()
+    return spooler
+
+
+_spoolers = DataDirRegistry(_start_spooler)
+
+
+def get_print_spooler(data_dir):
+    """Return the shared, started PrintSpooler for data_dir."""
+    return _spoolers.get(data_dir)
+
+
+class PrintSpooler:
+    """
+    Background print queue.
+    Every job is written to the spool folder before it is queued and removed
+    only once a backend has taken it, so jobs survive a crash or restart.
+    Failed jobs are retried, then handed to the fallback backend. Progress is
+    posted to status_queue as (job_id, status, message) with status one of
+    "printed", "saved" or "failed", for the UI to poll from its own thread.
+    choose_backend, when given, is called before each job to pick the backend
+    again, so a printer attached after start-up is used.
+    """
+
+    def __init__(self, spool_dir, backend, fallback=None, max_queued=MAX_QUEUED_JOBS,
+                 retries=PRINT_RETRIES, retry_delay=RETRY_DELAY, choose_backend=None):
+        self.spool_dir = spool_dir
+        self.backend = backend
+        self.choose_backend = choose_backend
+        self.fallback = fallback
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.status_queue = queue.Queue()
+
+        self._jobs = queue.Queue(maxsize=max_queued)
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._overflow = False
+        self._thread = None
+
+    def _job_path(self, job_id):
+        return os.path.join(self.spool_dir, f"{job_id}.txt")
+
+    def start(self):
+        """Start the worker and re-queue jobs left in the spool folder by a previous run."""
+        if self._thread is not None:
+            return
+        self._rescan()
+        self._thread = threading.Thread(target=self._run, name="print-spooler", daemon=True)
+        self._thread.start()
+
+    def _enqueue(self, job_id):
+        with self._lock:
+            if job_id in self._queued:
+                return True
+            try:
+                self._jobs.put_nowait(job_id)
+            except queue.Full:
+                self._overflow = True
+                return False
+            self._queued.add(job_id)
+            return True
+
+    def _rescan(self):
+        if not os.path.isdir(self.spool_dir):
+            return
+        with self._lock:
+            self._overflow = False
+        names = [n for n in os.listdir(self.spool_dir) if n.endswith(".txt")]
+        names.sort(key=lambda n: os.path.getmtime(os.path.join(self.spool_dir, n)))
+        for name in names:
+            if not self._enqueue(name[:-4]):
+                break
+
+    def submit(self, job_id, text):
+        """Spool a job and queue it. Never blocks on the printer."""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        tmp_path = f"{self._job_path(job_id)}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._job_path(job_id))
+        # If the queue is full the job waits on disk and is picked up by the next rescan
+        self._enqueue(job_id)
+
+    def pending(self):
+        """Number of jobs not yet handed to a backend."""
+        if not os.path.isdir(self.spool_dir):
+            return 0
+        return sum(1 for n in os.listdir(self.spool_dir) if n.endswith(".txt"))
+
+    def _run(self):
+        while True:
+            job_id = self._jobs.get()
+            try:
+                self._process(job_id)
+            except Exception as e:
+                self.status_queue.put((job_id, "failed", str(e)))
+            finally:
+                with self._lock:
+                    self._queued.discard(job_id)
+                    overflow = self._overflow and self._jobs.empty()
+                if overflow:
+                    self._rescan()
+
+    def _process(self, job_id):
+        path = self._job_path(job_id)
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+
+        if self.choose_backend is not None:
+            self.backend = self.choose_backend()
+        backend = self.backend
+        error = None
+        for attempt in range(self.retries):
+            try:
+                if not backend.available():
+                    raise PrintError("no printer detected")
+                where = backend.print_text(job_id, text)
+                os.remove(path)
+                if isinstance(backend, FileBackend):
+                    self.status_queue.put((job_id, "saved", f"No printer detected. Receipt saved to {where}"))
+                else:
+                    self.status_queue.put((job_id, "printed", f"Receipt printed ({where})"))
+                return
+            except Exception as e:
+                error = e
+                if attempt < self.retries - 1:
+                    time.sleep(self.retry_delay)
+
+        # choose_backend builds a new FileBackend per job, so compare where it writes, not identity
+        same_folder = (isinstance(backend, FileBackend) and isinstance(self.fallback, FileBackend)
+                       and os.path.abspath(backend.folder) == os.path.abspath(self.fallback.folder))
+        if self.fallback is not None and self.fallback is not backend and not same_folder:
+            where = self.fallback.print_text(job_id, text)
+            os.remove(path)
+            self.status_queue.put((job_id, "saved", f"Printing failed: {error}. Receipt saved to {where}"))
+            return
+        # Leave the job spooled so it is retried on the next start
+        self.status_queue.put((job_id, "failed", f"Printing failed: {error}"))
@@ -0,0 +1,115 @@
+# utils/product_csv.py
+import argparse
+import csv
+import os
+
+from utils.catalog import validate_product
+from utils.helpers import flush
+from utils.storage import get_backend
+from utils.tracing import span
+
+CSV_FIELDS = ("barcode", "name", "price", "quantity")
+# Other header spellings seen in supplier files
+HEADER_ALIASES = {"qty": "quantity", "sku": "barcode", "product": "name", "unit price": "price"}
+
+
+def _header_map(header):
+    """Column index of each CSV field in header; raises ValueError when one is missing."""
+    columns = {}
+    for i, title in enumerate(header or []):
+        title = title.strip().lower()
+        field = HEADER_ALIASES.get(title, title)
+        if field in CSV_FIELDS and field not in columns:
+            columns[field] = i
+    missing = [field for field in CSV_FIELDS if field not in columns]
+    if missing:
+        raise ValueError(f"CSV header is missing column(s): {', '.join(missing)}")
+    return columns
+
+
+def read_products(path):
+    """
+    Stream (line number, product, error) for each data row of a product CSV;
+    product is None when the row fails validation. Blank rows are skipped and
+    a barcode repeated in the file is an error on its later lines.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        columns = _header_map(next(reader, None))
+        index = [columns[field] for field in CSV_FIELDS]
+        width = max(index) + 1
+        seen = {}
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            line = reader.line_num
+            if len(row) < width:
+                row = row + [""] * (width - len(row))
+            try:
+                product = validate_product(*(row[i] for i in index))
+            except ValueError as e:
+                yield line, None, str(e)
+                continue
+            first = seen.setdefault(product["barcode"], line)
+            if first != line:
+                yield line, None, f"Barcode {product['barcode']} already appears on line {first}"
+                continue
+            yield line, product, None
+
+
+def import_products(data_dir, path, add_stock=False, dry_run=False):
+    """
+    Validate a product CSV and upsert its good rows by barcode with one
+    backend write; bad rows are skipped and reported. Returns {"added",
+    "updated", "valid", "errors": [(line, message)]}. dry_run only validates.
+    """
+    with span("import_products") as sp:
+        products, errors = [], []
+        for line, product, error in read_products(path):
+            if error:
+                errors.append((line, error))
+            else:
+                products.append(product)
+        added = updated = 0
+        if products and not dry_run:
+            added, updated = get_backend(data_dir).upsert_products(products, add_stock=add_stock)
+        sp.set(rows=len(products) + len(errors), errors=len(errors))
+    return {"added": added, "updated": updated, "valid": len(products), "errors": errors}
+
+
+def export_products(data_dir, path):
+    """Write every product to a CSV that import_products reads back. Returns the row count."""
+    products = get_backend(data_dir).list_products()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDS)
+        writer.writerows((p["barcode"], p["name"], p["price"], p.get("quantity", 0)) for p in products)
+    os.replace(tmp_path, path)
+    return len(products)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk product import/export as CSV (barcode,name,price,quantity)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("import", help="Add or update products from a CSV")
+    p.add_argument("data_dir")
+    p.add_argument("csv_file")
+    p.add_argument("--add-stock", action="store_true", help="Add quantities to the stock on hand instead of replacing it")
+    p.add_argument("--check", action="store_true", help="Only validate the file")
+    p = sub.add_parser("export", help="Write all products to a CSV")
+    p.add_argument("data_dir")
+    p.add_argument("csv_file")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print(f"Exported {export_products(args.data_dir, args.csv_file)} product(s) to {args.csv_file}")
+    else:
+        result = import_products(args.data_dir, args.csv_file, add_stock=args.add_stock, dry_run=args.check)
+        for line, message in result["errors"]:
+            print(f"Line {line}: {message}")
+        if args.check:
+            print(f"{result['valid']} valid row(s), {len(result['errors'])} error(s)")
+        else:
+            print(f"Added {result['added']}, updated {result['updated']}, skipped {len(result['errors'])} row(s)")
+        flush()
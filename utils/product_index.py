@@ -0,0 +1,143 @@
+# utils/product_index.py
+import itertools
+
+# Fields a product can be searched by, as named in the "Search by" dropdown
+SEARCH_FIELDS = {
+    "Barcode": "barcode",
+    "Name": "name",
+    "Price": "price",
+    "Quantity": "quantity",
+}
+
+# Size of the indexed n-grams; shorter queries match most of the catalog anyway
+# and are answered by a scan
+GRAM_SIZE = 3
+
+
+def _grams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _field_text(product, field):
+    default = 0 if field == "quantity" else ""
+    return str(product.get(field, default)).lower()
+
+
+class ProductSearchIndex:
+    """
+    Substring search over product fields backed by trigram posting sets.
+    A query's candidates are the intersection of its trigram postings,
+    confirmed with a plain substring test. A query that extends the previous
+    one only re-checks the previous hits. Postings are built on the first
+    query that needs them, so opening the screen stays cheap.
+    """
+
+    def __init__(self, products=()):
+        self._products = {}   # barcode -> product
+        self._order = {}      # barcode -> insertion sequence, keeps table order stable
+        self._seq = itertools.count()
+        self._postings = None  # field -> gram -> set of barcodes, built lazily
+        self._texts = {}       # barcode -> field -> text as indexed
+        self._last = None     # (query, filter_by, hits)
+        for product in products:
+            self.add(product)
+
+    def __len__(self):
+        return len(self._products)
+
+    # ---- maintenance ----
+    def add(self, product):
+        key = str(product.get("barcode", ""))
+        if key in self._products:
+            self.remove(key)
+        self._products[key] = product
+        self._order[key] = next(self._seq)
+        if self._postings is not None:
+            self._index(key, product)
+        self._last = None
+
+    def _index(self, key, product):
+        # Remember what was indexed: callers may mutate the product dict before remove()
+        texts = self._texts[key] = {field: _field_text(product, field) for field in self._postings}
+        for field, postings in self._postings.items():
+            for gram in _grams(texts[field], GRAM_SIZE):
+                postings.setdefault(gram, set()).add(key)
+
+    def _ensure_postings(self):
+        if self._postings is None:
+            self._postings = {field: {} for field in SEARCH_FIELDS.values()}
+            self._texts = {}
+            for key, product in self._products.items():
+                self._index(key, product)
+
+    def remove(self, barcode):
+        key = str(barcode)
+        product = self._products.pop(key, None)
+        if product is None:
+            return
+        del self._order[key]
+        if self._postings is None:
+            self._last = None
+            return
+        texts = self._texts.pop(key)
+        for field, postings in self._postings.items():
+            for gram in _grams(texts[field], GRAM_SIZE):
+                keys = postings.get(gram)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del postings[gram]
+        self._last = None
+
+    def update(self, old_barcode, product):
+        order = self._order.get(str(old_barcode))
+        self.remove(old_barcode)
+        self.add(product)
+        if order is not None:
+            self._order[str(product.get("barcode", ""))] = order
+
+    # ---- queries ----
+    def get(self, barcode):
+        return self._products.get(str(barcode))
+
+    def _candidates(self, field, query):
+        if len(query) < GRAM_SIZE:
+            return self._products.keys()
+        self._ensure_postings()
+        postings = self._postings[field]
+        result = None
+        for gram in _grams(query, GRAM_SIZE):
+            keys = postings.get(gram)
+            if not keys:
+                return set()
+            result = set(keys) if result is None else result & keys
+            if not result:
+                return result
+        return result or set()
+
+    def _matches(self, key, query, fields):
+        product = self._products[key]
+        return any(query in _field_text(product, field) for field in fields)
+
+    def search(self, query, filter_by="All"):
+        """Products whose field(s) contain query (case-insensitive), in table order."""
+        query = query.strip().lower()
+        if not query:
+            self._last = None
+            return self.all()
+        fields = list(SEARCH_FIELDS.values()) if filter_by == "All" else [SEARCH_FIELDS[filter_by]]
+
+        last = self._last
+        if last is not None and last[1] == filter_by and last[0] in query:
+            # Longer query: every hit must already be among the previous hits
+            hits = {key for key in last[2] if self._matches(key, query, fields)}
+        else:
+            hits = set()
+            for field in fields:
+                hits |= {key for key in self._candidates(field, query)
+                         if query in _field_text(self._products[key], field)}
+        self._last = (query, filter_by, hits)
+        return [self._products[key] for key in sorted(hits, key=self._order.__getitem__)]
+
+    def all(self):
+        return [self._products[key] for key in sorted(self._order, key=self._order.__getitem__)]
@@ -0,0 +1,244 @@
+# utils/promotions.py
+import json
+import os
+import secrets
+import threading
+
+from utils.data_cache import get_data_cache
+from utils.helpers import DataDirRegistry, get_today_date, load_json, save_json_atomic
+
+# Characters for generated coupon codes (no 0/O or 1/I to misread)
+CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+CODE_LENGTH = 8
+
+# Uses taken by sales: a log of redemptions, folded into a per-code count snapshot
+REDEMPTIONS_LOG = "promo_redemptions.jsonl"
+REDEMPTIONS_SNAPSHOT = "promo_redemptions.json"
+# Log lines after which the log is folded into the snapshot
+REDEMPTIONS_COMPACT_EVERY = 1000
+
+_indexes = DataDirRegistry(lambda data_dir: PromoIndex(os.path.join(data_dir, "promo_codes.json")))
+
+
+class PromoUnavailable(Exception):
+    """A promo code cannot be redeemed: unknown, inactive, outside its dates or used up."""
+
+    def __init__(self, code, reason):
+        super().__init__(f"Promo code {code} {reason}")
+        self.code = code
+        self.reason = reason
+
+
+def _is_true(value):
+    if isinstance(value, str):
+        return value.strip().lower() not in ("0", "false", "no", "")
+    return bool(value)
+
+
+def promo_problem(promo, day=None, uses=1):
+    """Why promo cannot be used uses times on day (ISO date), or None when it can."""
+    if not promo:
+        return "does not exist"
+    if not _is_true(promo.get("is_active", True)):
+        return "is not active"
+    day = day or get_today_date()
+    # Dates may be stored as dates or datetimes; compare the day part
+    start = str(promo.get("start_date") or "")[:10]
+    end = str(promo.get("end_date") or "")[:10]
+    if start and day < start:
+        return f"is not valid until {start}"
+    if end and day > end:
+        return f"expired on {end}"
+    if int(promo.get("uses_left", 0)) < uses:
+        return "has been used up"
+    return None
+
+
+def generate_codes(count, discount_percentage, max_uses=1, prefix="", start_date=None, end_date=None,
+                   existing=()):
+    """count new promos with random unique codes, e.g. a batch of one-time coupons."""
+    taken = set(existing)
+    promos = []
+    while len(promos) < count:
+        code = prefix + "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+        if code in taken:
+            continue
+        taken.add(code)
+        promo = {"code": code, "discount_percentage": float(discount_percentage),
+                 "max_uses": int(max_uses), "uses_left": int(max_uses), "is_active": True}
+        if start_date:
+            promo["start_date"] = start_date
+        if end_date:
+            promo["end_date"] = end_date
+        promos.append(promo)
+    return promos
+
+
+def get_promo_index(data_dir):
+    """Return the shared PromoIndex for data_dir's promo_codes.json."""
+    return _indexes.get(data_dir)
+
+
+class PromoIndex:
+    """
+    code -> promo index over the promo_codes.json list held by the data cache,
+    rebuilt only when the file changes. Uses taken by sales are not written
+    back into that list: each redemption is a line appended (and fsync'd) to
+    promo_redemptions.jsonl, and the per-code counts are subtracted from
+    uses_left when a promo is read. Every REDEMPTIONS_COMPACT_EVERY lines the
+    log is folded into promo_redemptions.json. So a sale costs the same with
+    100k one-time coupons as with ten, and promo_codes.json is only rewritten
+    for admin edits.
+    """
+
+    def __init__(self, promos_path):
+        self.promos_path = promos_path
+        folder = os.path.dirname(promos_path)
+        self.log_path = os.path.join(folder, REDEMPTIONS_LOG)
+        self.snapshot_path = os.path.join(folder, REDEMPTIONS_SNAPSHOT)
+        self._lock = threading.RLock()
+        self._promos = None
+        self._by_code = {}
+        self._all = None
+        self._used = None
+        self._seq = 0
+        self._log_lines = 0
+
+    # ---- redemption log ----
+    def _load_used(self):
+        snapshot = load_json(self.snapshot_path)
+        if not isinstance(snapshot, dict):
+            snapshot = {}
+        used = {str(code): int(n) for code, n in snapshot.get("used", {}).items()}
+        folded = seq = int(snapshot.get("seq", 0))
+        lines = 0
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn last line left by a crash
+                        continue
+                    lines += 1
+                    # Lines at or below the snapshot's seq were folded in before a crash cut the log
+                    if int(entry["seq"]) > folded:
+                        used[entry["code"]] = used.get(entry["code"], 0) + int(entry["n"])
+                        seq = max(seq, int(entry["seq"]))
+        self._used, self._seq, self._log_lines = used, seq, lines
+
+    def _log(self, counts):
+        """Durably record counts ({code: uses taken, negative to give back}) and apply them."""
+        entries = []
+        for code, n in counts.items():
+            self._seq += 1
+            entries.append({"seq": self._seq, "code": code, "n": n})
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(e, ensure_ascii=False, separators=(",", ":")) + "\n" for e in entries))
+            f.flush()
+            os.fsync(f.fileno())
+        for code, n in counts.items():
+            left = self._used.get(code, 0) + n
+            if left:
+                self._used[code] = left
+            else:
+                self._used.pop(code, None)
+        self._all = None
+        self._log_lines += len(entries)
+        if self._log_lines >= REDEMPTIONS_COMPACT_EVERY:
+            self._compact()
+
+    def _compact(self):
+        # Counts of codes no longer on the list are dropped; re-adding a code starts it afresh
+        used = {code: n for code, n in self._used.items() if code in self._by_code}
+        save_json_atomic(self.snapshot_path, {"seq": self._seq, "used": used}, indent=None)
+        with open(self.log_path, "w", encoding="utf-8"):
+            pass
+        self._used = used
+        self._log_lines = 0
+
+    # ---- reads ----
+    def _refresh(self, force=False):
+        if self._used is None:
+            self._load_used()
+        promos = get_data_cache().get(self.promos_path, force=force)
+        if promos is not self._promos:
+            self._promos = promos
+            self._by_code = {str(p.get("code", "")): p for p in promos}
+            self._all = None
+
+    def _view(self, promo):
+        """promo as stored, with the uses taken since subtracted from uses_left."""
+        n = self._used.get(str(promo.get("code", "")))
+        return dict(promo, uses_left=int(promo.get("uses_left", 0)) - n) if n else promo
+
+    def get(self, code):
+        with self._lock:
+            self._refresh()
+            promo = self._by_code.get(str(code))
+            return self._view(promo) if promo is not None else None
+
+    def all(self):
+        with self._lock:
+            self._refresh()
+            if self._all is None:
+                self._all = [self._view(p) for p in self._promos] if self._used else self._promos
+            return self._all
+
+    def _check(self, uses):
+        counts = {}
+        for code, day in uses:
+            code = str(code)
+            counts[code] = counts.get(code, 0) + 1
+            promo = self._by_code.get(code)
+            problem = promo_problem(self._view(promo) if promo is not None else None, day, counts[code])
+            if problem:
+                raise PromoUnavailable(code, problem)
+        return counts
+
+    def check(self, uses):
+        """Raise PromoUnavailable unless every (code, day) in uses can be redeemed."""
+        with self._lock:
+            self._refresh(force=True)
+            self._check(uses)
+
+    # ---- writes ----
+    def redeem(self, uses):
+        """Check and take one use per (code, day) in uses as one step; nothing changes on failure."""
+        if not uses:
+            return
+        with self._lock:
+            self._refresh(force=True)
+            self._log(self._check(uses))
+
+    def release(self, uses):
+        """Give back the uses redeem() took for (code, day) pairs whose sale was not recorded."""
+        if not uses:
+            return
+        with self._lock:
+            self._refresh(force=True)
+            counts = {}
+            for code, _ in uses:
+                counts[str(code)] = counts.get(str(code), 0) - 1
+            self._log(counts)
+
+    def replace(self, promos):
+        """Save a new promo list (admin edits), with uses_left as the screen shows it (uses taken included)."""
+        with self._lock:
+            self._refresh()
+            stored = []
+            for promo in promos:
+                n = self._used.get(str(promo.get("code", "")))
+                # The list on disk keeps uses_left from before the logged redemptions
+                stored.append(dict(promo, uses_left=int(promo.get("uses_left", 0)) + n) if n else promo)
+            get_data_cache().put(self.promos_path, stored)
+            self._refresh()
+
+    def add_many(self, new_promos):
+        """Add or overwrite promos by code with a single save."""
+        with self._lock:
+            self._refresh(force=True)
+            by_code = {str(p.get("code", "")): p for p in self.all()}
+            for promo in new_promos:
+                by_code[str(promo["code"])] = promo
+            self.replace(list(by_code.values()))
@@ -0,0 +1,221 @@
+# utils/reports.py
+import argparse
+import calendar
+import json
+from datetime import date, timedelta
+
+from utils.storage import get_backend
+from utils.tracing import span
+
+try:
+    import numpy as np
+except ImportError:
+    # Reports still work without NumPy, through the single-pass loops below
+    np = None
+
+PERIODS = ("day", "week", "month", "custom")
+
+
+def period_bounds(period, day=None):
+    """(start, end) ISO dates of the day, Monday-to-Sunday week or calendar month containing day."""
+    day = date.fromisoformat(day) if day else date.today()
+    if period == "day":
+        start = end = day
+    elif period == "week":
+        start = day - timedelta(days=day.weekday())
+        end = start + timedelta(days=6)
+    elif period == "month":
+        start = day.replace(day=1)
+        end = day.replace(day=calendar.monthrange(day.year, day.month)[1])
+    else:
+        raise ValueError(f"Unknown period: {period}")
+    return start.isoformat(), end.isoformat()
+
+
+class SalesColumns:
+    """
+    Sales and sale items of a date range as parallel integer/float columns,
+    filled from archived months (straight from their mapped columns) and from
+    plain rows for the rest. Dates are kept as ordinals and barcodes as
+    dictionary codes into barcodes/names, so grouping is a bincount over
+    small integers. After finish() the columns are NumPy arrays when NumPy is
+    installed, otherwise lists.
+    """
+
+    FIELDS = ("sale_day", "sale_total", "item_day", "item_code", "item_qty", "item_price")
+
+    def __init__(self):
+        self._parts = {field: [] for field in self.FIELDS}
+        self._codes = {}
+        self._ordinals = {}
+        self.barcodes = []
+        self.names = []
+        self.first_day = None
+        self.day_count = 0
+
+    @classmethod
+    def load(cls, backend, start_date, end_date):
+        columns = cls()
+        archives, gaps = backend.sale_archives(start_date, end_date)
+        for archive in archives:
+            columns.add_archive(archive, start_date, end_date)
+        for gap_start, gap_end in gaps:
+            columns.add_rows(*backend.sale_rows(gap_start, gap_end))
+        return columns.finish()
+
+    def _code(self, barcode, name):
+        barcode = str(barcode)
+        code = self._codes.get(barcode)
+        if code is None:
+            code = self._codes[barcode] = len(self.barcodes)
+            self.barcodes.append(barcode)
+            self.names.append(name)
+        return code
+
+    def _ordinal(self, day):
+        ordinal = self._ordinals.get(day)
+        if ordinal is None:
+            ordinal = self._ordinals[day] = date.fromisoformat(day).toordinal()
+        return ordinal
+
+    def add_rows(self, sales, items):
+        """Add sales as (date, total) and items as (date, barcode, name, quantity, price) rows."""
+        parts = self._parts
+        parts["sale_day"].append([self._ordinal(day) for day, _ in sales])
+        parts["sale_total"].append([float(total) for _, total in sales])
+        parts["item_day"].append([self._ordinal(row[0]) for row in items])
+        parts["item_code"].append([self._code(row[1], row[2]) for row in items])
+        parts["item_qty"].append([int(row[3]) for row in items])
+        parts["item_price"].append([float(row[4]) for row in items])
+
+    def add_archive(self, archive, start_date, end_date):
+        """Add the rows of a SalesArchive dated start_date..end_date, reading only those column ranges."""
+        sale_lo, sale_hi = archive.row_range("sales", start_date, end_date)
+        item_lo, item_hi = archive.row_range("items", start_date, end_date)
+        # The archive's product codes, translated to ours
+        mapping = [self._code(barcode, name) for barcode, name in archive.products]
+        parts = self._parts
+        if np is not None:
+            def take(name, lo, hi):
+                return np.asarray(archive.column(name))[lo:hi]
+            parts["item_code"].append(np.asarray(mapping, dtype=np.int32)[take("item_product", item_lo, item_hi)])
+        else:
+            def take(name, lo, hi):
+                return archive.column(name)[lo:hi].tolist()
+            parts["item_code"].append([mapping[c] for c in archive.column("item_product")[item_lo:item_hi]])
+        parts["sale_day"].append(take("sale_date", sale_lo, sale_hi))
+        parts["sale_total"].append(take("sale_total", sale_lo, sale_hi))
+        parts["item_day"].append(take("item_date", item_lo, item_hi))
+        parts["item_qty"].append(take("item_qty", item_lo, item_hi))
+        parts["item_price"].append(take("item_price", item_lo, item_hi))
+
+    def finish(self):
+        """Join the added parts into one column each, with days counted from first_day."""
+        parts, self._parts = self._parts, None
+        ordinals = [chunk for chunk in parts["sale_day"] if len(chunk)]
+        self.first_day = min(min(chunk) for chunk in ordinals) if ordinals else 0
+        last_day = max(max(chunk) for chunk in ordinals) if ordinals else -1
+        self.day_count = last_day - self.first_day + 1
+        if np is not None:
+            dtypes = {"sale_day": np.int32, "sale_total": np.float64, "item_day": np.int32,
+                      "item_code": np.int32, "item_qty": np.int64, "item_price": np.float64}
+            for field in self.FIELDS:
+                chunks = [np.asarray(chunk, dtype=dtypes[field]) for chunk in parts[field]]
+                setattr(self, field, np.concatenate(chunks) if chunks else np.zeros(0, dtype=dtypes[field]))
+            self.sale_day -= self.first_day
+            self.item_day -= self.first_day
+        else:
+            for field in self.FIELDS:
+                setattr(self, field, [value for chunk in parts[field] for value in chunk])
+            self.sale_day = [day - self.first_day for day in self.sale_day]
+            self.item_day = [day - self.first_day for day in self.item_day]
+        return self
+
+    def __len__(self):
+        return len(self.sale_total)
+
+    def aggregate(self):
+        """
+        Grouped totals: per-day [revenue, sales, units] for days with sales and
+        per-barcode [name, qty, revenue], as {"days": {date: ...},
+        "products": {barcode: ...}} with days in date order.
+        """
+        if np is not None:
+            revenue, counts, units, qty, product_revenue = self._reduce_numpy()
+        else:
+            revenue, counts, units, qty, product_revenue = self._reduce_python()
+        return {
+            "days": {date.fromordinal(self.first_day + i).isoformat(): [float(revenue[i]), int(counts[i]),
+                                                                        int(units[i])]
+                     for i in range(self.day_count) if counts[i]},
+            "products": {b: [self.names[i], int(qty[i]), float(product_revenue[i])]
+                         for i, b in enumerate(self.barcodes) if qty[i] or product_revenue[i]},
+        }
+
+    def _reduce_numpy(self):
+        n_days, n_codes = self.day_count, len(self.barcodes)
+        return (np.bincount(self.sale_day, weights=self.sale_total, minlength=n_days),
+                np.bincount(self.sale_day, minlength=n_days),
+                np.bincount(self.item_day, weights=self.item_qty, minlength=n_days),
+                np.bincount(self.item_code, weights=self.item_qty, minlength=n_codes),
+                np.bincount(self.item_code, weights=self.item_qty * self.item_price, minlength=n_codes))
+
+    def _reduce_python(self):
+        revenue, counts, units = [0.0] * self.day_count, [0] * self.day_count, [0] * self.day_count
+        qty, product_revenue = [0] * len(self.barcodes), [0.0] * len(self.barcodes)
+        for day, total in zip(self.sale_day, self.sale_total):
+            revenue[day] += total
+            counts[day] += 1
+        for day, code, q, price in zip(self.item_day, self.item_code, self.item_qty, self.item_price):
+            units[day] += q
+            qty[code] += q
+            product_revenue[code] += q * price
+        return revenue, counts, units, qty, product_revenue
+
+
+def period_report(data_dir, start_date, end_date=None):
+    """
+    Revenue and sales per day, units and revenue per product, and average
+    basket size over start_date..end_date (inclusive, ISO dates).
+    """
+    end_date = end_date or start_date
+    with span("period_report", start=start_date, end=end_date) as sp:
+        columns = SalesColumns.load(get_backend(data_dir), start_date, end_date)
+        totals = columns.aggregate()
+        days = [{"date": d, "revenue": r, "sales_count": c, "units": u} for d, (r, c, u) in totals["days"].items()]
+        products = [{"barcode": b, "name": name, "qty": q, "revenue": r}
+                    for b, (name, q, r) in totals["products"].items()]
+        products.sort(key=lambda p: p["revenue"], reverse=True)
+
+        sales_count = sum(d["sales_count"] for d in days)
+        revenue = sum(d["revenue"] for d in days)
+        units = sum(d["units"] for d in days)
+        sp.set(rows=len(columns), products=len(products))
+    return {
+        "start": start_date,
+        "end": end_date,
+        "sales_count": sales_count,
+        "revenue": revenue,
+        "units": units,
+        "avg_basket_units": units / sales_count if sales_count else 0.0,
+        "avg_basket_value": revenue / sales_count if sales_count else 0.0,
+        "days": days,
+        "products": products,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sales report for a day, week, month or date range")
+    parser.add_argument("data_dir")
+    parser.add_argument("period", choices=PERIODS)
+    parser.add_argument("--date", help="A day in the period (default: today); the start date for custom")
+    parser.add_argument("--end", help="Last day for a custom range")
+    args = parser.parse_args()
+
+    if args.period == "custom":
+        if not args.date or not args.end:
+            parser.error("custom needs --date and --end")
+        start, end = args.date, args.end
+    else:
+        start, end = period_bounds(args.period, args.date)
+    print(json.dumps(period_report(args.data_dir, start, end), indent=2))
@@ -0,0 +1,100 @@
+# utils/rollups.py
+import argparse
+import os
+import shutil
+
+from utils.helpers import load_json, save_json, flush
+from utils.sales_journal import get_sales_store
+
+
+def _rollups_dir(data_dir):
+    return os.path.join(data_dir, "rollups")
+
+
+def _rollup_path(data_dir, day):
+    return os.path.join(_rollups_dir(data_dir), f"{day}.json")
+
+
+def _empty_rollup(day):
+    return {"date": day, "revenue": 0.0, "sales_count": 0, "products": {}}
+
+
+def _ensure_built(data_dir):
+    """Build rollups from history the first time a store without them is used."""
+    if os.path.isdir(_rollups_dir(data_dir)):
+        return False
+    rebuild(data_dir)
+    return True
+
+
+def get_rollup(data_dir, day):
+    """Return the totals for one day: revenue, sales_count and per-barcode qty/revenue."""
+    _ensure_built(data_dir)
+    rollup = load_json(_rollup_path(data_dir, day))
+    if not isinstance(rollup, dict) or not rollup:
+        return _empty_rollup(day)
+    return rollup
+
+
+def _add_sale(rollup, sale):
+    rollup["revenue"] += float(sale.get("total", 0))
+    rollup["sales_count"] += 1
+    products = rollup["products"]
+    for item in sale.get("items", []):
+        code = str(item["barcode"])
+        entry = products.get(code)
+        if entry is None:
+            entry = products[code] = {"name": item["name"], "qty": 0, "revenue": 0.0}
+        entry["qty"] += int(item["quantity"])
+        entry["revenue"] += float(item["price"]) * int(item["quantity"])
+
+
+def record_sale(data_dir, sale):
+    """Fold one committed sale into its day's rollup."""
+    record_sales(data_dir, [sale])
+
+
+def record_sales(data_dir, sales):
+    """Fold committed sales into their days' rollups, saving each day once."""
+    if _ensure_built(data_dir):
+        # The rebuild already read these sales back from the journal
+        return
+    rollups = {}
+    for sale in sales:
+        day = sale["date"]
+        if day not in rollups:
+            rollups[day] = get_rollup(data_dir, day)
+        _add_sale(rollups[day], sale)
+    for day, rollup in rollups.items():
+        save_json(_rollup_path(data_dir, day), rollup)
+
+
+def rebuild(data_dir):
+    """Regenerate every daily rollup from the full sales history."""
+    rollups = {}
+    for sale in get_sales_store(data_dir).load_all():
+        day = sale.get("date")
+        if not day:
+            continue
+        if day not in rollups:
+            rollups[day] = _empty_rollup(day)
+        _add_sale(rollups[day], sale)
+
+    folder = _rollups_dir(data_dir)
+    flush()
+    if os.path.exists(folder):
+        shutil.rmtree(folder)
+    os.makedirs(folder)
+    for day, rollup in rollups.items():
+        save_json(_rollup_path(data_dir, day), rollup)
+    flush()
+    return len(rollups)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain daily sales rollups")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("data_dir")
+    args = parser.parse_args()
+    count = rebuild(args.data_dir)
+    print(f"Rebuilt rollups for {count} day(s) in {_rollups_dir(args.data_dir)}")
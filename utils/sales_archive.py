@@ -0,0 +1,256 @@
+# utils/sales_archive.py
+import argparse
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from datetime import date
+
+from utils.helpers import file_stamp, get_today_date
+from utils.sales_journal import get_sales_store, partition_key
+
+ARCHIVE_DIR = "archive"
+MAGIC = b"JBSALES1"
+# Column blocks start on this boundary so they can be cast in place
+ALIGN = 8
+
+# name -> (array typecode, table); rows of both tables are sorted by (date, sale id)
+COLUMNS = {
+    "sale_id": ("q", "sales"),
+    "sale_date": ("i", "sales"),      # date ordinal
+    "sale_user": ("i", "sales"),      # index into users
+    "sale_total": ("d", "sales"),
+    "sale_discount": ("d", "sales"),
+    "sale_promo": ("i", "sales"),     # index into promos, -1 for none
+    "item_sale_id": ("q", "items"),
+    "item_date": ("i", "items"),
+    "item_user": ("i", "items"),
+    "item_product": ("i", "items"),   # index into products ([barcode, name] pairs)
+    "item_qty": ("i", "items"),
+    "item_price": ("d", "items"),
+}
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def _archive_dir(data_dir):
+    return os.path.join(data_dir, "sales", ARCHIVE_DIR)
+
+
+def archive_path(data_dir, key):
+    return os.path.join(_archive_dir(data_dir), f"{key}.cols")
+
+
+def _source_stamp(data_dir, key):
+    """(mtime_ns, size) of the partition's files; any append or compaction changes it."""
+    journal = get_sales_store(data_dir).partition(key)
+    # Lists, as the stamp is compared with the copy read back from the archive's JSON header
+    stamps = (file_stamp(path) for path in (journal.snapshot_path, journal.journal_path, journal.compacting_path))
+    return [list(stamp) if stamp else None for stamp in stamps]
+
+
+def _closed(key, today=None):
+    """A month is closed once it is before the current one; undated legacy sales never are."""
+    return key != "0000-00" and key < partition_key(today or get_today_date())
+
+
+def write_archive(path, sales, source=None):
+    """Write sales as a columnar archive at path (atomically). Raises ValueError for undated sales."""
+    users, promos, products = {}, {}, {}
+    columns = {name: array(typecode) for name, (typecode, _) in COLUMNS.items()}
+    ordinals = {}
+    rows = []
+    for sale in sales:
+        day = sale.get("date", "")
+        if day not in ordinals:
+            ordinals[day] = date.fromisoformat(day).toordinal()
+        rows.append((ordinals[day], int(sale.get("id", 0)), sale))
+    rows.sort(key=lambda row: row[:2])
+
+    for ordinal, sale_id, sale in rows:
+        user = users.setdefault(str(sale.get("user") or ""), len(users))
+        code = sale.get("promo_code")
+        columns["sale_id"].append(sale_id)
+        columns["sale_date"].append(ordinal)
+        columns["sale_user"].append(user)
+        columns["sale_total"].append(float(sale.get("total", 0)))
+        columns["sale_discount"].append(float(sale.get("discount", 0)))
+        columns["sale_promo"].append(promos.setdefault(code, len(promos)) if code else -1)
+        for item in sale.get("items", []):
+            product = (str(item["barcode"]), str(item.get("name", "")))
+            columns["item_sale_id"].append(sale_id)
+            columns["item_date"].append(ordinal)
+            columns["item_user"].append(user)
+            columns["item_product"].append(products.setdefault(product, len(products)))
+            columns["item_qty"].append(int(item["quantity"]))
+            columns["item_price"].append(float(item["price"]))
+
+    header = {
+        "byteorder": sys.byteorder,
+        "source": source,
+        "sales": len(columns["sale_id"]),
+        "items": len(columns["item_sale_id"]),
+        "users": list(users),
+        "promos": list(promos),
+        "products": [list(p) for p in products],
+        "columns": {},
+    }
+    # Offsets depend on the header length, which depends on the offsets: lay out twice
+    offset = 0
+    for _ in range(2):
+        header_bytes = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        offset = _aligned(len(MAGIC) + 8 + len(header_bytes))
+        for name, values in columns.items():
+            header["columns"][name] = [offset, len(values)]
+            offset = _aligned(offset + len(values) * values.itemsize)
+    header_bytes = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    folder = os.path.dirname(path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        for name, values in columns.items():
+            f.write(b"\0" * (header["columns"][name][0] - f.tell()))
+            values.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return header["sales"]
+
+
+def _ordinal(day, default):
+    # Open-ended ranges use dates like "0000-01-01" that date() cannot hold
+    try:
+        return date.fromisoformat(day).toordinal()
+    except ValueError:
+        return default.toordinal()
+
+
+def _aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+class SalesArchive:
+    """
+    One closed month of sales, memory-mapped. column(name) is a typed
+    memoryview straight over the file, so a reader only pages in the columns
+    and row ranges it touches; nothing is parsed except the small header
+    holding the user, promo and product dictionaries.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a sales archive: {path}")
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            self.header = json.loads(f.read(header_len).decode("utf-8"))
+            if self.header.get("byteorder") != sys.byteorder:
+                raise ValueError(f"Sales archive written on a different platform: {path}")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._columns = {}
+        self.users = self.header["users"]
+        self.promos = self.header["promos"]
+        self.products = self.header["products"]
+
+    def __len__(self):
+        return self.header["sales"]
+
+    def column(self, name):
+        view = self._columns.get(name)
+        if view is None:
+            typecode = COLUMNS[name][0]
+            offset, count = self.header["columns"][name]
+            view = self._view[offset:offset + count * array(typecode).itemsize].cast(typecode)
+            self._columns[name] = view
+        return view
+
+    def row_range(self, table, start_date, end_date):
+        """(lo, hi) rows of table ("sales" or "items") dated start_date..end_date (ISO, inclusive)."""
+        dates = self.column("sale_date" if table == "sales" else "item_date")
+        return (bisect.bisect_left(dates, _ordinal(start_date, date.min)),
+                bisect.bisect_right(dates, _ordinal(end_date, date.max)))
+
+    def close(self):
+        # Views must go before the map can close (and, on Windows, before the file can be replaced)
+        try:
+            for view in self._columns.values():
+                view.release()
+            self._view.release()
+            self._mmap.close()
+        except BufferError:
+            # A reader still holds a column; the map is freed along with it
+            pass
+        self._columns.clear()
+
+
+def get_archive(data_dir, key, build=True):
+    """
+    The archive for month key if it is closed and up to date with its
+    partition. A missing or stale one is (re)built from the partition when
+    build is set; otherwise None is returned.
+    """
+    if not _closed(key):
+        return None
+    path = archive_path(data_dir, key)
+    stamp = _source_stamp(data_dir, key)
+    with _archives_lock:
+        archive = _archives.get(path)
+        if archive is not None and archive.header.get("source") == stamp:
+            return archive
+        if archive is not None:
+            archive.close()
+            del _archives[path]
+        try:
+            archive = SalesArchive(path) if os.path.exists(path) else None
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable sales archive {path}: {e}")
+            archive = None
+        if archive is not None and archive.header.get("source") != stamp:
+            archive.close()
+            archive = None
+        if archive is None:
+            if not build:
+                return None
+            try:
+                write_archive(path, get_sales_store(data_dir).partition(key).load_all(), stamp)
+            except (KeyError, TypeError, ValueError) as e:
+                # e.g. a sale without a proper date; reports read that month from JSON
+                print(f"Could not archive sales for {key}: {e}")
+                return None
+            archive = SalesArchive(path)
+        _archives[path] = archive
+        return archive
+
+
+def close_archives():
+    """Unmap every open archive."""
+    with _archives_lock:
+        for archive in _archives.values():
+            archive.close()
+        _archives.clear()
+
+
+def archive_closed_months(data_dir):
+    """Build or refresh the archive of every closed month. Returns the keys now archived."""
+    return [key for key in get_sales_store(data_dir).partition_keys() if get_archive(data_dir, key) is not None]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar archive of closed months' sales")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("data_dir")
+    args = parser.parse_args()
+    keys = archive_closed_months(args.data_dir)
+    print(f"{len(keys)} month(s) archived in {_archive_dir(args.data_dir)}")
+    close_archives()
@@ -0,0 +1,345 @@
+# utils/sales_journal.py
+import json
+import os
+import threading
+
+from utils.helpers import DataDirRegistry, file_lock, load_json, save_json_atomic
+
+# Number of journaled sales after which a partition's journal is compacted
+COMPACT_THRESHOLD = 1000
+# Sale ids a process reserves in meta.json at a time; ids left unused when it exits are skipped
+ID_BLOCK_SIZE = 50
+
+_stores = DataDirRegistry(lambda data_dir: SalesStore(data_dir))
+
+
+def get_sales_store(data_dir):
+    """Return the shared SalesStore for data_dir (one per process)."""
+    return _stores.get(data_dir)
+
+
+def partition_key(day):
+    """Partition a sale belongs to: its YYYY-MM month ("0000-00" for undated legacy sales)."""
+    return str(day)[:7] if day else "0000-00"
+
+
+def _read_jsonl(path):
+    """Read one JSON record per line, skipping a torn last line left by a crash."""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def _read_last_record(path, block_size=4096):
+    """Return the last complete JSON line of path without reading the whole file."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        buf = b""
+        pos = end
+        while pos > 0:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+            lines = [l for l in buf.split(b"\n") if l.strip()]
+            # The first chunk line may be partial unless we reached the file start
+            candidates = lines if pos == 0 else lines[1:]
+            for line in reversed(candidates):
+                try:
+                    return json.loads(line.decode("utf-8"))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+    return None
+
+
+def _merge(snapshot, *journals):
+    """Snapshot records followed by journaled ones not already folded into it."""
+    sales = list(snapshot)
+    seen = {}
+    for sale in sales:
+        seen.setdefault(int(sale.get("id", 0)), []).append(sale)
+    for records in journals:
+        for record in records:
+            same_id = seen.setdefault(int(record.get("id", 0)), [])
+            # Only exact copies are dropped: those were folded in by an interrupted compaction
+            if record in same_id:
+                continue
+            same_id.append(record)
+            sales.append(record)
+    return sales
+
+
+class SalesJournal:
+    """
+    Append-only journal for one set of sales.
+    <name>.json holds the compacted records, <name>.jsonl holds one sale per
+    line appended since the last compaction. Appends are fsync'd so a committed
+    sale survives a power cut; compaction runs in a background thread.
+    """
+
+    def __init__(self, base_path, compact_threshold=COMPACT_THRESHOLD, on_compacted=None):
+        self.snapshot_path = f"{base_path}.json"
+        self.journal_path = f"{base_path}.jsonl"
+        self.compacting_path = f"{base_path}.jsonl.compacting"
+        self.compact_threshold = compact_threshold
+        self.on_compacted = on_compacted
+
+        self._lock = threading.Lock()          # guards appends
+        self._compact_lock = threading.Lock()  # guards snapshot rewrites vs readers
+        self._journal_count = None
+        self._compactor = None
+
+    def last_journaled_id(self):
+        """Id of the newest journaled record, read from the file tail."""
+        ids = []
+        for path in (self.journal_path, self.compacting_path):
+            last = _read_last_record(path)
+            if last and "id" in last:
+                ids.append(int(last["id"]))
+        return max(ids, default=None)
+
+    def append(self, record):
+        """Durably append one sale record."""
+        self.append_many([record])
+
+    def append_many(self, records):
+        """Durably append several records with a single write and fsync."""
+        if not records:
+            return
+        data = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in records)
+        with self._lock:
+            folder = os.path.dirname(self.journal_path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder, exist_ok=True)
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            if self._journal_count is None:
+                self._journal_count = len(_read_jsonl(self.journal_path))
+            else:
+                self._journal_count += len(records)
+            needs_compaction = self._journal_count >= self.compact_threshold
+        if needs_compaction:
+            self.compact_async()
+
+    def load_all(self):
+        """Return every record: compacted snapshot followed by journaled records."""
+        with self._compact_lock:
+            return _merge(load_json(self.snapshot_path),
+                          _read_jsonl(self.compacting_path),
+                          _read_jsonl(self.journal_path))
+
+    def compact_async(self):
+        """Start a background compaction unless one is already running."""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, daemon=True)
+        self._compactor.start()
+
+    def compact(self):
+        """Fold the journal into the snapshot. Appends only block for the rename."""
+        with self._compact_lock:
+            with self._lock:
+                if not os.path.exists(self.compacting_path):
+                    if not os.path.exists(self.journal_path):
+                        return
+                    os.replace(self.journal_path, self.compacting_path)
+                self._journal_count = 0
+
+            sales = _merge(load_json(self.snapshot_path), _read_jsonl(self.compacting_path))
+            save_json_atomic(self.snapshot_path, sales)
+            if self.on_compacted is not None:
+                # Must run before the journal tail disappears with the file below
+                self.on_compacted(max((int(s.get("id", 0)) for s in sales), default=0))
+            os.remove(self.compacting_path)
+
+
+class SalesStore:
+    """
+    Sales split into monthly partitions under <data_dir>/sales/, each one a
+    SalesJournal (sales/2025-12.json + sales/2025-12.jsonl). Date-range queries
+    open only the partitions that overlap the range. A legacy monolithic
+    sales.json (plus a sales.jsonl journal) is migrated on first use.
+    """
+
+    def __init__(self, data_dir, compact_threshold=COMPACT_THRESHOLD):
+        self.data_dir = data_dir
+        self.sales_dir = os.path.join(data_dir, "sales")
+        self.meta_path = os.path.join(self.sales_dir, "meta.json")
+        # Serializes id reservations and meta.json updates across processes
+        self.lock_path = os.path.join(self.sales_dir, "meta.lock")
+        self.compact_threshold = compact_threshold
+
+        self._lock = threading.Lock()
+        self._meta_lock = threading.Lock()
+        self._partitions = {}
+        self._next_id = None
+        self._block_end = 0
+        self._migrated = False
+
+    # ---- partitions ----
+    def _partition(self, key):
+        journal = self._partitions.get(key)
+        if journal is None:
+            journal = SalesJournal(os.path.join(self.sales_dir, key), self.compact_threshold,
+                                   on_compacted=self._save_meta)
+            self._partitions[key] = journal
+        return journal
+
+    def partition(self, key):
+        """The SalesJournal holding month key's sales."""
+        self._migrate_legacy()
+        return self._partition(key)
+
+    def partition_keys(self):
+        """Sorted YYYY-MM keys of every partition on disk."""
+        self._migrate_legacy()
+        if not os.path.isdir(self.sales_dir):
+            return []
+        keys = set()
+        for name in os.listdir(self.sales_dir):
+            key = name.split(".", 1)[0]
+            if len(key) == 7 and key[4] == "-":
+                keys.add(key)
+        return sorted(keys)
+
+    # ---- migration ----
+    def _migrate_legacy(self):
+        """Split a monolithic sales.json/sales.jsonl into monthly partitions once."""
+        if self._migrated:
+            return
+        with self._lock:
+            if self._migrated:
+                return
+            legacy = SalesJournal(os.path.join(self.data_dir, "sales"))
+            legacy_files = [p for p in (legacy.snapshot_path, legacy.journal_path, legacy.compacting_path)
+                            if os.path.exists(p)]
+            if legacy_files:
+                by_month = {}
+                last_id = 0
+                for sale in legacy.load_all():
+                    key = partition_key(sale.get("date", ""))
+                    by_month.setdefault(key, []).append(sale)
+                    last_id = max(last_id, int(sale.get("id", 0)))
+                for key, sales in by_month.items():
+                    save_json_atomic(os.path.join(self.sales_dir, f"{key}.json"),
+                                     _merge(load_json(os.path.join(self.sales_dir, f"{key}.json")), sales))
+                with file_lock(self.lock_path):
+                    meta = load_json(self.meta_path)
+                    if isinstance(meta, dict):
+                        last_id = max(last_id, int(meta.get("last_id", 0)))
+                    save_json_atomic(self.meta_path, {"last_id": last_id})
+                # Keep the originals around as a backup, out of the way of the next start
+                for path in legacy_files:
+                    os.replace(path, f"{path}.migrated")
+                old_meta = os.path.join(self.data_dir, "sales_meta.json")
+                if os.path.exists(old_meta):
+                    os.remove(old_meta)
+            self._migrated = True
+
+    # ---- id allocation ----
+    def _load_last_id(self):
+        ids = []
+        meta = load_json(self.meta_path)
+        if isinstance(meta, dict) and "last_id" in meta:
+            ids.append(int(meta["last_id"]))
+        for key in self.partition_keys():
+            last = self._partition(key).last_journaled_id()
+            if last is not None:
+                ids.append(last)
+        if not ids:
+            # No journal tails and no meta: derive from the compacted partitions once
+            for key in self.partition_keys():
+                ids.extend(int(s.get("id", 0)) for s in load_json(self._partition(key).snapshot_path))
+        return max(ids, default=0)
+
+    def _reserve_ids(self, count):
+        """
+        Reserve the next count ids in meta.json under the OS file lock, so tills
+        and processes sharing data_dir never hand out the same id. The journal
+        tails are read again each time, for ids written before meta.json was.
+        Returns the first id reserved.
+        """
+        with self._meta_lock, file_lock(self.lock_path):
+            first = self._load_last_id() + 1
+            save_json_atomic(self.meta_path, {"last_id": first + count - 1})
+        return first
+
+    def next_id(self):
+        """Allocate the next sale id without touching the full history."""
+        self._migrate_legacy()
+        with self._lock:
+            if self._next_id is None or self._next_id > self._block_end:
+                self._next_id = self._reserve_ids(ID_BLOCK_SIZE)
+                self._block_end = self._next_id + ID_BLOCK_SIZE - 1
+            sale_id = self._next_id
+            self._next_id += 1
+            return sale_id
+
+    # ---- writes ----
+    def append(self, record):
+        """Durably append one sale record to its month's partition."""
+        self.append_many([record])
+
+    def append_many(self, records):
+        """Durably append sale records, one write and fsync per partition touched."""
+        self._migrate_legacy()
+        by_key = {}
+        for record in records:
+            by_key.setdefault(partition_key(record["date"]), []).append(record)
+        with self._lock:
+            journals = {key: self._partition(key) for key in by_key}
+            ids = [int(r["id"]) for r in records if "id" in r]
+            if ids and self._next_id is not None and max(ids) >= self._next_id:
+                # Ids from outside our block: reserve a fresh block past them
+                self._next_id = None
+        for key, batch in by_key.items():
+            journals[key].append_many(batch)
+
+    def _save_meta(self, compacted_id):
+        """Persist the id high-water mark once a journal tail is about to be compacted away."""
+        with self._meta_lock, file_lock(self.lock_path):
+            meta = load_json(self.meta_path)
+            last_id = int(meta.get("last_id", 0)) if isinstance(meta, dict) else 0
+            if compacted_id > last_id:
+                save_json_atomic(self.meta_path, {"last_id": compacted_id})
+
+    def compact(self):
+        """Compact every partition's journal now."""
+        for key in self.partition_keys():
+            self._partition(key).compact()
+
+    # ---- reads ----
+    def query(self, start_date, end_date=None):
+        """Sales with start_date <= date <= end_date (ISO strings), opening only the overlapping partitions."""
+        end_date = end_date or start_date
+        first, last = partition_key(start_date), partition_key(end_date)
+        sales = []
+        for key in self.partition_keys():
+            if key < first or key > last:
+                continue
+            for sale in self._partition(key).load_all():
+                if start_date <= sale.get("date", "") <= end_date:
+                    sales.append(sale)
+        return sales
+
+    def load_all(self):
+        """Every sale across all partitions, oldest month first."""
+        sales = []
+        for key in self.partition_keys():
+            sales.extend(self._partition(key).load_all())
+        return sales
@@ -1,4 +1,7 @@
 import bcrypt
 
+def hash_password(plain):
+    return bcrypt.hashpw(plain.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
 def verify_password(hashed, plain):
     return bcrypt.checkpw(plain.encode('utf-8'), hashed.encode('utf-8'))
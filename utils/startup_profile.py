@@ -0,0 +1,113 @@
+# utils/startup_profile.py
+import builtins
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Entries shorter than this are left out of the report
+REPORT_MIN_MS = 1.0
+
+_profiler = None
+
+
+class StartupProfiler:
+    """
+    Times first imports (self time, excluding nested imports) and labelled
+    construction spans. Only active when started with --profile-startup.
+    """
+
+    def __init__(self):
+        self.imports = {}
+        self.spans = []
+        self._stack = []
+        self._original_import = None
+        self._thread = threading.get_ident()
+        self.started = time.perf_counter()
+
+    def install(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or threading.get_ident() != self._thread:
+            return self._original_import(name, globals, locals, fromlist, level)
+        # "from pkg import module" loads the submodule without another __import__ call
+        label = name
+        if name in sys.modules:
+            module = sys.modules[name]
+            new = [f"{name}.{attr}" for attr in fromlist or ()
+                   if attr != "*" and not hasattr(module, attr)]
+            if not new:
+                return self._original_import(name, globals, locals, fromlist, level)
+            label = ", ".join(new)
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._stack.pop()
+            self.imports[label] = self.imports.get(label, 0.0) + elapsed - nested
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    @contextmanager
+    def span(self, label):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((label, time.perf_counter() - start))
+
+    def report(self):
+        lines = [f"Startup profile ({(time.perf_counter() - self.started) * 1000:.0f} ms since start)", "",
+                 "Imports (self time):"]
+        for name, seconds in sorted(self.imports.items(), key=lambda kv: kv[1], reverse=True):
+            if seconds * 1000 >= REPORT_MIN_MS:
+                lines.append(f"  {seconds * 1000:8.1f} ms  {name}")
+        lines.append("")
+        lines.append("Construction:")
+        for label, seconds in self.spans:
+            lines.append(f"  {seconds * 1000:8.1f} ms  {label}")
+        return "\n".join(lines)
+
+
+def start_profiling():
+    """Install the import hook. Call before the modules to be measured are imported."""
+    global _profiler
+    if _profiler is None:
+        _profiler = StartupProfiler()
+        _profiler.install()
+    return _profiler
+
+
+def get_profiler():
+    return _profiler
+
+
+def span(label):
+    """Time a block when profiling is on; costs nothing otherwise."""
+    if _profiler is None:
+        return nullcontext()
+    return _profiler.span(label)
+
+
+def write_report(path=None):
+    """Print the report (and save it to path). No-op when profiling is off."""
+    if _profiler is None:
+        return None
+    text = _profiler.report()
+    print(text)
+    if path:
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        except Exception as e:
+            print("Could not write startup profile:", e)
+    return text
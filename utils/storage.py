@@ -0,0 +1,690 @@
+# utils/storage.py
+import argparse
+import os
+import sqlite3
+import threading
+
+from config import STORAGE_BACKEND
+from utils.helpers import DataDirRegistry, load_json, get_today_date
+from utils.catalog import get_catalog
+from utils.data_cache import get_data_cache
+from utils.inventory_ledger import get_ledger
+from utils.promotions import get_promo_index, promo_problem, PromoUnavailable
+from utils.sales_journal import get_sales_store, partition_key
+from utils.sales_archive import get_archive
+from utils.rollups import get_rollup, record_sales
+from utils.user_store import get_user_store
+from utils.security import hash_password, verify_password
+
+DB_FILE = "store.db"
+
+# Change notification topics a screen can subscribe to
+TOPICS = ("products", "promos", "sales")
+
+
+def _open_backend(data_dir, name=None):
+    name = name or os.environ.get("JUSTB_STORAGE") or STORAGE_BACKEND
+    if name == "sqlite":
+        return SQLiteBackend(os.path.join(data_dir, DB_FILE))
+    if name == "json":
+        return JsonBackend(data_dir)
+    raise ValueError(f"Unknown storage backend: {name}")
+
+
+_backends = DataDirRegistry(_open_backend)
+
+
+def get_backend(data_dir, name=None):
+    """
+    Return the shared storage backend for data_dir.
+    name is "json" or "sqlite"; it defaults to the JUSTB_STORAGE environment
+    variable, then config.STORAGE_BACKEND. The first call decides for the process.
+    """
+    return _backends.get(data_dir, name)
+
+
+PROMO_COLUMNS = "code, discount_percentage, max_uses, uses_left, start_date, end_date, is_active"
+
+
+def _promo_row(promo):
+    return (promo["code"], float(promo.get("discount_percentage", 0)),
+            int(promo.get("max_uses", 0)), int(promo.get("uses_left", 0)),
+            promo.get("start_date") or None, promo.get("end_date") or None,
+            1 if promo.get("is_active", True) else 0)
+
+
+def _promo_from_row(row):
+    promo = dict(row)
+    promo["is_active"] = bool(promo["is_active"])
+    for field in ("start_date", "end_date"):
+        if promo[field] is None:
+            del promo[field]
+    return promo
+
+
+def _edit_changes(old_barcode, old_qty, product):
+    """Ledger changes for replacing a product's barcode/quantity with product's."""
+    barcode, qty = str(product["barcode"]), int(product["quantity"])
+    if barcode != str(old_barcode):
+        return [(old_barcode, -old_qty, "delete", "renamed"), (barcode, qty, "restock", "renamed")]
+    delta = qty - old_qty
+    return [(barcode, delta, "restock" if delta > 0 else "adjustment", "edited")]
+
+
+def _promo_uses(sales):
+    """(code, day) for every sale that carries a promo code."""
+    return [(sale["promo_code"], sale.get("date") or get_today_date()) for sale in sales if sale.get("promo_code")]
+
+
+class _TopicCallback:
+    """Adapts the cache's callback(key) to callback(topic); equal for the same pair so unsubscribe works."""
+
+    def __init__(self, topic, callback):
+        self.topic = topic
+        self.callback = callback
+
+    def __call__(self, key):
+        self.callback(self.topic)
+
+    def __eq__(self, other):
+        return isinstance(other, _TopicCallback) and (self.topic, self.callback) == (other.topic, other.callback)
+
+
+class _ChangeTopics:
+    """
+    subscribe()/version()/poll_changes() shared by the backends, on top of the
+    process-wide data cache. Subclasses map each topic to a cache key.
+    """
+
+    def _topic_key(self, topic):
+        raise NotImplementedError
+
+    def subscribe(self, topic, callback):
+        """Call callback(topic) from poll_changes() after topic's data changes."""
+        if topic not in TOPICS:
+            raise ValueError(f"Unknown topic: {topic}")
+        get_data_cache().subscribe(self._topic_key(topic), _TopicCallback(topic, callback))
+
+    def unsubscribe(self, topic, callback):
+        get_data_cache().unsubscribe(self._topic_key(topic), _TopicCallback(topic, callback))
+
+    def version(self, topic):
+        """Bumped on every change to topic; compare to skip refreshing after your own write."""
+        return get_data_cache().version(self._topic_key(topic))
+
+    def _changed(self, *topics):
+        cache = get_data_cache()
+        for topic in topics:
+            cache.touch(self._topic_key(topic))
+
+    def poll_changes(self):
+        """Pick up outside changes and notify subscribers. Call from the Tk thread."""
+        get_data_cache().poll()
+
+
+class JsonBackend(_ChangeTopics):
+    """The JSON files under data_dir, through the data cache, catalog, sales store and rollups."""
+
+    name = "json"
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+
+    def _topic_key(self, topic):
+        # Sales live in the partitioned journal; its folder stands in as the key
+        return os.path.join(self.data_dir, {"products": "products.json",
+                                            "promos": "promo_codes.json",
+                                            "sales": "sales"}[topic])
+
+    # ---- products ----
+    def get_product(self, barcode):
+        return get_catalog(self.data_dir).get(barcode)
+
+    def list_products(self):
+        return list(get_catalog(self.data_dir).all())
+
+    def ledger(self):
+        """The inventory ledger, started from (and checked against) the quantities in products.json."""
+        catalog = get_catalog(self.data_dir)
+        return get_ledger(self.data_dir,
+                          lambda: {str(p["barcode"]): int(p.get("quantity", 0)) for p in catalog.all()})
+
+    def add_product(self, product):
+        ledger = self.ledger()
+        catalog = get_catalog(self.data_dir)
+        catalog.refresh_if_changed(force=True)
+        catalog.all().append(product)
+        catalog.save()
+        ledger.record([(product["barcode"], int(product["quantity"]), "restock", "added")])
+
+    def update_product(self, old_barcode, product):
+        ledger = self.ledger()
+        catalog = get_catalog(self.data_dir)
+        catalog.refresh_if_changed(force=True)
+        existing = catalog.get(old_barcode)
+        if existing is not None:
+            old_qty = int(existing.get("quantity", 0))
+            updated = dict(existing)
+            updated.update(product)
+            catalog.replace(existing, updated)
+            catalog.save(reindex=False)
+            ledger.record(_edit_changes(old_barcode, old_qty, updated))
+
+    def upsert_products(self, products, add_stock=False):
+        """
+        Add or update products by barcode with a single save, e.g. a supplier
+        catalog. add_stock adds the given quantities to the stock on hand
+        instead of replacing it. Returns (added, updated).
+        """
+        ledger = self.ledger()
+        catalog = get_catalog(self.data_dir)
+        catalog.refresh_if_changed(force=True)
+        items = catalog.all()
+        by_barcode = {str(p.get("barcode", "")): p for p in items}
+        changes = []
+        added = updated = 0
+        for product in products:
+            barcode = str(product["barcode"])
+            existing = by_barcode.get(barcode)
+            if existing is None:
+                product = dict(product, barcode=barcode)
+                items.append(product)
+                by_barcode[barcode] = product
+                changes.append((barcode, int(product["quantity"]), "restock", "import"))
+                added += 1
+                continue
+            old_qty = int(existing.get("quantity", 0))
+            merged = dict(existing)
+            merged.update(product, barcode=barcode)
+            if add_stock:
+                merged["quantity"] = old_qty + int(product["quantity"])
+            catalog.replace(existing, merged)
+            by_barcode[barcode] = merged
+            delta = int(merged["quantity"]) - old_qty
+            changes.append((barcode, delta, "restock" if delta > 0 else "adjustment", "import"))
+            updated += 1
+        catalog.save()
+        ledger.record(changes)
+        return added, updated
+
+    def delete_products(self, barcodes):
+        ledger = self.ledger()
+        barcodes = {str(b) for b in barcodes}
+        catalog = get_catalog(self.data_dir)
+        catalog.refresh_if_changed(force=True)
+        products = catalog.all()
+        removed = [p for p in products if str(p.get("barcode", "")) in barcodes]
+        products[:] = [p for p in products if str(p.get("barcode", "")) not in barcodes]
+        catalog.save()
+        ledger.record([(p["barcode"], -int(p.get("quantity", 0)), "delete", "deleted") for p in removed])
+
+    # ---- sales ----
+    def commit_sale(self, sale):
+        """Decrement stock for the sale's items and record it. Returns the new sale id."""
+        return self.commit_sales([sale])[0]
+
+    def commit_sales(self, sales):
+        """
+        commit_sale for many sales at once: one products save, one journal
+        fsync per month and one rollup save per day. Promo codes on the sales
+        are redeemed here, not when applied, and before anything else: if one
+        is no longer usable PromoUnavailable is raised and nothing is written.
+        The journal append is the commit point; if it fails the stock and the
+        promo uses are given back. Returns the new ids.
+        """
+        if not sales:
+            return []
+        promos = get_promo_index(self.data_dir)
+        uses = _promo_uses(sales)
+        promos.redeem(uses)
+        ledger = self.ledger()
+        # Re-check the file so edits from other screens are not lost
+        catalog = get_catalog(self.data_dir)
+        catalog.refresh_if_changed(force=True)
+        deltas = []
+        try:
+            for sale in sales:
+                for item in sale["items"]:
+                    prod = catalog.get(item["barcode"])
+                    if prod:
+                        old_qty = int(prod.get("quantity", 0))
+                        sold = dict(prod, quantity=max(0, old_qty - int(item["quantity"])))
+                        catalog.replace(prod, sold)
+                        deltas.append((sale, prod, sold, sold["quantity"] - old_qty))
+            # Appended to the months' sales partitions, not a full rewrite
+            sales_store = get_sales_store(self.data_dir)
+            for sale in sales:
+                sale["id"] = sales_store.next_id()
+            sales_store.append_many(sales)
+        except BaseException:
+            for _, prod, sold, _ in reversed(deltas):
+                catalog.replace(sold, prod)
+            promos.release(uses)
+            raise
+        catalog.save(reindex=False)
+        record_sales(self.data_dir, sales)
+        ledger.record([(prod["barcode"], delta, "sale", sale["id"]) for sale, prod, _, delta in deltas])
+        # Redemptions go to the promo log, not promo_codes.json, so say so explicitly
+        self._changed(*(("sales", "promos") if uses else ("sales",)))
+        return [sale["id"] for sale in sales]
+
+    def query_sales(self, start_date, end_date=None):
+        return get_sales_store(self.data_dir).query(start_date, end_date)
+
+    def daily_summary(self, day):
+        return get_rollup(self.data_dir, day)
+
+    def sale_archives(self, start_date, end_date):
+        """
+        Columnar archives of the closed months overlapping start..end, and the
+        (start, end) ranges they do not cover, to be read with sale_rows.
+        """
+        archives, gaps = [], []
+        first, last = partition_key(start_date), partition_key(end_date)
+        for key in get_sales_store(self.data_dir).partition_keys():
+            if key < first or key > last:
+                continue
+            archive = get_archive(self.data_dir, key)
+            if archive is not None:
+                archives.append(archive)
+            else:
+                gaps.append((max(start_date, f"{key}-01"), min(end_date, f"{key}-31")))
+        return archives, gaps
+
+    def sale_rows(self, start_date, end_date):
+        """Flat rows for reports: sales as (date, total), items as (date, barcode, name, quantity, price)."""
+        sales, items = [], []
+        for sale in self.query_sales(start_date, end_date):
+            day = sale["date"]
+            sales.append((day, float(sale.get("total", 0))))
+            items.extend((day, str(i["barcode"]), i.get("name", ""), int(i["quantity"]), float(i["price"]))
+                         for i in sale.get("items", []))
+        return sales, items
+
+    # ---- promotions ----
+    def list_promos(self):
+        return list(get_promo_index(self.data_dir).all())
+
+    def get_promo(self, code):
+        return get_promo_index(self.data_dir).get(code)
+
+    def add_promo(self, promo):
+        self.add_promos([promo])
+
+    def add_promos(self, promos):
+        """Add or replace promos by code with one save (e.g. a batch of generated coupons)."""
+        get_promo_index(self.data_dir).add_many(promos)
+
+    def delete_promo(self, code):
+        index = get_promo_index(self.data_dir)
+        index.replace([p for p in index.all() if p.get("code") != code])
+
+    # ---- users ----
+    def authenticate(self, username, password):
+        return get_user_store(self.data_dir).authenticate(username, password)
+
+
+class SQLiteBackend(_ChangeTopics):
+    """
+    SQLite database in WAL mode: products indexed by barcode, sales by date,
+    stock changed with single-row UPDATEs and every sale written in one
+    transaction. Each thread gets its own connection; sqlite3 caches the
+    compiled statements per connection, so the constant SQL below is prepared
+    once and re-executed with new parameters.
+    """
+
+    name = "sqlite"
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS products (
+            barcode TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            price REAL NOT NULL,
+            quantity INTEGER NOT NULL DEFAULT 0
+        )""",
+        """CREATE TABLE IF NOT EXISTS sales (
+            id INTEGER PRIMARY KEY,
+            user TEXT,
+            date TEXT NOT NULL,
+            total REAL NOT NULL,
+            discount REAL NOT NULL DEFAULT 0,
+            promo_code TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_sales_date ON sales(date)",
+        """CREATE TABLE IF NOT EXISTS sale_items (
+            sale_id INTEGER NOT NULL REFERENCES sales(id),
+            barcode TEXT NOT NULL,
+            name TEXT NOT NULL,
+            price REAL NOT NULL,
+            quantity INTEGER NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_sale_items_sale ON sale_items(sale_id)",
+        """CREATE TABLE IF NOT EXISTS promo_codes (
+            code TEXT PRIMARY KEY,
+            discount_percentage REAL NOT NULL,
+            max_uses INTEGER NOT NULL,
+            uses_left INTEGER NOT NULL,
+            start_date TEXT,
+            end_date TEXT,
+            is_active INTEGER NOT NULL DEFAULT 1
+        )""",
+        """CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            password_hash TEXT NOT NULL,
+            role TEXT NOT NULL
+        )""",
+    ]
+
+    # Columns added since the first schema: (table, column, definition)
+    MIGRATIONS = [
+        ("sales", "promo_code", "TEXT"),
+        ("promo_codes", "start_date", "TEXT"),
+        ("promo_codes", "end_date", "TEXT"),
+        ("promo_codes", "is_active", "INTEGER NOT NULL DEFAULT 1"),
+    ]
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._dummy_hash = None
+        self._data_version = None
+        with self._transaction() as conn:
+            for sql in self.SCHEMA:
+                conn.execute(sql)
+            for table, column, definition in self.MIGRATIONS:
+                if column not in {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            folder = os.path.dirname(self.db_path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder, exist_ok=True)
+            # isolation_level=None: transactions are opened explicitly with BEGIN
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    class _Transaction:
+        def __init__(self, conn):
+            self.conn = conn
+
+        def __enter__(self):
+            # IMMEDIATE takes the write lock up front so two tills cannot interleave
+            self.conn.execute("BEGIN IMMEDIATE")
+            return self.conn
+
+        def __exit__(self, exc_type, exc, tb):
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+            return False
+
+    def _transaction(self):
+        return self._Transaction(self._conn())
+
+    # ---- change notification ----
+    def _topic_key(self, topic):
+        return f"{self.db_path}#{topic}"
+
+    def poll_changes(self):
+        # data_version moves when another connection (another till) commits
+        version = self._conn().execute("PRAGMA data_version").fetchone()[0]
+        if self._data_version is not None and version != self._data_version:
+            self._changed(*TOPICS)
+        self._data_version = version
+        super().poll_changes()
+
+    # ---- products ----
+    def get_product(self, barcode):
+        row = self._conn().execute(
+            "SELECT barcode, name, price, quantity FROM products WHERE barcode = ?", (str(barcode),)).fetchone()
+        return dict(row) if row else None
+
+    def list_products(self):
+        rows = self._conn().execute("SELECT barcode, name, price, quantity FROM products ORDER BY rowid")
+        return [dict(row) for row in rows]
+
+    def ledger(self):
+        """The inventory ledger next to the database, started from (and checked against) its quantities."""
+        return get_ledger(os.path.dirname(os.path.abspath(self.db_path)),
+                          lambda: {p["barcode"]: int(p["quantity"]) for p in self.list_products()})
+
+    def _quantity(self, conn, barcode):
+        row = conn.execute("SELECT quantity FROM products WHERE barcode = ?", (str(barcode),)).fetchone()
+        return None if row is None else int(row[0])
+
+    def add_product(self, product):
+        ledger = self.ledger()
+        with self._transaction() as conn:
+            conn.execute("INSERT INTO products (barcode, name, price, quantity) VALUES (?, ?, ?, ?)",
+                         (str(product["barcode"]), product["name"], float(product["price"]), int(product["quantity"])))
+        ledger.record([(product["barcode"], int(product["quantity"]), "restock", "added")])
+        self._changed("products")
+
+    def update_product(self, old_barcode, product):
+        ledger = self.ledger()
+        with self._transaction() as conn:
+            old_qty = self._quantity(conn, old_barcode)
+            conn.execute("UPDATE products SET barcode = ?, name = ?, price = ?, quantity = ? WHERE barcode = ?",
+                         (str(product["barcode"]), product["name"], float(product["price"]),
+                          int(product["quantity"]), str(old_barcode)))
+        if old_qty is not None:
+            ledger.record(_edit_changes(old_barcode, old_qty, product))
+        self._changed("products")
+
+    def upsert_products(self, products, add_stock=False):
+        """Add or update products by barcode in one transaction. Returns (added, updated)."""
+        ledger = self.ledger()
+        changes = []
+        rows = []
+        with self._transaction() as conn:
+            stock = {barcode: int(qty) for barcode, qty in conn.execute("SELECT barcode, quantity FROM products")}
+            added = 0
+            for product in products:
+                barcode, qty = str(product["barcode"]), int(product["quantity"])
+                old_qty = stock.get(barcode)
+                if old_qty is None:
+                    added += 1
+                    old_qty = 0
+                elif add_stock:
+                    qty += old_qty
+                stock[barcode] = qty
+                delta = qty - old_qty
+                changes.append((barcode, delta, "restock" if delta > 0 else "adjustment", "import"))
+                rows.append((barcode, product["name"], float(product["price"]), qty))
+            conn.executemany("INSERT INTO products (barcode, name, price, quantity) VALUES (?, ?, ?, ?) "
+                             "ON CONFLICT(barcode) DO UPDATE SET name = excluded.name, price = excluded.price, "
+                             "quantity = excluded.quantity", rows)
+        ledger.record(changes)
+        self._changed("products")
+        return added, len(rows) - added
+
+    def delete_products(self, barcodes):
+        ledger = self.ledger()
+        changes = []
+        with self._transaction() as conn:
+            for barcode in barcodes:
+                qty = self._quantity(conn, barcode)
+                if qty is not None:
+                    changes.append((str(barcode), -qty, "delete", "deleted"))
+            conn.executemany("DELETE FROM products WHERE barcode = ?", [(str(b),) for b in barcodes])
+        ledger.record(changes)
+        self._changed("products")
+
+    # ---- sales ----
+    def commit_sale(self, sale):
+        """Decrement stock and insert the sale with its items in one transaction. Returns the sale id."""
+        return self.commit_sales([sale])[0]
+
+    def commit_sales(self, sales):
+        """
+        commit_sale for many sales in a single transaction. Promo codes are
+        redeemed in the same transaction; if one is no longer usable
+        PromoUnavailable is raised and everything is rolled back. Returns the new ids.
+        """
+        if not sales:
+            return []
+        ledger = self.ledger()
+        items, changes, quantities = [], [], {}
+        with self._transaction() as conn:
+            # The write lock is already held, so no other till can take the same use
+            for code, day in _promo_uses(sales):
+                row = conn.execute(f"SELECT {PROMO_COLUMNS} FROM promo_codes WHERE code = ?", (code,)).fetchone()
+                problem = promo_problem(_promo_from_row(row) if row else None, day)
+                if problem:
+                    raise PromoUnavailable(code, problem)
+                conn.execute("UPDATE promo_codes SET uses_left = uses_left - 1 WHERE code = ?", (code,))
+            for sale in sales:
+                cur = conn.execute("INSERT INTO sales (user, date, total, discount, promo_code) VALUES (?, ?, ?, ?, ?)",
+                                   (sale.get("user"), sale.get("date") or get_today_date(),
+                                    float(sale["total"]), float(sale.get("discount", 0)), sale.get("promo_code")))
+                sale["id"] = cur.lastrowid
+                items.extend((sale["id"], str(i["barcode"]), i["name"], float(i["price"]), int(i["quantity"]))
+                             for i in sale["items"])
+                for i in sale["items"]:
+                    barcode = str(i["barcode"])
+                    if barcode not in quantities:
+                        quantities[barcode] = self._quantity(conn, barcode)
+                    old_qty = quantities[barcode]
+                    if old_qty is not None:
+                        quantities[barcode] = max(0, old_qty - int(i["quantity"]))
+                        changes.append((barcode, quantities[barcode] - old_qty, "sale", sale["id"]))
+            conn.executemany("INSERT INTO sale_items (sale_id, barcode, name, price, quantity) VALUES (?, ?, ?, ?, ?)",
+                             items)
+            # Quantities were read under the write lock, so the new values can be set outright
+            conn.executemany("UPDATE products SET quantity = ? WHERE barcode = ?",
+                             [(qty, barcode) for barcode, qty in quantities.items() if qty is not None])
+        ledger.record(changes)
+        self._changed("products", "sales", "promos")
+        return [sale["id"] for sale in sales]
+
+    def _sales_with_items(self, rows):
+        sales = []
+        conn = self._conn()
+        for row in rows:
+            sale = {"id": row["id"], "user": row["user"], "total": row["total"], "date": row["date"]}
+            if row["discount"]:
+                sale["discount"] = row["discount"]
+            if row["promo_code"]:
+                sale["promo_code"] = row["promo_code"]
+            sale["items"] = [dict(i) for i in conn.execute(
+                "SELECT barcode, name, price, quantity FROM sale_items WHERE sale_id = ? ORDER BY rowid",
+                (row["id"],))]
+            sales.append(sale)
+        return sales
+
+    def query_sales(self, start_date, end_date=None):
+        rows = self._conn().execute(
+            "SELECT id, user, date, total, discount, promo_code FROM sales WHERE date BETWEEN ? AND ? ORDER BY id",
+            (start_date, end_date or start_date)).fetchall()
+        return self._sales_with_items(rows)
+
+    def daily_summary(self, day):
+        conn = self._conn()
+        count, revenue = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(total), 0) FROM sales WHERE date = ?", (day,)).fetchone()
+        products = {}
+        for row in conn.execute(
+                "SELECT i.barcode, MIN(i.name) AS name, SUM(i.quantity) AS qty, SUM(i.price * i.quantity) AS revenue "
+                "FROM sales s JOIN sale_items i ON i.sale_id = s.id WHERE s.date = ? "
+                "GROUP BY i.barcode ORDER BY MIN(i.rowid)", (day,)):
+            products[row["barcode"]] = {"name": row["name"], "qty": row["qty"], "revenue": row["revenue"]}
+        return {"date": day, "revenue": revenue, "sales_count": count, "products": products}
+
+    def sale_archives(self, start_date, end_date):
+        # The database is already indexed by date; there is nothing to re-parse
+        return [], [(start_date, end_date)]
+
+    def sale_rows(self, start_date, end_date):
+        """Flat rows for reports: sales as (date, total), items as (date, barcode, name, quantity, price)."""
+        # Plain tuples: building a sqlite3.Row per item is a large share of the time here
+        cur = self._conn().cursor()
+        cur.row_factory = None
+        sales = cur.execute("SELECT date, total FROM sales WHERE date BETWEEN ? AND ?",
+                            (start_date, end_date)).fetchall()
+        items = cur.execute(
+            "SELECT s.date, i.barcode, i.name, i.quantity, i.price FROM sales s JOIN sale_items i ON i.sale_id = s.id "
+            "WHERE s.date BETWEEN ? AND ?", (start_date, end_date)).fetchall()
+        return sales, items
+
+    # ---- promotions ----
+    def list_promos(self):
+        rows = self._conn().execute(f"SELECT {PROMO_COLUMNS} FROM promo_codes ORDER BY rowid")
+        return [_promo_from_row(row) for row in rows]
+
+    def get_promo(self, code):
+        row = self._conn().execute(f"SELECT {PROMO_COLUMNS} FROM promo_codes WHERE code = ?", (code,)).fetchone()
+        return _promo_from_row(row) if row else None
+
+    def add_promo(self, promo):
+        self.add_promos([promo])
+
+    def add_promos(self, promos):
+        """Add or replace promos by code in one transaction (e.g. a batch of generated coupons)."""
+        with self._transaction() as conn:
+            conn.executemany(f"INSERT OR REPLACE INTO promo_codes ({PROMO_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             [_promo_row(p) for p in promos])
+        self._changed("promos")
+
+    def delete_promo(self, code):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM promo_codes WHERE code = ?", (code,))
+        self._changed("promos")
+
+    # ---- users ----
+    def authenticate(self, username, password):
+        row = self._conn().execute(
+            "SELECT username, password_hash, role FROM users WHERE username = ?", (username.strip(),)).fetchone()
+        if self._dummy_hash is None:
+            self._dummy_hash = hash_password("")
+        if row is None:
+            # Spend the same time as a real check so unknown names are not revealed
+            verify_password(self._dummy_hash, password)
+            return None
+        if not verify_password(row["password_hash"], password):
+            return None
+        return dict(row)
+
+    # ---- import ----
+    def import_json(self, data_dir):
+        """One-shot import of products, sales, promo codes and users from a JSON data dir."""
+        products = load_json(os.path.join(data_dir, "products.json"))
+        sales = get_sales_store(data_dir).load_all()
+        # uses_left with the logged redemptions taken off
+        promos = get_promo_index(data_dir).all()
+        users = load_json(os.path.join(data_dir, "users.json"))
+
+        with self._transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO products (barcode, name, price, quantity) VALUES (?, ?, ?, ?)",
+                             [(str(p["barcode"]), p.get("name", ""), float(p.get("price", 0)),
+                               int(p.get("quantity", 0))) for p in products])
+            conn.executemany("INSERT OR REPLACE INTO sales (id, user, date, total, discount, promo_code) "
+                             "VALUES (?, ?, ?, ?, ?, ?)",
+                             [(int(s["id"]), s.get("user"), s.get("date", ""), float(s.get("total", 0)),
+                               float(s.get("discount", 0)), s.get("promo_code")) for s in sales])
+            conn.executemany("DELETE FROM sale_items WHERE sale_id = ?", [(int(s["id"]),) for s in sales])
+            conn.executemany("INSERT INTO sale_items (sale_id, barcode, name, price, quantity) VALUES (?, ?, ?, ?, ?)",
+                             [(int(s["id"]), str(i["barcode"]), i.get("name", ""), float(i.get("price", 0)),
+                               int(i.get("quantity", 0))) for s in sales for i in s.get("items", [])])
+            conn.executemany(f"INSERT OR REPLACE INTO promo_codes ({PROMO_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             [_promo_row(p) for p in promos])
+            conn.executemany("INSERT OR REPLACE INTO users (username, password_hash, role) VALUES (?, ?, ?)",
+                             [(str(u.get("username", "")).strip(),
+                               u.get("password_hash") or hash_password(str(u.get("password", "")).strip()),
+                               u.get("role", "User")) for u in users])
+        return {"products": len(products), "sales": len(sales), "promo_codes": len(promos), "users": len(users)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Storage backend maintenance")
+    parser.add_argument("command", choices=["import"])
+    parser.add_argument("data_dir", help="JSON data folder to import from")
+    parser.add_argument("--db", help=f"SQLite file to import into (default: <data_dir>/{DB_FILE})")
+    args = parser.parse_args()
+    backend = SQLiteBackend(args.db or os.path.join(args.data_dir, DB_FILE))
+    counts = backend.import_json(args.data_dir)
+    print("Imported " + ", ".join(f"{n} {what}" for what, n in counts.items()) + f" into {backend.db_path}")
@@ -0,0 +1,195 @@
+# utils/store_client.py
+import itertools
+import json
+import socket
+import uuid
+
+from config import STORE_SERVER
+from utils.cart import Cart
+from utils.checkout import CheckoutEngine, CheckoutError, UnknownProduct, OutOfStock, InvalidPromo
+
+# Seconds to wait for the server before giving up on a request
+REQUEST_TIMEOUT = 10.0
+
+_ERRORS = {cls.__name__: cls for cls in (UnknownProduct, OutOfStock, InvalidPromo)}
+
+
+class ServerUnavailable(CheckoutError):
+    """The store server could not be reached or dropped the connection."""
+
+
+def open_checkout(data_dir, user_name="Unknown"):
+    """The till's checkout: through the store server when config.STORE_SERVER is set, else local."""
+    if STORE_SERVER:
+        host, _, port = STORE_SERVER.rpartition(":")
+        return StoreClient(host or "127.0.0.1", int(port), user_name=user_name)
+    return CheckoutEngine(data_dir, user_name)
+
+
+class StoreClient:
+    """
+    CheckoutEngine's interface (lookup, scan, remove, apply_promo, commit,
+    clear, commit_batch) served by a StoreServer. The cart is mirrored
+    locally so the POS screen can subscribe to it as usual. If the connection
+    drops, the next call reconnects and re-scans the cart to win back its
+    reservations.
+
+    Each commit carries a key that is kept until the server answers, so
+    committing again after a dropped connection or a timeout returns the
+    first sale instead of recording it twice.
+    """
+
+    def __init__(self, host, port, user_name="Unknown", timeout=REQUEST_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.user_name = user_name
+        self.timeout = timeout
+        self.cart = Cart()
+        self.promo = None
+        self._ids = itertools.count(1)
+        # Key of a commit sent without an answer; reused when it is retried
+        self._commit_key = None
+        self._sock = None
+        self._file = None
+
+    # ---- transport ----
+    def _connect(self):
+        try:
+            self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError as e:
+            raise ServerUnavailable(f"Store server unavailable: {e}") from e
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._sock.makefile("rwb")
+        self._send("hello", user=self.user_name)
+
+    def _send(self, op, **params):
+        request = dict(params, id=next(self._ids), op=op)
+        try:
+            self._file.write((json.dumps(request, default=str) + "\n").encode("utf-8"))
+            self._file.flush()
+            line = self._file.readline()
+        except OSError as e:
+            self.close()
+            raise ServerUnavailable(f"Store server connection lost: {e}") from e
+        if not line:
+            self.close()
+            raise ServerUnavailable("Store server closed the connection")
+        response = json.loads(line)
+        if response.get("ok"):
+            return response.get("result")
+        error = _ERRORS.get(response.get("error"))
+        if error is not None:
+            raise error(**response.get("fields", {}))
+        if response.get("error") in ("CheckoutError", "ServerUnavailable"):
+            raise CheckoutError(response.get("message"))
+        raise RuntimeError(response.get("message") or "Store server error")
+
+    def _request(self, op, **params):
+        if self._sock is None:
+            self._connect()
+            if params.get("key"):
+                # A retried commit may have gone through before the connection dropped
+                done = self._send("result", key=params["key"])
+                if done is not None:
+                    return done
+            self._restore_cart()
+        return self._send(op, **params)
+
+    def _committing(self, op, key, **params):
+        try:
+            return self._request(op, key=key, **params)
+        except ServerUnavailable:
+            # No answer: it may or may not have committed, retry once on a new connection
+            return self._request(op, key=key, **params)
+
+    def _restore_cart(self):
+        # The server released our holds when the old connection went away
+        lines = self.cart.lines()
+        promo = self.promo
+        if not lines:
+            return
+        self.cart.clear()
+        self.promo = None
+        try:
+            for line in lines:
+                result = self._send("scan", barcode=line["barcode"], qty=line["quantity"])
+                self.cart.add(result["line"], line["quantity"])
+            if promo:
+                # Not apply_promo(): that would drop the key of a commit being retried
+                self.promo = self._send("apply_promo", code=promo["code"])["promo"]
+                self.cart.set_discount(float(self.promo.get("discount_percentage", 0)))
+        except CheckoutError as e:
+            raise CheckoutError(f"Reconnected, but the cart could not be fully restored: {e}") from e
+
+    def close(self):
+        for closable in (self._file, self._sock):
+            try:
+                if closable is not None:
+                    closable.close()
+            except OSError:
+                pass
+        self._file = None
+        self._sock = None
+
+    # ---- checkout ----
+    def ping(self):
+        return self._request("ping")
+
+    def lookup(self, barcode):
+        result = self._request("lookup", barcode=barcode)
+        return result["product"], result["remaining"]
+
+    def scan(self, barcode, qty=1):
+        self._commit_key = None
+        result = self._request("scan", barcode=barcode, qty=int(qty))
+        line = result["line"]
+        return self.cart.add(line, int(qty))
+
+    def remove(self, barcode):
+        self._commit_key = None
+        self._request("remove", barcode=barcode)
+        self.cart.remove(barcode)
+
+    def apply_promo(self, code):
+        self._commit_key = None
+        result = self._request("apply_promo", code=code)
+        self.promo = result["promo"]
+        self.cart.set_discount(float(self.promo.get("discount_percentage", 0)))
+        return self.promo
+
+    def commit(self):
+        if not self.cart:
+            raise CheckoutError("Cart is empty")
+        if self._commit_key is None:
+            self._commit_key = uuid.uuid4().hex
+        try:
+            result = self._committing("commit", self._commit_key)
+        except ServerUnavailable:
+            raise
+        except CheckoutError:
+            # Refused by the server, so nothing was committed under this key
+            self._commit_key = None
+            raise
+        self._commit_key = None
+        self.cart.clear()
+        self.promo = None
+        return result["sale_id"], result["record"]
+
+    def clear(self):
+        self._commit_key = None
+        if self._sock is not None:
+            self._send("clear")
+        self.cart.clear()
+        self.promo = None
+
+    def commit_batch(self, baskets, check_stock=True, key=None):
+        """
+        CheckoutEngine.commit_batch on the server. A caller retrying a batch
+        after ServerUnavailable should pass the same key both times.
+        """
+        result = self._committing("commit_batch", key or uuid.uuid4().hex, baskets=baskets, check_stock=check_stock)
+        return result["sale_ids"], [tuple(e) for e in result["errors"]]
+
+    def stock(self, barcode):
+        """Server's quantity on file and quantity held by open carts for barcode."""
+        return self._request("stock", barcode=barcode)
@@ -0,0 +1,318 @@
+# utils/store_server.py
+import argparse
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from utils.checkout import CheckoutEngine, CheckoutError, StockReservations
+from utils.helpers import flush
+from utils.storage import get_backend
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# A till that sends nothing for this long is dropped and its cart released
+SESSION_IDLE_TIMEOUT = 15 * 60
+# Longest request line accepted (a large commit_batch)
+MAX_LINE_BYTES = 16 * 1024 * 1024
+# Results of this many recent commits are kept, so a till retrying after a
+# dropped connection gets the first answer instead of committing twice
+COMMIT_RESULTS_KEPT = 1000
+
+
+def _cart_state(engine):
+    return {"lines": engine.cart.lines(), "subtotal": engine.cart.subtotal,
+            "discount": engine.cart.discount_amount, "total": engine.cart.total}
+
+
+class StoreServer:
+    """
+    Owns one data_dir and serves checkouts to many tills over a socket.
+
+    The protocol is one JSON object per line in each direction:
+    {"id": 1, "op": "scan", "barcode": "...", "qty": 2} is answered by
+    {"id": 1, "ok": true, "result": ...} or
+    {"id": 1, "ok": false, "error": "OutOfStock", "message": ..., "fields": {...}}.
+
+    Every connection is one till session with its own CheckoutEngine. All
+    engines share a StockReservations, and every request runs on the event
+    loop thread, one at a time. That makes "check stock, then reserve" and
+    "decrement stock, then release" atomic without locks, and commits can
+    never overwrite each other.
+
+    commit and commit_batch take an optional "key" chosen by the till. A
+    request with a key that already committed returns the stored result and
+    commits nothing, so a till can safely retry when it did not hear back.
+
+    Stock changes reach products.json through the write-behind store, so
+    product edits must go through this server's data_dir too: an admin
+    editing products from another PC with its own JsonBackend can overwrite
+    the server's stock counts.
+    """
+
+    def __init__(self, data_dir, host=DEFAULT_HOST, port=DEFAULT_PORT, idle_timeout=SESSION_IDLE_TIMEOUT):
+        self.data_dir = data_dir
+        self.host = host
+        self.port = port
+        self.idle_timeout = idle_timeout
+        self.backend = get_backend(data_dir)
+        self.reservations = StockReservations()
+        self.sessions = 0
+        self.commits = 0
+        self._results = OrderedDict()
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_LINE_BYTES)
+        # port=0 picks a free port; report the real one
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        flush()
+
+    async def _handle(self, reader, writer):
+        engine = CheckoutEngine(self.data_dir, backend=self.backend, reservations=self.reservations)
+        self.sessions += 1
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                except (asyncio.TimeoutError, ConnectionError, asyncio.LimitOverrunError, ValueError):
+                    break
+                if not line:
+                    break
+                writer.write(self._dispatch(engine, line))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            # Cancelled at shutdown: finish normally so the stream callback does not report it
+            pass
+        finally:
+            # A till that went away gives its held stock back
+            engine.clear()
+            self.sessions -= 1
+            writer.close()
+
+    def _dispatch(self, engine, line):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            handler = getattr(self, f"_op_{request.get('op')}", None)
+            if handler is None:
+                raise ValueError(f"Unknown operation: {request.get('op')}")
+            response = {"id": request_id, "ok": True, "result": handler(engine, request)}
+        except CheckoutError as e:
+            fields = {k: v for k, v in vars(e).items() if not k.startswith("_")}
+            response = {"id": request_id, "ok": False, "error": type(e).__name__, "message": str(e),
+                        "fields": fields}
+        except Exception as e:
+            response = {"id": request_id, "ok": False, "error": "ServerError", "message": str(e)}
+        return (json.dumps(response, default=str) + "\n").encode("utf-8")
+
+    # ---- operations ----
+    def _op_ping(self, engine, request):
+        return {"sessions": self.sessions, "commits": self.commits}
+
+    def _op_hello(self, engine, request):
+        engine.user_name = request.get("user") or engine.user_name
+        return {"user": engine.user_name}
+
+    def _op_lookup(self, engine, request):
+        product, remaining = engine.lookup(request["barcode"])
+        return {"product": product, "remaining": remaining}
+
+    def _op_scan(self, engine, request):
+        # The engine refuses anything but a whole quantity of at least 1
+        line = engine.scan(request["barcode"], request.get("qty", 1))
+        return {"line": line, "cart": _cart_state(engine)}
+
+    def _op_remove(self, engine, request):
+        engine.remove(request["barcode"])
+        return {"cart": _cart_state(engine)}
+
+    def _op_apply_promo(self, engine, request):
+        promo = engine.apply_promo(request["code"])
+        return {"promo": promo, "cart": _cart_state(engine)}
+
+    def _op_cart(self, engine, request):
+        return _cart_state(engine)
+
+    def _op_clear(self, engine, request):
+        engine.clear()
+        return _cart_state(engine)
+
+    def _remember(self, key, result):
+        if key is not None:
+            self._results[key] = result
+            while len(self._results) > COMMIT_RESULTS_KEPT:
+                self._results.popitem(last=False)
+        return result
+
+    def _op_result(self, engine, request):
+        """The stored result of the commit made with request["key"], or None."""
+        return self._results.get(request.get("key"))
+
+    def _op_commit(self, engine, request):
+        key = request.get("key")
+        if key in self._results:
+            # Already committed; drop any holds the till re-scanned before retrying
+            engine.clear()
+            return self._results[key]
+        sale_id, record = engine.commit()
+        self.commits += 1
+        return self._remember(key, {"sale_id": sale_id, "record": record})
+
+    def _op_commit_batch(self, engine, request):
+        key = request.get("key")
+        if key in self._results:
+            return self._results[key]
+        sale_ids, errors = engine.commit_batch(request["baskets"], bool(request.get("check_stock", True)))
+        self.commits += len(sale_ids)
+        return self._remember(key, {"sale_ids": sale_ids, "errors": errors})
+
+    def _op_stock(self, engine, request):
+        product = self.backend.get_product(request["barcode"])
+        if not product:
+            return None
+        return {"quantity": int(product.get("quantity", 0)), "held": self.reservations.held(request["barcode"])}
+
+
+def serve(data_dir, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Run a store server until interrupted."""
+    server = StoreServer(data_dir, host, port)
+
+    async def main():
+        await server.start()
+        print(f"Store server for {data_dir} listening on {server.host}:{server.port}")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        flush()
+
+
+def start_in_thread(data_dir, host=DEFAULT_HOST, port=0):
+    """Start a server on a background thread (for tests and the load test). Returns (server, stop)."""
+    ready = threading.Event()
+    state = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        state["loop"] = loop
+        server = StoreServer(data_dir, host, port)
+        loop.run_until_complete(server.start())
+        state["server"] = server
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(server.close())
+            # Let open sessions release their carts before the loop goes away
+            sessions = asyncio.all_tasks(loop)
+            for task in sessions:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*sessions, return_exceptions=True))
+            loop.close()
+
+    thread = threading.Thread(target=run, name="store-server", daemon=True)
+    thread.start()
+    ready.wait()
+
+    def stop():
+        state["loop"].call_soon_threadsafe(state["loop"].stop)
+        thread.join(timeout=10)
+
+    return state["server"], stop
+
+
+def load_test(data_dir, tills=8, checkouts=100, items=3, seed=1):
+    """
+    Run tills loopback clients, each doing checkouts sales of items random
+    products, against a server on data_dir. Returns throughput and a stock
+    check: units sold must equal the drop in stock (no lost updates).
+    """
+    import random
+    from utils.store_client import StoreClient
+
+    server, stop = start_in_thread(data_dir)
+    try:
+        barcodes = [str(p["barcode"]) for p in server.backend.list_products()]
+        before = {str(p["barcode"]): int(p.get("quantity", 0)) for p in server.backend.list_products()}
+        sold = {}
+        sold_lock = threading.Lock()
+        refused = [0]
+
+        def till(n):
+            rng = random.Random(seed + n)
+            client = StoreClient(server.host, server.port, user_name=f"till{n}")
+            try:
+                for _ in range(checkouts):
+                    for barcode in rng.sample(barcodes, min(items, len(barcodes))):
+                        try:
+                            client.scan(barcode, 1)
+                        except CheckoutError:
+                            with sold_lock:
+                                refused[0] += 1
+                    if client.cart:
+                        _, record = client.commit()
+                        with sold_lock:
+                            for item in record["items"]:
+                                key = str(item["barcode"])
+                                sold[key] = sold.get(key, 0) + int(item["quantity"])
+            finally:
+                client.close()
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=till, args=(n,)) for n in range(tills)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        after = {str(p["barcode"]): int(p.get("quantity", 0)) for p in server.backend.list_products()}
+        # Stock is clamped at 0, and the server refuses to oversell, so this must hold exactly
+        lost = {b: (before[b] - after.get(b, 0), sold.get(b, 0)) for b in before
+                if before[b] - after.get(b, 0) != sold.get(b, 0)}
+        return {"tills": tills, "checkouts": server.commits, "seconds": round(elapsed, 3),
+                "checkouts_per_minute": round(server.commits / elapsed * 60) if elapsed else None,
+                "refused_scans": refused[0], "stock_mismatches": lost}
+    finally:
+        stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local store server shared by several tills")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("serve", help="Serve data_dir to tills")
+    p.add_argument("data_dir")
+    p.add_argument("--host", default=DEFAULT_HOST)
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p = sub.add_parser("loadtest", help="Hammer a server on data_dir with loopback tills")
+    p.add_argument("data_dir")
+    p.add_argument("--tills", type=int, default=8)
+    p.add_argument("--checkouts", type=int, default=100, help="Checkouts per till")
+    p.add_argument("--items", type=int, default=3, help="Products per checkout")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.data_dir, args.host, args.port)
+    else:
+        print(json.dumps(load_test(args.data_dir, args.tills, args.checkouts, args.items), indent=2))
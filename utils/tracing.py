@@ -0,0 +1,214 @@
+# utils/tracing.py
+import atexit
+import functools
+import json
+import logging
+import logging.handlers
+import math
+import os
+import queue
+import threading
+import time
+
+# Rotating performance log under <data_dir>/logs/
+LOG_FILE = "perf.jsonl"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def log_path(data_dir):
+    return os.path.join(data_dir, "logs", LOG_FILE)
+
+
+def enable(data_dir):
+    """Start recording spans to data_dir's rotating perf log. Safe to call twice."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer(log_path(data_dir))
+            atexit.register(disable)
+        return _tracer
+
+
+def disable():
+    """Stop recording and flush what is queued."""
+    global _tracer
+    with _tracer_lock:
+        tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.close()
+
+
+def enabled():
+    return _tracer is not None
+
+
+class _NoSpan:
+    """Stand-in used while tracing is off: every call is a no-op."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **fields):
+        pass
+
+    def exclude(self):
+        return self
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Span:
+    """One timed operation. Extra fields (rows, bytes, ...) are attached with set()."""
+
+    __slots__ = ("tracer", "op", "fields", "start", "excluded")
+
+    def __init__(self, tracer, op, fields):
+        self.tracer = tracer
+        self.op = op
+        self.fields = fields
+        self.excluded = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ms = (time.perf_counter() - self.start - self.excluded) * 1000
+        if exc_type is not None:
+            self.fields["error"] = exc_type.__name__
+        self.tracer.record(self.op, ms, self.fields)
+        return False
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def exclude(self):
+        """Context manager for a stretch (e.g. a dialog waiting on the user) left out of the duration."""
+        return _Exclusion(self)
+
+
+class _Exclusion:
+    __slots__ = ("span", "start")
+
+    def __init__(self, span):
+        self.span = span
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.excluded += time.perf_counter() - self.start
+        return False
+
+
+def span(op, **fields):
+    """Time a block as operation op. Returns a shared no-op when tracing is off."""
+    tracer = _tracer
+    if tracer is None:
+        return _NO_SPAN
+    return Span(tracer, op, fields)
+
+
+def traced(op, describe=None):
+    """
+    Decorator form of span(). describe(result, *args, **kwargs) may return
+    extra fields such as rows or bytes; it only runs while tracing is on.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return fn(*args, **kwargs)
+            with Span(tracer, op, {}) as s:
+                result = fn(*args, **kwargs)
+                if describe is not None:
+                    try:
+                        s.set(**describe(result, *args, **kwargs))
+                    except Exception:
+                        pass
+                return result
+        return wrapper
+    return decorator
+
+
+class Tracer:
+    """
+    Hands finished spans to a logging QueueListener, which appends them as
+    JSON lines to a size-rotated log on its own thread; the caller only pays
+    for a queue put.
+    """
+
+    def __init__(self, path, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                       encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self._queue = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(self._queue, handler)
+        self._listener.start()
+        self._logger = logging.getLogger(f"justb.perf.{id(self)}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.addHandler(logging.handlers.QueueHandler(self._queue))
+
+    def record(self, op, ms, fields):
+        entry = {"ts": round(time.time(), 3), "op": op, "ms": round(ms, 3),
+                 "thread": threading.current_thread().name}
+        entry.update(fields)
+        self._logger.info(json.dumps(entry, default=str))
+
+    def close(self):
+        self._listener.stop()
+        for handler in self._logger.handlers[:]:
+            self._logger.removeHandler(handler)
+        for handler in self._listener.handlers:
+            handler.close()
+
+
+# ---- reading the log ----
+def read_records(data_dir, limit=None):
+    """Spans from the perf log and its rotated copies, oldest first (at most the last limit)."""
+    path = log_path(data_dir)
+    files = [f"{path}.{n}" for n in range(LOG_BACKUP_COUNT, 0, -1)] + [path]
+    records = []
+    for name in files:
+        if not os.path.exists(name):
+            continue
+        with open(name, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # a line cut short by a crash
+    return records[-limit:] if limit else records
+
+
+def _percentile(sorted_values, pct):
+    # Nearest-rank percentile
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(records):
+    """Per-operation count, p50, p95, p99 and max duration (ms), sorted by op."""
+    by_op = {}
+    for record in records:
+        if "op" in record and "ms" in record:
+            by_op.setdefault(record["op"], []).append(float(record["ms"]))
+    summary = []
+    for op in sorted(by_op):
+        values = sorted(by_op[op])
+        summary.append({"op": op, "count": len(values), "p50": _percentile(values, 50),
+                        "p95": _percentile(values, 95), "p99": _percentile(values, 99), "max": values[-1]})
+    return summary
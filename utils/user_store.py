@@ -0,0 +1,67 @@
+# utils/user_store.py
+import os
+import threading
+
+from utils.helpers import DataDirRegistry, file_stamp, load_json, save_json, flush
+from utils.security import hash_password, verify_password
+
+_stores = DataDirRegistry(lambda data_dir: UserStore(os.path.join(data_dir, "users.json")))
+
+
+def get_user_store(data_dir):
+    """Return the shared UserStore for data_dir (one per process)."""
+    return _stores.get(data_dir)
+
+
+class UserStore:
+    """
+    users.json indexed by username, cached until the file changes.
+    Passwords are stored as bcrypt hashes in "password_hash"; entries that
+    still carry a plaintext "password" are hashed on first use. bcrypt is slow
+    on purpose, so authenticate() belongs on a worker thread, not the Tk thread.
+    """
+
+    def __init__(self, users_path):
+        self.users_path = users_path
+        self._lock = threading.Lock()
+        self._users = []
+        self._by_name = {}
+        self._stamp = None
+        self._dummy_hash = None
+
+    def _refresh(self):
+        stamp = file_stamp(self.users_path)
+        if stamp is not None and stamp == self._stamp:
+            return
+        self._users = load_json(self.users_path)
+        self._by_name = {str(u.get("username", "")).strip(): u for u in self._users}
+        self._stamp = stamp
+        self._migrate_plaintext()
+
+    def _migrate_plaintext(self):
+        """Replace plaintext passwords with bcrypt hashes and persist the result."""
+        changed = False
+        for user in self._users:
+            if "password" in user and "password_hash" not in user:
+                user["password_hash"] = hash_password(str(user.pop("password")).strip())
+                changed = True
+        if changed:
+            save_json(self.users_path, self._users)
+            flush()
+            self._stamp = file_stamp(self.users_path)
+
+    def authenticate(self, username, password):
+        """Return the user dict when username/password match, else None."""
+        with self._lock:
+            self._refresh()
+            user = self._by_name.get(username.strip())
+            if self._dummy_hash is None:
+                self._dummy_hash = hash_password("")
+        password_hash = user.get("password_hash") if user is not None else None
+        if not password_hash:
+            # Spend the same time as a real check so unknown names (or broken entries) are not revealed
+            verify_password(self._dummy_hash, password)
+            return None
+        if not verify_password(password_hash, password):
+            return None
+        return user
@@ -0,0 +1,159 @@
+# utils/write_behind.py
+import atexit
+import copy
+import json
+import marshal
+import os
+import threading
+
+from utils import helpers
+
+# Seconds between background group commits
+FLUSH_INTERVAL = 1.0
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide WriteBehindStore, starting it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = WriteBehindStore()
+            _store.start()
+            atexit.register(_store.close)
+        return _store
+
+
+def _copied(data):
+    """A deep copy of data; marshal is several times faster than copy.deepcopy but only takes plain types."""
+    try:
+        return marshal.loads(marshal.dumps(data))
+    except ValueError:
+        return copy.deepcopy(data)
+
+
+class WriteBehindStore:
+    """
+    Collects whole-collection writes in memory and commits them from a
+    background thread. Every dirty file is written to a temp file, fsync'd and
+    renamed over the original, so a crash leaves either the old or the new
+    version on disk, never a half-written one. Several saves of the same file
+    between two commits cost a single write.
+
+    put() only copies the top-level list or dict, which costs next to
+    nothing whatever the size; the JSON encoding happens on the flush thread.
+    So the items inside must be replaced, not edited in place, once saved
+    (ProductCatalog.replace()), or the edit can leak into a write still
+    queued. Objects that are rebuilt for every save, such as a day's rollup
+    read back through load_json(), need no care.
+    """
+
+    def __init__(self, interval=FLUSH_INTERVAL):
+        self.interval = interval
+        self._dirty = {}            # path -> top-level copy of the latest data
+        self._flushing = {}         # path -> snapshot being committed right now
+        self._committed = {}        # path -> (mtime_ns, size) after our last commit
+        self._lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Write-behind flush failed: {e}")
+
+    def put(self, path, data):
+        """Queue data to be written to path (see the class docstring on editing it afterwards)."""
+        if isinstance(data, list):
+            snapshot = list(data)
+        elif isinstance(data, dict):
+            snapshot = dict(data)
+        else:
+            snapshot = data
+        with self._lock:
+            self._dirty[os.path.abspath(path)] = snapshot
+
+    def has_pending(self, path):
+        """True if path has an uncommitted write."""
+        key = os.path.abspath(path)
+        with self._lock:
+            return key in self._dirty or key in self._flushing
+
+    def pending(self, path):
+        """Return (True, a copy of the data) if path has an uncommitted write, else (False, None)."""
+        with self._lock:
+            key = os.path.abspath(path)
+            snapshot = self._dirty.get(key, self._flushing.get(key))
+        if snapshot is None:
+            return False, None
+        # Readers may edit what they get (e.g. a rollup folding in a sale); keep the queued data intact
+        return True, _copied(snapshot)
+
+    def committed_stamp(self, path):
+        """File (mtime_ns, size) right after this store last committed path."""
+        with self._lock:
+            return self._committed.get(os.path.abspath(path))
+
+    def flush(self):
+        """
+        Commit every pending write now. Returns once they are on disk. A file
+        that fails stays queued for the next flush (a newer put() wins) and
+        the first error is raised after the others were written.
+        """
+        with self._commit_lock:
+            with self._lock:
+                batch = self._dirty
+                self._dirty = {}
+                self._flushing = batch
+            error = None
+            committed = set()
+            try:
+                for path, snapshot in batch.items():
+                    try:
+                        payload = json.dumps(snapshot, ensure_ascii=False, separators=(",", ":"))
+                        self._commit(path, payload)
+                        committed.add(path)
+                    except Exception as e:
+                        error = error or e
+            finally:
+                with self._lock:
+                    for path, snapshot in batch.items():
+                        if path not in committed:
+                            self._dirty.setdefault(path, snapshot)
+                    self._flushing = {}
+            if error is not None:
+                raise error
+
+    def _commit(self, path, payload):
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._committed[path] = helpers.file_stamp(path)
+
+    def close(self):
+        """Stop the background thread after a final flush."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()